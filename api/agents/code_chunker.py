@@ -0,0 +1,240 @@
+# code_chunker.py
+"""
+超出上下文窗口的大文件分块审查：
+- 按顶层函数/类的边界把文件切成若干个不超过token预算的窗口，相邻窗口重叠overlap_lines行，避免边界处的问题被漏掉
+- 各窗口并行请求LLM，问题的行号从窗口内的相对行号换算回原文件行号
+- 重叠区域被两个窗口重复报告的问题只保留一条（保留离窗口边缘更远、上下文更完整的那一条）
+"""
+import ast
+import bisect
+import logging
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Sequence
+
+from api.agents.prompt_layout import dispatch_grouped
+from api.agents.prompt_packing import PackFile, PromptPacker, render_file, split_findings_by_file
+from api.common.config.system_config import code_review_config
+
+logger = logging.getLogger(__name__)
+
+CHUNKING_CONFIG = code_review_config.get("review", {}).get("chunking", {})
+
+_PYTHON_SUFFIXES = (".py", ".pyi")
+_LINE_FIELDS = ("line", "line_number", "start_line", "end_line")
+_LINE_RANGE_RE = re.compile(r"^\s*(\d+)\s*-\s*(\d+)\s*$")
+# 同一行、同一类型的两个问题，描述相似度超过该值时视为重复
+_DUPLICATE_SIMILARITY = 0.6
+
+CHUNK_NOTE = "以上是文件{path}第{start}-{end}行的片段（全文共{total}行）。请只审查该片段，行号从片段第一行起按1计算。"
+
+
+@dataclass
+class CodeChunk:
+    index: int
+    start_line: int     # 在原文件中的起始行号（从1开始，包含）
+    end_line: int       # 在原文件中的结束行号（包含）
+    content: str
+    tokens: int
+
+
+def line_token_counts(tokenizer, content: str) -> List[int]:
+    """
+    每一行（含换行符）的token数：fast tokenizer对全文编码一次，按每个token的起始偏移归到所在行；
+    否则逐行编码（跨行合并的token会被重复计入，结果偏大，对预算来说是安全的）
+    """
+    lines = content.splitlines(keepends=True)
+    if getattr(tokenizer, "is_fast", False):
+        line_starts = [0]
+        for line in lines[:-1]:
+            line_starts.append(line_starts[-1] + len(line))
+        counts = [0] * len(lines)
+        encoding = tokenizer(content, add_special_tokens=False, return_offsets_mapping=True)
+        for start, _ in encoding["offset_mapping"]:
+            counts[bisect.bisect_right(line_starts, start) - 1] += 1
+        return counts
+    return [len(tokenizer.encode(line, add_special_tokens=False)) for line in lines]
+
+
+def _with_leading_comments(lines: Sequence[str], start: int) -> int:
+    """边界向上扩展到紧邻的注释行，函数前的说明注释与函数放在同一个窗口"""
+    while start > 0 and lines[start - 1].lstrip().startswith("#"):
+        start -= 1
+    return start
+
+
+def split_boundaries(content: str, path: str) -> List[List[int]]:
+    """
+    可切分的位置（0起始的行下标，表示在该行之前切分），按优先级分两层：
+    - Python：顶层函数/类（含装饰器和前面的注释）；其余顶层语句
+    - 其他语言或解析失败：空行之后的第一个不缩进的非空行（多为顶层定义的开始）
+    """
+    lines = content.splitlines()
+    if path.endswith(_PYTHON_SUFFIXES):
+        try:
+            tree = ast.parse(content)
+        except SyntaxError:
+            tree = None
+        if tree is not None:
+            definitions, statements = [], []
+            for node in tree.body:
+                start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    definitions.append(_with_leading_comments(lines, start))
+                else:
+                    statements.append(start)
+            return [sorted(set(definitions)), sorted(set(statements))]
+    blocks = [i for i in range(1, len(lines))
+              if lines[i].strip() and not lines[i][0].isspace() and not lines[i - 1].strip()]
+    return [blocks]
+
+
+def split_into_chunks(
+        content: str,
+        line_tokens: Sequence[int],
+        budget: int,
+        boundaries: Sequence[Sequence[int]] = (),
+        overlap_lines: int = 20
+) -> List[CodeChunk]:
+    """
+    把文件切成token数不超过budget的窗口：每个窗口先尽量向后扩展，再回退到范围内最后一个高优先级的切分点；
+    切分点会让窗口短于可容纳长度的一半时改用低一层的切分点，都没有时按行切分
+    下一个窗口从上一个窗口结束前overlap_lines行开始，重叠最多为上一个窗口行数的1/4
+    """
+    lines = content.splitlines(keepends=True)
+    total = len(lines)
+    chunks: List[CodeChunk] = []
+    start = 0
+    while start < total:
+        end, tokens = start, 0
+        while end < total and tokens + line_tokens[end] <= budget:
+            tokens += line_tokens[end]
+            end += 1
+        if end == start:
+            logger.warning(f"Line {start + 1} alone exceeds the chunk budget of {budget} tokens")
+            end = start + 1
+        if end < total:
+            shortest = start + max((end - start) // 2, overlap_lines + 1)
+            for tier in boundaries:
+                candidates = [b for b in tier if shortest <= b <= end]
+                if candidates:
+                    end = max(candidates)
+                    break
+        chunks.append(CodeChunk(index=len(chunks), start_line=start + 1, end_line=end,
+                                content="".join(lines[start:end]), tokens=sum(line_tokens[start:end])))
+        if end >= total:
+            break
+        # 重叠不超过窗口的1/4，预算较小（窗口只有几十行）时重叠不会让窗口数成倍增加
+        overlap = min(overlap_lines, (end - start) // 4)
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _remap_line(value: Any, chunk: CodeChunk) -> Any:
+    """窗口内行号 -> 原文件行号；超出窗口长度但落在窗口范围内的行号视为模型已给出原文件行号"""
+    if isinstance(value, str):
+        match = _LINE_RANGE_RE.match(value)
+        if match:
+            return "-".join(str(_remap_line(int(n), chunk)) for n in match.groups())
+        if value.strip().isdigit():
+            value = int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+        length = chunk.end_line - chunk.start_line + 1
+        if value > length and chunk.start_line <= value <= chunk.end_line:
+            return value
+        return value + chunk.start_line - 1
+    return value
+
+
+def _issue_line(issue: Dict[str, Any]) -> Optional[int]:
+    for field_name in _LINE_FIELDS:
+        value = issue.get(field_name)
+        if isinstance(value, str):
+            match = _LINE_RANGE_RE.match(value)
+            value = int(match.group(1)) if match else (int(value) if value.strip().isdigit() else None)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+
+def remap_findings(issues: List[Any], chunk: CodeChunk) -> List[Dict[str, Any]]:
+    remapped = []
+    for issue in issues:
+        if not isinstance(issue, dict):
+            issue = {"description": str(issue)}
+        issue = dict(issue)
+        for field_name in _LINE_FIELDS:
+            if field_name in issue:
+                issue[field_name] = _remap_line(issue[field_name], chunk)
+        remapped.append(issue)
+    return remapped
+
+
+def _is_duplicate(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    if _issue_line(a) != _issue_line(b) or a.get("type") != b.get("type"):
+        return False
+    text_a, text_b = str(a.get("description", "")), str(b.get("description", ""))
+    return text_a == text_b or SequenceMatcher(None, text_a, text_b).ratio() >= _DUPLICATE_SIMILARITY
+
+
+def merge_chunk_findings(chunk_issues: Sequence[tuple]) -> List[Dict[str, Any]]:
+    """
+    合并各窗口（已换算行号）的问题：chunk_issues为[(CodeChunk, issues), ...]
+    不同窗口在同一行报告的相似问题只保留一条，保留该行离所在窗口边缘更远的那一条；结果按行号排序
+    """
+    kept: List[tuple] = []     # (issue, chunk, 离窗口边缘的行数)
+    for chunk, issues in chunk_issues:
+        for issue in issues:
+            line = _issue_line(issue)
+            centrality = min(line - chunk.start_line, chunk.end_line - line) if line is not None else 0
+            for i, (other, other_chunk, other_centrality) in enumerate(kept):
+                if other_chunk is not chunk and _is_duplicate(issue, other):
+                    if centrality > other_centrality:
+                        kept[i] = (issue, chunk, centrality)
+                    break
+            else:
+                kept.append((issue, chunk, centrality))
+    issues = [issue for issue, _, _ in kept]
+    issues.sort(key=lambda issue: (_issue_line(issue) is None, _issue_line(issue) or 0))
+    return issues
+
+
+def chunk_body(path: str, chunk: CodeChunk, total_lines: int) -> str:
+    """窗口在请求中的内容：代码片段在前、片段说明在后，与其他请求共享的前缀不受影响"""
+    note = CHUNK_NOTE.format(path=path, start=chunk.start_line, end=chunk.end_line, total=total_lines)
+    return f"{render_file(path, chunk.content)}\n\n{note}"
+
+
+def review_chunked_file(
+        client,
+        packer: PromptPacker,
+        file: PackFile,
+        overlap_lines: Optional[int] = None,
+        max_workers: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    分块审查单个超出预算的文件，返回按原文件行号排序、去重后的问题列表
+    窗口预算 = 上下文窗口的剩余空间（packer.context_budget） - 文件标签与片段说明的开销
+    各窗口使用packer的前缀布局，经dispatch_grouped并行请求，并发仍受客户端限流器约束
+    """
+    overlap_lines = CHUNKING_CONFIG.get("overlap_lines", 20) if overlap_lines is None else overlap_lines
+    max_workers = max_workers or CHUNKING_CONFIG.get("max_workers", 4)
+    total_lines = len(file.content.splitlines())
+    wrapper = f"{render_file(file.path, '')}\n\n" + CHUNK_NOTE.format(
+        path=file.path, start=total_lines, end=total_lines, total=total_lines)
+    budget = packer.context_budget - client.count_tokens(wrapper)
+    chunks = split_into_chunks(file.content, line_token_counts(client.tokenizer, file.content), budget,
+                               split_boundaries(file.content, file.path), overlap_lines)
+    logger.info(f"Reviewing {file.path} ({file.tokens} tokens) in {len(chunks)} chunks")
+
+    responses = dispatch_grouped(lambda messages: client.chat_completion(messages, response_format="json"),
+                                 [(packer.layout, chunk_body(file.path, chunk, total_lines)) for chunk in chunks],
+                                 max_workers)
+    chunk_issues = []
+    for chunk, response in zip(chunks, responses):
+        issues = split_findings_by_file(response["content"], [file.path]).get(file.path, [])
+        if not isinstance(issues, list):
+            issues = [issues]
+        chunk_issues.append((chunk, remap_findings(issues, chunk)))
+    return merge_chunk_findings(chunk_issues)
@@ -0,0 +1,91 @@
+# prompt_layout.py
+"""
+面向vLLM前缀缓存（automatic prefix caching）的提示词布局：只有开头完全相同的token段才能复用KV缓存，
+因此所有审查请求按固定顺序组装：系统提示词 -> 项目上下文 -> 单个文件/片段的内容，变化最频繁的部分放在最后
+共享同一前缀的请求连续发送，并且先发一个请求把前缀写入缓存，其余请求再并发发送
+"""
+import hashlib
+import html
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from api.common.llm_client.usage_ledger import submit_with_context
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PromptLayout:
+    """
+    一组请求共享的前缀：system_prompt作为系统消息，project_context放在用户消息的开头，请求各自的内容紧随其后
+    两个部分都不应包含时间戳、任务id等每次变化的内容，否则前缀无法复用
+    """
+    system_prompt: str
+    project_context: str = ""
+
+    def build(self, body: str) -> List[Dict[str, str]]:
+        content = f"{self.project_context}\n\n{body}" if self.project_context else body
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": content},
+        ]
+
+    @property
+    def prefix_key(self) -> str:
+        """前缀的摘要，用于把共享前缀的请求分到同一组"""
+        hasher = hashlib.blake2b(digest_size=12)
+        for part in (self.system_prompt, self.project_context):
+            hasher.update(part.encode("utf-8"))
+            hasher.update(b"\x00")
+        return hasher.hexdigest()
+
+
+def build_project_context(project: Any, requirements: Optional[str] = None) -> str:
+    """
+    项目级上下文（Project的名称、语言、描述，以及ReviewTask的审查要求），同一次审查的所有请求完全相同
+    字段按固定顺序输出，空字段省略
+    """
+    lines = []
+    for label, value in (("项目名称", getattr(project, "name", None)),
+                         ("编程语言", getattr(project, "programming_language", None)),
+                         ("项目描述", getattr(project, "description", None)),
+                         ("审查要求", requirements)):
+        if value:
+            lines.append(f"{label}：{str(value).strip()}")
+    if not lines:
+        return ""
+    name = html.escape(str(getattr(project, "name", "") or ""), quote=True)
+    return f'<project name="{name}">\n' + "\n".join(lines) + "\n</project>"
+
+
+def group_by_prefix(layouts: Sequence[PromptLayout]) -> List[List[int]]:
+    """按前缀分组，返回各组请求的下标；组按第一次出现的顺序排列，组内保持原顺序"""
+    groups: Dict[str, List[int]] = {}
+    for i, layout in enumerate(layouts):
+        groups.setdefault(layout.prefix_key, []).append(i)
+    return list(groups.values())
+
+
+def dispatch_grouped(
+        call: Callable[[List[Dict[str, str]]], Any],
+        requests: Sequence[Tuple[PromptLayout, str]],
+        max_workers: int = 4
+) -> List[Any]:
+    """
+    按前缀分组发送请求：同一组的请求连续发送，每组先同步发送第一个请求（把共享前缀写入vLLM的前缀缓存），
+    组内其余请求再并发发送；结果顺序与输入一致，任何一个请求的异常都会抛出
+    requests为[(PromptLayout, 请求内容), ...]，call接收组装好的messages
+    线程池中的请求沿用调用方的llm_usage_context
+    """
+    results: List[Any] = [None] * len(requests)
+    messages = [layout.build(body) for layout, body in requests]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefix-dispatch") as pool:
+        for group in group_by_prefix([layout for layout, _ in requests]):
+            first, rest = group[0], group[1:]
+            results[first] = call(messages[first])
+            futures = [submit_with_context(pool, call, messages[j]) for j in rest]
+            for i, future in zip(rest, futures):
+                results[i] = future.result()
+    return results
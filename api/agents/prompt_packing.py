@@ -0,0 +1,287 @@
+# prompt_packing.py
+"""
+多文件提示词打包：项目级审查中的大部分文件远小于上下文窗口，逐个文件请求时每个请求都要重复同一个系统提示词
+这里按token预算把多个小文件装进同一个请求（first-fit decreasing装箱），每个文件用<file path="...">标签包裹，
+模型按文件输出结果，再由split_findings_by_file按路径拆回各个文件
+"""
+import html
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from api.agents.prompt_layout import PromptLayout, dispatch_grouped
+from api.common.config.system_config import code_review_config
+
+logger = logging.getLogger(__name__)
+
+PACKING_CONFIG = code_review_config.get("review", {}).get("packing", {})
+
+FILE_SEPARATOR = "\n\n"
+# 按各段token数之和估算拼接后的token数时，段与段的边界可能合并或拆分出个别token，每个文件预留少量余量
+_BOUNDARY_MARGIN = 4
+_FILE_SECTION_RE = re.compile(r'<file path="([^"]*)">\n?(.*?)\n?</file>', re.S)
+_CODE_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*\n(.*?)\n\s*```\s*$", re.S)
+
+PACKED_REVIEW_INSTRUCTION = (
+    "用户消息中可能包含多个代码文件，每个文件位于<file path=\"...\">与</file>之间。"
+    "请逐个文件审查，只输出一个JSON对象：{\"files\": [{\"path\": \"文件路径\", \"issues\": [问题列表]}]}。"
+    "path必须与标签中的路径完全一致；没有问题的文件issues为空列表；行号按各文件自身从1开始计算。"
+)
+
+
+def render_file(path: str, content: str) -> str:
+    """用<file>标签包裹单个文件，路径中的引号等字符做转义"""
+    return f'<file path="{html.escape(path, quote=True)}">\n{content}\n</file>'
+
+
+@dataclass
+class PackFile:
+    path: str
+    content: str
+    tokens: int = 0         # 包含<file>标签在内的token数
+    source: Any = None      # 原始对象（如CodeFileVersion），便于调用方回写结果
+
+    def render(self) -> str:
+        return render_file(self.path, self.content)
+
+
+@dataclass
+class PromptPack:
+    files: List[PackFile] = field(default_factory=list)
+    tokens: int = 0
+    oversized: bool = False     # 单个文件已超出预算，不能整体放进一个请求
+
+    @property
+    def paths(self) -> List[str]:
+        return [file.path for file in self.files]
+
+    def render(self) -> str:
+        return FILE_SEPARATOR.join(file.render() for file in self.files)
+
+
+def packed_system_prompt(system_prompt: str) -> str:
+    """打包请求使用的系统提示词：原提示词 + 固定的输出格式说明，所有请求的前缀保持一致"""
+    return f"{system_prompt}\n\n{PACKED_REVIEW_INSTRUCTION}"
+
+
+def build_packed_messages(system_prompt: str, pack: PromptPack, project_context: str = "") -> List[Dict[str, str]]:
+    return PromptLayout(packed_system_prompt(system_prompt), project_context).build(pack.render())
+
+
+def pack_files(
+        files: Sequence[PackFile],
+        budget: int,
+        max_files_per_pack: Optional[int] = None,
+        max_file_tokens: Optional[int] = None
+) -> List[PromptPack]:
+    """
+    first-fit decreasing装箱：文件按token数从大到小依次放入第一个放得下的箱子，放不下时新开一个
+    - 每个文件的tokens需已计算好（见PromptPacker.pack），budget为一个箱子中文件部分的token数上限
+    - 超出budget的文件单独成箱；超出max_file_tokens（默认为budget，即上下文窗口的剩余空间）时标记oversized，由调用方分块处理
+    - 同样的输入得到同样的打包结果与文件顺序，重复审查时可以命中LLM响应缓存
+    """
+    separator_tokens = 1
+    packs: List[PromptPack] = []
+    for file in sorted(files, key=lambda f: (-f.tokens, f.path)):
+        cost = file.tokens + _BOUNDARY_MARGIN
+        if cost > budget:
+            packs.append(PromptPack(files=[file], tokens=cost, oversized=cost > (max_file_tokens or budget)))
+            continue
+        for pack in packs:
+            if pack.tokens > budget or (max_files_per_pack and len(pack.files) >= max_files_per_pack):
+                continue
+            if pack.tokens + separator_tokens + cost <= budget:
+                pack.files.append(file)
+                pack.tokens += separator_tokens + cost
+                break
+        else:
+            packs.append(PromptPack(files=[file], tokens=cost))
+    return packs
+
+
+class PromptPacker:
+    """
+    按客户端的上下文窗口打包文件：
+    - context_budget = max_tokens - 最大输出token数 - 系统提示词等固定开销，单个文件超出时需要分块
+    - budget = min(max_pack_tokens, context_budget)，多个文件合并时的上限
+    文件token数使用client.count_tokens_many批量计算（按内容摘要缓存，重复审查时不再分词）
+    同一个packer组装的所有请求共享 系统提示词 + 项目上下文 的前缀（见prompt_layout）
+    """
+
+    def __init__(
+            self,
+            client,
+            system_prompt: str,
+            project_context: str = "",
+            max_files_per_pack: Optional[int] = None,
+            max_pack_tokens: Optional[int] = None
+    ):
+        self.client = client
+        self.system_prompt = system_prompt
+        self.layout = PromptLayout(packed_system_prompt(system_prompt), project_context)
+        self.max_files_per_pack = max_files_per_pack or PACKING_CONFIG.get("max_files_per_pack", 8)
+        max_pack_tokens = max_pack_tokens or PACKING_CONFIG.get("max_pack_tokens")
+        fixed_tokens = client.count_tokens(self.layout.build(""))
+        self.context_budget = client.max_tokens - client.max_output_tokens - fixed_tokens
+        self.budget = min(self.context_budget, max_pack_tokens) if max_pack_tokens else self.context_budget
+        if self.budget <= 0:
+            raise ValueError(f"System prompt leaves no room for code: {fixed_tokens} tokens, "
+                             f"max_tokens is {client.max_tokens}")
+
+    def pack(self, files: Iterable[PackFile]) -> List[PromptPack]:
+        files = list(files)
+        counts = self.client.count_tokens_many([file.render() for file in files]) if files else []
+        for file, tokens in zip(files, counts):
+            file.tokens = tokens
+        packs = pack_files(files, self.budget, self.max_files_per_pack, self.context_budget)
+        logger.info(f"Packed {len(files)} files into {len(packs)} prompts "
+                    f"({sum(pack.oversized for pack in packs)} oversized), budget {self.budget} tokens")
+        return packs
+
+    def build_messages(self, pack: PromptPack) -> List[Dict[str, str]]:
+        return self.layout.build(pack.render())
+
+
+def files_from_versions(versions: Iterable[Any]) -> List[PackFile]:
+    """CodeFileVersion -> PackFile，路径取自所属CodeFile的file_path"""
+    return [PackFile(path=version.code_file.file_path, content=version.content, source=version)
+            for version in versions]
+
+
+def _normalize_path(path: str) -> str:
+    path = path.strip().replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path
+
+
+def _resolve_path(path: Any, paths: Sequence[str]) -> Optional[str]:
+    """模型返回的路径可能带./前缀或只有文件名，依次按原样、规范化后、唯一的后缀匹配"""
+    if not isinstance(path, str):
+        return None
+    path = html.unescape(path)
+    if path in paths:
+        return path
+    normalized = _normalize_path(path)
+    by_normalized = {_normalize_path(p): p for p in paths}
+    if normalized in by_normalized:
+        return by_normalized[normalized]
+    candidates = [p for n, p in by_normalized.items() if n.endswith("/" + normalized) or normalized.endswith("/" + n)]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def _loads_json(content: str) -> Any:
+    match = _CODE_FENCE_RE.match(content)
+    try:
+        return json.loads(match.group(1) if match else content)
+    except (TypeError, ValueError):
+        return None
+
+
+def _issues_of(value: Any) -> Optional[List[Any]]:
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        for key in ("issues", "findings"):
+            if isinstance(value.get(key), list):
+                return value[key]
+    return None
+
+
+def split_findings_by_file(content: str, paths: Sequence[str]) -> Dict[str, Any]:
+    """
+    把打包请求的响应按文件拆开，返回 {path: 该文件的结果}，只包含响应中出现的文件
+    支持的响应格式：
+    - {"files": [{"path": ..., "issues": [...]}]}（PACKED_REVIEW_INSTRUCTION要求的格式）
+    - {path: [...]} 或 {path: {"issues": [...]}}
+    - 问题列表（或{"issues": [...]}），每个问题带file或path字段；只打包了一个文件时整个列表属于该文件
+    - 文本，按<file path="...">...</file>分段，值为该段文本（段内是JSON时解析为问题列表）
+    路径无法对应到paths中任何文件的结果会被丢弃并记录警告
+    """
+    results: Dict[str, Any] = {}
+
+    def add(path: Any, value: Any) -> None:
+        resolved = _resolve_path(path, paths)
+        if resolved is None:
+            logger.warning(f"Dropping findings for unknown file in packed response: {path!r}")
+            return
+        if isinstance(value, list) and isinstance(results.get(resolved), list):
+            results[resolved].extend(value)
+        else:
+            results[resolved] = value
+
+    data = _loads_json(content)
+    if isinstance(data, dict) and isinstance(data.get("files"), list):
+        for item in data["files"]:
+            if isinstance(item, dict):
+                add(item.get("path") or item.get("file"), _issues_of(item) or [])
+        return results
+    if isinstance(data, dict) and data:
+        if all(_resolve_path(key, paths) for key in data):
+            for key, value in data.items():
+                issues = _issues_of(value)
+                add(key, issues if issues is not None else value)
+            return results
+        issues = _issues_of(data)
+        if issues is not None:
+            data = issues
+    if isinstance(data, list):
+        if len(paths) == 1:
+            # 只有一个文件时整个问题列表都属于它（模型可能省略路径），没有问题时记为空列表而不是缺失
+            results[paths[0]] = [issue for issue in data if isinstance(issue, dict)]
+            return results
+        for issue in data:
+            if isinstance(issue, dict):
+                add(issue.get("file") or issue.get("path"), [issue])
+        return results
+
+    for path, section in _FILE_SECTION_RE.findall(content):
+        issues = _issues_of(_loads_json(section))
+        add(path, issues if issues is not None else section.strip())
+    return results
+
+
+def review_packed_files(
+        client,
+        system_prompt: str,
+        files: Iterable[PackFile],
+        packer: Optional[PromptPacker] = None,
+        project_context: str = "",
+        max_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    打包审查一组文件（如项目级ReviewTask的所有CodeFileVersion），返回 {path: 该文件的问题列表}
+    - 各个包按共享前缀分组发送（dispatch_grouped），最多max_workers个请求并发
+    - 响应中缺失的文件（多为输出被截断）单独再请求一次
+    - 超出上下文窗口的文件分块审查（见code_chunker），在其他包之后发送，此时前缀已在缓存中
+    """
+    from api.agents.code_chunker import review_chunked_file
+
+    packer = packer or PromptPacker(client, system_prompt, project_context)
+    max_workers = max_workers or PACKING_CONFIG.get("max_workers", 4)
+    packs = packer.pack(files)
+    pending = [pack for pack in packs if not pack.oversized]
+    results: Dict[str, Any] = {}
+    retried = False
+    while pending:
+        missing: List[PackFile] = []
+        responses = dispatch_grouped(lambda messages: client.chat_completion(messages, response_format="json"),
+                                     [(packer.layout, pack.render()) for pack in pending], max_workers)
+        for pack, response in zip(pending, responses):
+            findings = split_findings_by_file(response["content"], pack.paths)
+            results.update(findings)
+            missing.extend(file for file in pack.files if file.path not in findings)
+        if retried or not missing:
+            for file in missing:
+                logger.warning(f"No findings returned for {file.path}")
+                results[file.path] = []
+            break
+        # 缺失的文件每个单独成箱重试一次
+        pending = [PromptPack(files=[file], tokens=file.tokens) for file in missing]
+        retried = True
+    for pack in packs:
+        if pack.oversized:
+            results[pack.files[0].path] = review_chunked_file(client, packer, pack.files[0], max_workers=max_workers)
+    return results
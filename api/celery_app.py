@@ -1,15 +1,62 @@
+import logging
 import os
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
 
+from api.common.cache.warmup import save_cache_snapshots
 from api.common.config.celery_config import celery_config
+from api.common.llm_client import prewarm_llm_client
+from api.common.llm_client.response_cache import register_llm_response_snapshot
+from api.common.llm_client.usage_ledger import llm_usage_ledger
 import api.common.tasks     # 导入所有任务，必须保留；同时需要在tasks\__init__.py中导入所有.py文件
 
+logger = logging.getLogger(__name__)
+
 # 全局celery实例
 celery_app = Celery("Code-review")
 celery_app.conf.update(celery_config)
 
 
+def _prewarm_clients():
+    try:
+        # 载入LLM响应内存缓存的快照，并在退出时保存（只有调用LLM的worker进程注册，导入客户端模块不读写快照）
+        register_llm_response_snapshot()
+    except Exception as e:
+        logger.warning(f"Failed to restore LLM response cache snapshot: {e}")
+    try:
+        prewarm_llm_client()
+    except Exception as e:
+        # 预热失败不影响worker启动，第一次使用时会再次尝试创建
+        logger.warning(f"Failed to prewarm LLM client: {e}")
+
+
+@worker_init.connect
+def prewarm_clients_on_worker_init(sender=None, **kwargs):
+    """threads/solo池的任务在主进程中执行，启动时预热；prefork的子进程不继承父进程的客户端，由worker_process_init预热"""
+    if "prefork" not in str(getattr(sender, "pool_cls", "")).lower():
+        _prewarm_clients()
+
+
+@worker_process_init.connect
+def prewarm_clients_on_process_init(**kwargs):
+    _prewarm_clients()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def save_cache_snapshots_on_shutdown(**kwargs):
+    """worker正常退出时保存内存缓存快照；prefork子进程以os._exit退出，不会执行atexit，需要在这里保存"""
+    save_cache_snapshots()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def flush_llm_usage_on_shutdown(**kwargs):
+    """worker退出前把缓冲中的LLM用量记录写入数据库"""
+    llm_usage_ledger.flush()
+
+
 if __name__ == "__main__":
     # 可通过环境变量或命令行指定队列
     queues = os.getenv("CELERY_QUEUES", "default,celery")
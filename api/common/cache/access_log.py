@@ -0,0 +1,82 @@
+# access_log.py
+import logging
+import os
+from collections import Counter
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Union
+
+logger = logging.getLogger(__name__)
+
+
+class AccessLog:
+    """
+    缓存访问日志：按缓存键累计访问次数，每flush_every次访问追加写入一次文本文件（每行“key 次数”）
+    下次启动时按累计次数取最热的key，从共享缓存中读出值预热内存缓存
+    热路径上只有一次字典自增，不加锁；多线程下计数可能有极少量丢失，用于预热足够
+    文件超过max_bytes时合并为每个key一行，并只保留最热的keep_keys个key
+    """
+
+    def __init__(
+            self,
+            path: Union[str, Path],
+            flush_every: int = 10000,
+            max_bytes: int = 64 * 1024 * 1024,
+            keep_keys: int = 100000
+    ):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.max_bytes = max_bytes
+        self.keep_keys = keep_keys
+        self._counts: Dict[str, int] = {}
+        self._pending = 0
+        self._flush_lock = Lock()
+
+    def record(self, key: str) -> None:
+        counts = self._counts
+        counts[key] = counts.get(key, 0) + 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            counts, self._counts = self._counts, {}
+            self._pending = 0
+            if not counts:
+                return
+            try:
+                # 第一次写入时才创建目录，只导入缓存模块的进程不会在磁盘上留下目录
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # 一次write追加整批记录，多个进程追加同一个文件时各批记录不会交错
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(f"{key} {count}\n" for key, count in counts.items()))
+                if self.path.stat().st_size > self.max_bytes:
+                    self._compact()
+            except OSError as e:
+                logger.warning(f"Failed to write cache access log {self.path}: {e}")
+
+    def _compact(self) -> None:
+        totals = self.read_counts(self.path).most_common(self.keep_keys)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(f"{key} {count}\n" for key, count in totals))
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def read_counts(path: Union[str, Path]) -> Counter:
+        """读取日志中每个key的累计访问次数，忽略格式错误的行（如进程崩溃时写了一半的行）"""
+        counts: Counter = Counter()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    key, _, count = line.rstrip("\n").rpartition(" ")
+                    if key and count.isdigit():
+                        counts[key] += int(count)
+        except FileNotFoundError:
+            pass
+        return counts
+
+    @classmethod
+    def hottest_keys(cls, path: Union[str, Path], top_n: int) -> List[str]:
+        return [key for key, _ in cls.read_counts(path).most_common(top_n)]
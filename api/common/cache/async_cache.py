@@ -0,0 +1,73 @@
+# async_cache.py
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Callable, Optional
+
+# CACHE_MISS、CacheBackend定义在cache_manager中，cache_manager反过来依赖本模块，这里只按约定访问同步后端的方法
+
+
+async def run_blocking(fn: Callable[..., Any], *args, executor: Optional[Executor] = None, **kwargs) -> Any:
+    """在线程池中执行阻塞调用，避免磁盘/网络I/O卡住事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+
+
+class AsyncCacheBackend(ABC):
+    """
+    异步缓存后端抽象基类，方法语义与CacheBackend一一对应：alookup未命中时返回CACHE_MISS
+    同时实现CacheBackend与本类的后端（如RedisCacheBackend）既可用于同步函数，也可用于协程
+    """
+
+    @abstractmethod
+    async def alookup(self, key: str) -> Any:
+        pass
+
+    @abstractmethod
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        pass
+
+    @abstractmethod
+    async def adelete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def aexists(self, key: str) -> bool:
+        pass
+
+
+class AsyncBackendAdapter(AsyncCacheBackend):
+    """
+    把同步后端包装成异步后端
+    后端的blocking_io为True（文件、SQLite等）时放到executor线程池中执行，
+    为False（纯内存，只有短暂的锁竞争）时直接在事件循环中调用，省去线程切换的开销
+    """
+
+    def __init__(self, backend, executor: Optional[Executor] = None):
+        self.backend = backend
+        self.executor = executor
+
+    async def _call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        if not getattr(self.backend, "blocking_io", True):
+            return fn(*args, **kwargs)
+        return await run_blocking(fn, *args, executor=self.executor, **kwargs)
+
+    async def alookup(self, key: str) -> Any:
+        return await self._call(self.backend.lookup, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await self._call(self.backend.set, key, value, ttl=ttl)
+
+    async def adelete(self, key: str) -> None:
+        await self._call(self.backend.delete, key)
+
+    async def aexists(self, key: str) -> bool:
+        return await self._call(self.backend.exists, key)
+
+
+def as_async_backend(backend, executor: Optional[Executor] = None) -> AsyncCacheBackend:
+    """原生异步后端原样返回，同步后端包装为AsyncBackendAdapter"""
+    if isinstance(backend, AsyncCacheBackend):
+        return backend
+    return AsyncBackendAdapter(backend, executor=executor)
@@ -0,0 +1,190 @@
+# cache_key.py
+import hashlib
+import inspect
+import logging
+import struct
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 参数指纹函数：把参数值映射为一段稳定的摘要（str或bytes），替代对完整参数的序列化
+Fingerprint = Callable[[Any], Union[str, bytes]]
+
+_LEN = struct.Struct("<Q")
+
+
+def _feed(update: Callable[[bytes], None], obj: Any):
+    """
+    把参数按类型标签 + 长度前缀的方式增量写入哈希器，不需要先序列化成完整字符串，
+    长度前缀保证不同结构的参数不会拼接出相同的字节流
+    """
+    if isinstance(obj, str):
+        data = obj.encode("utf-8", "surrogatepass")
+        update(b"s" + _LEN.pack(len(data)))
+        update(data)
+    elif isinstance(obj, bytes):
+        update(b"b" + _LEN.pack(len(obj)))
+        update(obj)
+    elif obj is None or isinstance(obj, (bool, int, float)):
+        data = repr(obj).encode()
+        update(b"n" + _LEN.pack(len(data)) + data)
+    elif isinstance(obj, (list, tuple)):
+        update(b"l" + _LEN.pack(len(obj)))
+        for item in obj:
+            _feed(update, item)
+    elif isinstance(obj, dict):
+        update(b"d" + _LEN.pack(len(obj)))
+        for key in sorted(obj, key=str):
+            _feed(update, str(key))
+            _feed(update, obj[key])
+    elif isinstance(obj, (set, frozenset)):
+        _feed(update, sorted(obj, key=repr))
+    else:
+        # 类实例：优先使用对象自己声明的cache_namespace（如模型名 + 配置版本），否则使用类全名
+        namespace = getattr(obj, "cache_namespace", None)
+        if not isinstance(namespace, str):
+            namespace = f"{obj.__class__.__module__}.{obj.__class__.__qualname__}"
+        data = namespace.encode("utf-8")
+        update(b"o" + _LEN.pack(len(data)))
+        update(data)
+
+
+class _DigestMemo:
+    """
+    文本摘要的有界备忘录，同一个字符串对象的哈希值由CPython缓存，重复查找是O(1)
+    备忘录以完整文本为键，因此按文本总字符数限制占用，而不只是条目数；容量满时整体清空，避免维护LRU顺序的开销
+    超过max_text_chars的文本（如整个源文件）不进入备忘录，每次重新计算摘要，只保留调用方需要的摘要本身
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 4096,
+            max_chars: int = 4 * 1024 * 1024,
+            max_text_chars: int = 64 * 1024,
+            digest_size: int = 16
+    ):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.max_text_chars = max_text_chars
+        self.digest_size = digest_size
+        self._memo: Dict[str, bytes] = {}
+        self._chars = 0
+        self._lock = Lock()
+
+    def _compute(self, text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=self.digest_size).digest()
+
+    def digest(self, text: str) -> bytes:
+        if len(text) > self.max_text_chars:
+            return self._compute(text)
+        value = self._memo.get(text)
+        if value is None:
+            value = self._compute(text)
+            with self._lock:
+                if len(self._memo) >= self.max_entries or self._chars + len(text) > self.max_chars:
+                    self._memo.clear()
+                    self._chars = 0
+                if text not in self._memo:
+                    self._memo[text] = value
+                    self._chars += len(text)
+        return value
+
+
+_text_digest_memo = _DigestMemo()
+
+
+def fingerprint_text(text: str) -> bytes:
+    """大文本参数的指纹：内容摘要只计算一次，之后直接复用"""
+    return _text_digest_memo.digest(text)
+
+
+def fingerprint_messages(messages: List[Dict[str, Any]]) -> bytes:
+    """
+    chat messages的指纹：逐条消息使用(角色, 内容摘要)，同一个系统提示词在多次调用间只哈希一次
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for message in messages:
+        for field in sorted(message):
+            value = message[field]
+            _feed(hasher.update, field)
+            if isinstance(value, str):
+                hasher.update(b"h" + fingerprint_text(value))
+            else:
+                _feed(hasher.update, value)
+        hasher.update(b"|")
+    return hasher.digest()
+
+
+class CacheKeyBuilder:
+    """
+    可插拔的缓存键生成器
+    - algorithm：hashlib算法，默认blake2b（比md5更快且可设置摘要长度）
+    - namespace：全局命名空间，如"llm_responses:v1"，升级提示词或数据格式时修改即可整体失效
+    - fingerprints：{参数名: 指纹函数}，对指定参数使用指纹代替完整内容参与哈希
+    - ignore：不参与缓存键的参数名，如重试次数等不影响结果的参数
+    键中包含被装饰函数的全名；参数按函数签名绑定并补全默认值，因此位置参数/关键字参数的不同写法得到同一个键
+    """
+
+    def __init__(
+            self,
+            algorithm: str = "blake2b",
+            digest_size: int = 16,
+            namespace: str = "",
+            fingerprints: Optional[Dict[str, Fingerprint]] = None,
+            ignore: Optional[Iterable[str]] = None
+    ):
+        self.algorithm = algorithm
+        self.digest_size = digest_size
+        self.namespace = namespace
+        self.fingerprints = fingerprints or {}
+        self.ignore = frozenset(ignore or ())
+        hashlib.new(algorithm)      # 尽早暴露不支持的算法
+
+    def _new_hasher(self):
+        if self.algorithm in ("blake2b", "blake2s"):
+            return hashlib.new(self.algorithm, digest_size=self.digest_size)
+        return hashlib.new(self.algorithm)
+
+    def bind(self, func: Callable, func_id: Optional[str] = None) -> Callable[..., str]:
+        """
+        为被装饰函数生成 make_key(*args, **kwargs) -> str
+        func_id默认为函数全名；同步/异步两个实现需要共享缓存条目时传入相同的func_id
+        """
+        func_id = func_id or f"{func.__module__}.{func.__qualname__}"
+        try:
+            signature = inspect.signature(func)
+        except (TypeError, ValueError):
+            signature = None
+
+        def make_key(*args, **kwargs) -> str:
+            arguments = None
+            if signature is not None:
+                try:
+                    bound = signature.bind(*args, **kwargs)
+                    bound.apply_defaults()
+                    arguments = bound.arguments
+                except TypeError:
+                    # 参数与签名不匹配时交给被装饰函数自己报错，这里退回按原样哈希
+                    arguments = None
+            hasher = self._new_hasher()
+            update = hasher.update
+            _feed(update, self.namespace)
+            _feed(update, func_id)
+            if arguments is None:
+                _feed(update, args)
+                _feed(update, kwargs)
+                return hasher.hexdigest()
+            for name, value in arguments.items():
+                if name in self.ignore:
+                    continue
+                _feed(update, name)
+                fingerprint = self.fingerprints.get(name)
+                if fingerprint is not None:
+                    update(b"f")
+                    _feed(update, fingerprint(value))
+                else:
+                    _feed(update, value)
+            return hasher.hexdigest()
+
+        return make_key
@@ -1,18 +1,36 @@
 # cache_manager.py
 import hashlib
+import heapq
+import inspect
 import json
 import logging
+import os
 import pickle
+import struct
 import time
+import uuid
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import nullcontext
 from dataclasses import dataclass
-from functools import wraps
+from concurrent.futures import Executor
+from functools import partial, wraps
 from pathlib import Path
-from threading import Lock
-from typing import Any, Optional, Union, List
+from threading import Event, Lock, Thread, get_ident
+from typing import Any, Optional, Union, List, Tuple, Callable, ContextManager, Iterator, Dict, Iterable, Awaitable
+
+from api.common.cache.access_log import AccessLog
+from api.common.cache.async_cache import as_async_backend, run_blocking
+from api.common.cache.cache_key import CacheKeyBuilder
+from api.common.cache.cache_stats import DIRECT_ACCESS, CacheStats
+from api.common.cache.codec import ValueCodec
+from api.common.cache.singleflight import AsyncSingleFlight, FileLock, SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# 缓存未命中的哨兵对象，用于和“缓存了None值”的情况区分
+CACHE_MISS = object()
+
 
 @dataclass
 class CacheEntry:
@@ -20,6 +38,10 @@ class CacheEntry:
     value: Any
     created_at: float
     ttl: Optional[int] = None       # 过期时间，None默认永不过期
+    hits: int = 0                   # 命中次数，快照时按此挑选最热的条目
+
+    def expire_at(self) -> Optional[float]:
+        return None if self.ttl is None else self.created_at + self.ttl
 
     def is_expired(self) -> bool:
         return self.ttl is not None and self.created_at + self.ttl < time.time()
@@ -28,6 +50,11 @@ class CacheEntry:
 class CacheBackend(ABC):
     """缓存后端抽象基类"""
 
+    # 读写是否涉及阻塞的磁盘/网络I/O，为True时被装饰的协程会把缓存读写放到线程池中执行
+    blocking_io = True
+    # 数据是否在进程间共享（磁盘、SQLite、Redis），为False时写入与标签失效只在当前进程内可见
+    process_shared = False
+
     @abstractmethod
     def get(self, key: str) -> Optional[Any]:
         pass
@@ -44,102 +71,399 @@ class CacheBackend(ABC):
     def exists(self, key: str) -> bool:
         pass
 
+    def lookup(self, key: str) -> Any:
+        """
+        单次读取缓存，未命中时返回CACHE_MISS
+        默认实现仅在get返回None时才额外调用exists，子类应尽量覆盖为一次读取
+        """
+        value = self.get(key)
+        if value is None and not self.exists(key):
+            return CACHE_MISS
+        return value
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """批量读取，只返回命中的key；支持批量操作的后端应覆盖为一次往返"""
+        result = {}
+        for key in keys:
+            value = self.lookup(key)
+            if value is not CACHE_MISS:
+                result[key] = value
+        return result
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        """批量写入，所有条目使用相同的TTL"""
+        for key, value in items.items():
+            self.set(key, value, ttl=ttl)
+
+    @property
+    def metrics(self) -> CacheStats:
+        """观测计数器，首次访问时创建（子类无需调用基类__init__）"""
+        metrics = self.__dict__.get("_metrics")
+        if metrics is None:
+            metrics = self.__dict__.setdefault("_metrics", CacheStats())
+        return metrics
+
+    def bytes_stored(self) -> Optional[int]:
+        """当前占用的存储字节数，无法低成本获得时返回None"""
+        return None
+
+    def authoritative_tier(self) -> "CacheBackend":
+        """多级缓存中跨进程共享的那一级，标签代数等需要及时可见的数据直接读写这一级"""
+        return self
+
+    def describe(self) -> Dict[str, Any]:
+        """后端类型、观测计数器快照与存储占用，用于监控接口"""
+        return {
+            "backend": type(self).__name__,
+            "metrics": self.metrics.snapshot(),
+            "bytes_stored": self.bytes_stored(),
+        }
+
+
+# 磁盘缓存文件头：魔数 + 创建时间 + 过期时刻（0表示永不过期），清理过期条目时只需读取文件头
+_FILE_HEADER = struct.Struct("<4sdd")
+_FILE_MAGIC = b"CRC1"
+_TMP_SUFFIX = ".tmp"
+
 
 class FileCacheBackend(CacheBackend):
-    """基于文件系统的缓存后端"""
+    """
+    基于文件系统的缓存后端
+    - 两级目录扇出：<cache_dir>/<key[:2]>/<key[2:4]>/<key>.pkl，避免单目录下文件过多
+    - 先写临时文件再rename，读者不会读到写了一半的文件
+    - process_safe=True时，淘汰与过期清理在目录级咨询锁下进行，多个worker进程可共享同一目录
+    - max_bytes限制总磁盘占用，超出时按最近访问时间（mtime，命中时刷新）淘汰到低水位
+    - janitor_interval不为None时，后台线程定期只读文件头清理过期条目
+    - codec决定值的序列化与压缩方式，默认pickle不压缩
+    """
 
-    def __init__(self, cache_dir: Union[str, Path]):
+    process_shared = True
+
+    def __init__(
+            self,
+            cache_dir: Union[str, Path],
+            max_bytes: Optional[int] = None,
+            process_safe: bool = False,
+            janitor_interval: Optional[float] = None,
+            low_watermark: float = 0.9,
+            durable: bool = False,
+            codec: Optional[ValueCodec] = None
+    ):
         self.cache_dir = Path(cache_dir)
+        self.codec = codec or ValueCodec()
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.process_safe = process_safe
+        self.janitor_interval = janitor_interval
+        self.low_watermark = low_watermark
+        self.durable = durable      # 为True时rename前fsync，保证掉电后数据完整
+        self._lock_path = self.cache_dir / ".lock"
+        self._bytes_lock = Lock()
+        self._total_bytes: Optional[int] = None     # 估算的总字节数，首次需要时扫描目录得到
+        self._janitor: Optional[Thread] = None
+        self._janitor_stop = Event()
 
     def _get_cache_path(self, key: str) -> Path:
-        return self.cache_dir / f"{key}.pkl"
-
-    def get(self, key: str) -> Optional[Any]:
-        cache_file = self._get_cache_path(key)
-        if cache_file.exists():     # 缓存文件是否存在
+        return self.cache_dir / key[:2] / key[2:4] / f"{key}.pkl"
+
+    def _directory_lock(self, blocking: bool = True) -> ContextManager:
+        if not self.process_safe:
+            return nullcontext()
+        return FileLock(self._lock_path, blocking=blocking)
+
+    def _ensure_janitor(self):
+        """首次读写时才启动后台清理线程，避免模块导入阶段就创建线程"""
+        if self.janitor_interval is None or self._janitor is not None:
+            return
+        with self._bytes_lock:
+            if self._janitor is None:
+                self._janitor = Thread(target=self._janitor_loop, name="file-cache-janitor", daemon=True)
+                self._janitor.start()
+
+    def _janitor_loop(self):
+        while not self._janitor_stop.wait(self.janitor_interval):
             try:
-                with open(cache_file, 'rb') as f:
-                    entry: CacheEntry = pickle.load(f)
-                    if not entry.is_expired():  # 缓存文件是否过期，如果没过期返回缓存中的值（文件内容）
-                        return entry.value
-                    else:
-                        cache_file.unlink()     # 缓存过期情况下，删除文件或者链接
+                self.sweep_expired()
             except Exception as e:
-                logger.warning(f"Failed to load cache {key}: {e}")
-                return None
+                logger.warning(f"File cache janitor failed: {e}")
+
+    def close(self) -> None:
+        """停止后台清理线程"""
+        self._janitor_stop.set()
+
+    @staticmethod
+    def _read_header(f) -> Optional[Tuple[float, float]]:
+        """读取文件头，返回(created_at, expire_at)，旧格式文件返回None"""
+        header = f.read(_FILE_HEADER.size)
+        if len(header) == _FILE_HEADER.size:
+            magic, created_at, expire_at = _FILE_HEADER.unpack(header)
+            if magic == _FILE_MAGIC:
+                return created_at, expire_at
+        f.seek(0)
         return None
 
+    def _load(self, cache_file: Path, header_only: bool = False) -> Any:
+        """读取缓存文件，未命中或已过期返回CACHE_MISS；header_only时命中返回True而不反序列化值"""
+        with open(cache_file, 'rb') as f:
+            header = self._read_header(f)
+            if header is None:
+                # 兼容旧格式：整个文件是pickle后的CacheEntry
+                if not self.codec.allow_pickle:
+                    return CACHE_MISS
+                entry: CacheEntry = pickle.load(f)
+                if entry.is_expired():
+                    self.metrics.record_expirations()
+                    return CACHE_MISS
+                return True if header_only else entry.value
+            _, expire_at = header
+            if expire_at and expire_at < time.time():
+                self.metrics.record_expirations()
+                return CACHE_MISS
+            return True if header_only else self.codec.decode(f.read())
+
+    def _touch(self, cache_file: Path):
+        """刷新mtime作为最近访问时间，仅在需要按容量淘汰时进行"""
+        if self.max_bytes is not None:
+            try:
+                os.utime(cache_file)
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.lookup(key)
+        return None if value is CACHE_MISS else value
+
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._ensure_janitor()
         cache_file = self._get_cache_path(key)
+        tmp_file = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.{get_ident()}{_TMP_SUFFIX}")
         try:
-            entry = CacheEntry(value, time.time(), ttl)
-            with open(cache_file, 'wb') as f:
-                pickle.dump(entry, f)
+            now = time.time()
+            payload = self.codec.encode(value)
+            data = _FILE_HEADER.pack(_FILE_MAGIC, now, now + ttl if ttl is not None else 0.0) + payload
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+                if self.durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_file, cache_file)
         except Exception as e:
             logger.warning(f"Failed to save cache {key}: {e}")
+            tmp_file.unlink(missing_ok=True)
+            return
+        self._account_bytes(len(data))
 
     def delete(self, key: str) -> None:
+        self._get_cache_path(key).unlink(missing_ok=True)
+
+    def lookup(self, key: str) -> Any:
+        self._ensure_janitor()
         cache_file = self._get_cache_path(key)
-        if cache_file.exists():
-            cache_file.unlink()
+        try:
+            value = self._load(cache_file)
+        except FileNotFoundError:
+            return CACHE_MISS
+        except Exception as e:
+            logger.warning(f"Failed to load cache {key}: {e}")
+            return CACHE_MISS
+        if value is CACHE_MISS:
+            cache_file.unlink(missing_ok=True)
+        else:
+            self._touch(cache_file)
+        return value
 
     def exists(self, key: str) -> bool:
         cache_file = self._get_cache_path(key)
-        if not cache_file.exists():
-            return False
         try:
-            with open(cache_file, 'rb') as f:
-                entry: CacheEntry = pickle.load(f)
-                if not entry.is_expired():
-                    return True
-                else:
-                    cache_file.unlink()
+            hit = self._load(cache_file, header_only=True)
+        except FileNotFoundError:
+            return False
         except Exception as e:
             logger.warning(f"Failed to load cache {key}: {e}")
-        return False
+            return False
+        if hit is CACHE_MISS:
+            cache_file.unlink(missing_ok=True)
+            return False
+        return True
+
+    def _iter_cache_files(self) -> Iterator[os.DirEntry]:
+        """遍历所有缓存文件（包括旧版平铺在根目录下的文件）"""
+        stack = [self.cache_dir]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(Path(entry.path))
+                        elif entry.name.endswith(".pkl") and not entry.name.startswith("."):
+                            yield entry
+            except FileNotFoundError:
+                continue
+
+    def _account_bytes(self, added: int):
+        """累加写入字节数，超过预算时触发淘汰；覆盖写入不扣减旧文件大小，淘汰时重新扫描校正"""
+        if self.max_bytes is None:
+            return
+        with self._bytes_lock:
+            if self._total_bytes is None:
+                self._total_bytes = self.disk_usage()
+            else:
+                self._total_bytes += added
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict_to_budget()
+
+    def bytes_stored(self) -> Optional[int]:
+        """启用max_bytes时返回跟踪的总字节数，否则需要调用disk_usage()扫描目录"""
+        return self._total_bytes
+
+    def disk_usage(self) -> int:
+        """扫描目录得到当前缓存文件总字节数"""
+        total = 0
+        for entry in self._iter_cache_files():
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+        return total
+
+    def evict_to_budget(self) -> int:
+        """按mtime从旧到新淘汰，直到总大小降到 max_bytes * low_watermark 以下，返回删除的文件数"""
+        if self.max_bytes is None:
+            return 0
+        removed = 0
+        with self._directory_lock():
+            files = []
+            for entry in self._iter_cache_files():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            if total > self.max_bytes:
+                target = self.max_bytes * self.low_watermark
+                files.sort()
+                for _, size, path in files:
+                    if total <= target:
+                        break
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    removed += 1
+            with self._bytes_lock:
+                self._total_bytes = total
+        if removed:
+            self.metrics.record_evictions(removed)
+            logger.info(f"File cache evicted {removed} entries, {total} bytes remain")
+        return removed
+
+    def sweep_expired(self, tmp_max_age: float = 3600) -> int:
+        """
+        清理过期条目：新格式文件只读文件头判断过期时间，同时清理异常退出遗留的临时文件
+        process_safe模式下若其他进程正在清理则直接跳过，返回删除的文件数
+        """
+        removed = 0
+        now = time.time()
+        try:
+            with self._directory_lock(blocking=False):
+                for dirpath, _, filenames in os.walk(self.cache_dir):
+                    for name in filenames:
+                        path = os.path.join(dirpath, name)
+                        try:
+                            if name.endswith(_TMP_SUFFIX):
+                                if os.stat(path).st_mtime + tmp_max_age < now:
+                                    os.unlink(path)
+                                    removed += 1
+                            elif name.endswith(".pkl") and self._load(Path(path), header_only=True) is CACHE_MISS:
+                                os.unlink(path)
+                                removed += 1
+                        except FileNotFoundError:
+                            continue
+                        except Exception as e:
+                            logger.warning(f"Failed to sweep cache file {path}: {e}")
+        except BlockingIOError:
+            return 0
+        if removed:
+            with self._bytes_lock:
+                self._total_bytes = None
+            logger.debug(f"File cache janitor removed {removed} entries")
+        return removed
 
 
 class MemoryCacheBackend(CacheBackend):
-    """基于内存的缓存后端"""
+    """
+    基于内存的缓存后端
+    OrderedDict维护真实的访问顺序（LRU），最小堆维护过期时间，get/set均摊O(1)，
+    过期条目在访问时惰性删除，或者在写入时按堆顶批量回收
+    """
+    blocking_io = False
 
-    def __init__(self, max_size: int = 1000):
-        self._cache = {}
+    def __init__(self, max_size: int = 1000, reap_batch_size: int = 64):
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []     # (过期时刻, key)，可能包含已失效的旧记录
         self.max_size = max_size
+        self.reap_batch_size = reap_batch_size      # 每次写入最多回收的过期条目数
         self._lock = Lock()     # 线程安全锁
 
-    def _cleanup_expired_entries(self):
-        """清理过期的缓存条目"""
-        expired_keys = [key for key, entry in self._cache.items() if entry.is_expired()]
-        for key in expired_keys:
-            del self._cache[key]
+    def _reap_expired(self, now: float, limit: Optional[int] = None):
+        """从堆顶开始回收已过期的条目，limit为None时回收全部"""
+        heap = self._expiry_heap
+        reaped = 0
+        while heap and heap[0][0] < now and (limit is None or reaped < limit):
+            expire_at, key = heapq.heappop(heap)
+            entry = self._cache.get(key)
+            # 堆中记录可能已经因为覆盖写入或删除而失效，只有过期时刻一致时才删除
+            if entry is not None and entry.expire_at() == expire_at:
+                del self._cache[key]
+                reaped += 1
+        if reaped:
+            self.metrics.record_expirations(reaped)
+
+    def _compact_heap(self):
+        """堆中失效记录过多时重建堆，避免覆盖写入导致堆无限增长"""
+        if len(self._expiry_heap) > 2 * len(self._cache) + self.reap_batch_size:
+            self._expiry_heap = [(entry.expire_at(), key) for key, entry in self._cache.items()
+                                 if entry.ttl is not None]
+            heapq.heapify(self._expiry_heap)
 
     def _evict_lru(self):
-        """缓存满时移除最不常用的缓存条目"""
-        if len(self._cache) > self.max_size:
-            oldest_keys = min(self._cache.keys(), key=lambda k: self._cache[k].created_at)
-            del self._cache[oldest_keys]
+        """缓存满时移除最久未被访问的缓存条目"""
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+            self.metrics.record_evictions()
 
     def get(self, key: str) -> Optional[Any]:
+        value = self.lookup(key)
+        return None if value is CACHE_MISS else value
+
+    def lookup(self, key: str) -> Any:
         with self._lock:
-            self._cleanup_expired_entries()
-            if key in self._cache:
-                entry = self._cache[key]
-                if not entry.is_expired():
-                    return entry.value
-                else:
-                    self.delete(key)
-        return None
+            entry = self._cache.get(key)
+            if entry is None:
+                return CACHE_MISS
+            if entry.is_expired():
+                del self._cache[key]
+                self.metrics.record_expirations()
+                return CACHE_MISS
+            self._cache.move_to_end(key)
+            entry.hits += 1
+            return entry.value
 
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         with self._lock:
-            self._cleanup_expired_entries()
+            now = time.time()
+            self._reap_expired(now, limit=self.reap_batch_size)
+            entry = CacheEntry(value=value, created_at=now, ttl=ttl)
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            if ttl is not None:
+                heapq.heappush(self._expiry_heap, (entry.expire_at(), key))
             self._evict_lru()
-            self._cache[key] = CacheEntry(
-                value=value,
-                created_at=time.time(),
-                ttl=ttl
-            )
+            self._compact_heap()
 
     def delete(self, key: str) -> None:
         with self._lock:
@@ -147,8 +471,115 @@ class MemoryCacheBackend(CacheBackend):
 
     def exists(self, key: str) -> bool:
         with self._lock:
-            self._cleanup_expired_entries()
-            return key in self._cache and not self._cache[key].is_expired()
+            entry = self._cache.get(key)
+            if entry is None:
+                return False
+            if entry.is_expired():
+                del self._cache[key]
+                self.metrics.record_expirations()
+                return False
+            return True
+
+    def cleanup_expired(self) -> None:
+        """一次性回收所有过期条目，可由定时任务调用"""
+        with self._lock:
+            self._reap_expired(time.time())
+            self._compact_heap()
+
+    def hottest(self, top_n: int) -> List[Tuple[str, CacheEntry]]:
+        """按命中次数返回最热的top_n个未过期条目，用于生成快照"""
+        with self._lock:
+            live = [(key, entry) for key, entry in self._cache.items() if not entry.is_expired()]
+        return heapq.nlargest(top_n, live, key=lambda item: item[1].hits)
+
+    def restore_entries(self, entries: Iterable[Tuple[str, CacheEntry]]) -> int:
+        """
+        载入快照中的条目，保留原来的创建时间和TTL（剩余寿命不变），跳过已过期和已存在的key
+        按命中次数从低到高插入，使最热的条目处于LRU的最新端
+        """
+        restored = 0
+        with self._lock:
+            for key, entry in sorted(entries, key=lambda item: item[1].hits):
+                if key in self._cache or entry.is_expired():
+                    continue
+                self._cache[key] = entry
+                if entry.ttl is not None:
+                    heapq.heappush(self._expiry_heap, (entry.expire_at(), key))
+                restored += 1
+            self._evict_lru()
+            self._compact_heap()
+        return restored
+
+    def describe(self) -> Dict[str, Any]:
+        description = super().describe()
+        description["entries"] = len(self._cache)
+        return description
+
+
+class ShardedMemoryCacheBackend(CacheBackend):
+    """
+    分段锁的内存缓存后端，适用于 --pool=threads 的Celery worker
+    按key的哈希值将条目分散到num_shards个独立的MemoryCacheBackend中，每个分段有自己的锁和LRU，
+    不同分段上的访问互不阻塞
+    """
+    blocking_io = False
+
+    def __init__(self, max_size: int = 1000, num_shards: int = 16):
+        if num_shards <= 0:
+            raise ValueError("num_shards must be positive")
+        self.max_size = max_size
+        self.num_shards = num_shards
+        shard_size = max(1, -(-max_size // num_shards))     # 向上取整，保证总容量不小于max_size
+        self._shards = [MemoryCacheBackend(max_size=shard_size) for _ in range(num_shards)]
+        for shard in self._shards:
+            shard.__dict__["_metrics"] = self.metrics      # 所有分段共享同一组计数器
+
+    def _get_shard(self, key: str) -> MemoryCacheBackend:
+        return self._shards[hash(key) % self.num_shards]
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._get_shard(key).get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._get_shard(key).set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self._get_shard(key).delete(key)
+
+    def exists(self, key: str) -> bool:
+        return self._get_shard(key).exists(key)
+
+    def lookup(self, key: str) -> Any:
+        return self._get_shard(key).lookup(key)
+
+    def cleanup_expired(self) -> None:
+        for shard in self._shards:
+            shard.cleanup_expired()
+
+    def hottest(self, top_n: int) -> List[Tuple[str, CacheEntry]]:
+        candidates = [item for shard in self._shards for item in shard.hottest(top_n)]
+        return heapq.nlargest(top_n, candidates, key=lambda item: item[1].hits)
+
+    def restore_entries(self, entries: Iterable[Tuple[str, CacheEntry]]) -> int:
+        by_shard: Dict[int, List[Tuple[str, CacheEntry]]] = {}
+        for key, entry in entries:
+            by_shard.setdefault(hash(key) % self.num_shards, []).append((key, entry))
+        return sum(self._shards[index].restore_entries(items) for index, items in by_shard.items())
+
+    def describe(self) -> Dict[str, Any]:
+        description = super().describe()
+        description["entries"] = sum(len(shard._cache) for shard in self._shards)
+        return description
+
+
+def build_memory_backend(max_size: int = 1000, num_shards: int = 1) -> CacheBackend:
+    """
+    内存缓存后端：默认使用单锁的MemoryCacheBackend（全局LRU）；num_shards大于1时使用分段锁的ShardedMemoryCacheBackend
+    分段锁只在几十个线程同时访问时才有收益（见benchmarks/bench_sharded_cache），并且LRU变为按分段淘汰
+    """
+    if num_shards > 1:
+        return ShardedMemoryCacheBackend(max_size=max_size, num_shards=num_shards)
+    return MemoryCacheBackend(max_size=max_size)
 
 
 def _is_class_instance(obj: Any) -> bool:
@@ -224,34 +655,242 @@ def get_cache_key(*args, **kwargs) -> str:
         return hashlib.md5(fallback_key.encode("utf-8")).hexdigest()
 
 
-class CacheManager:
-    """通用缓存管理器（装饰器类）"""
-    def __init__(self, backend: CacheBackend):
+class TagGenerations:
+    """
+    标签（命名空间）的代数计数器，用于批量失效：
+    缓存键中混入所有标签的当前代数，bump一个标签只需写入一个新的代数值，该标签下的所有旧条目即不再被命中，
+    旧条目随TTL/LRU/后台清理被惰性回收
+    代数值存放在缓存后端中（共享后端时多进程可见），本地按refresh_interval秒缓存以减少后端读取；
+    代数丢失（如被LRU淘汰）时生成新的代数，只会导致多失效而不会返回旧数据
+    """
+
+    def __init__(self, backend: CacheBackend, refresh_interval: float = 1.0):
         self.backend = backend
+        self.refresh_interval = refresh_interval
+        self._local: Dict[str, Tuple[str, float]] = {}     # tag -> (代数, 读取时刻)
+
+    @staticmethod
+    def _generation_key(tag: str) -> str:
+        # 标签可能包含":"、"/"等字符，哈希后作为后端key（文件后端会把key用作文件名）
+        return "taggen" + hashlib.blake2b(tag.encode("utf-8"), digest_size=16).hexdigest()
+
+    def current(self, tag: str) -> str:
+        now = time.monotonic()
+        cached = self._local.get(tag)
+        if cached is not None and now - cached[1] < self.refresh_interval:
+            return cached[0]
+        generation = self.backend.lookup(self._generation_key(tag))
+        if generation is CACHE_MISS:
+            return self.bump(tag)
+        self._local[tag] = (generation, now)
+        return generation
+
+    def bump(self, tag: str) -> str:
+        generation = uuid.uuid4().hex
+        self.backend.set(self._generation_key(tag), generation, ttl=None)
+        self._local[tag] = (generation, time.monotonic())
+        return generation
+
+    def apply(self, cache_key: str, tags: Iterable[str]) -> str:
+        """把标签代数混入缓存键"""
+        hasher = hashlib.blake2b(cache_key.encode("utf-8"), digest_size=16)
+        for tag in sorted(set(tags)):
+            hasher.update(f"|{tag}={self.current(tag)}".encode("utf-8"))
+        return hasher.hexdigest()
+
 
-    def cached(self, ttl: Optional[int] = None):
-        """缓存装饰器"""
+class CacheManager:
+    """
+    通用缓存管理器（装饰器类）
+    coalesce=True时，同一进程内对同一个key的并发未命中只会由第一个调用者执行被装饰函数，其余调用者等待其结果；
+    传入process_lock（key -> 上下文管理器，如file_lock_factory/redis_lock_factory）后，多个进程之间也会合并
+    enabled=False时cached装饰器直接返回原函数（对应配置中的 enabled: false）
+    key_builder为None时使用兼容旧版本的get_cache_key生成缓存键
+    指定name时注册到全局，监控接口通过get_cache_managers()导出各缓存的观测数据
+    cached(tags=...)为缓存条目打上标签，invalidate_tags()以O(1)代价使某个标签下的全部条目失效
+    cached也可以装饰协程函数：后端实现了AsyncCacheBackend时直接await其异步方法，否则阻塞型后端的读写
+    放到executor线程池中执行；并发await同一个key时只执行一次协程。process_lock只作用于同步函数
+    传入access_log后记录被装饰函数的每次缓存访问，供下次启动时预热内存缓存
+    """
+    def __init__(
+            self,
+            backend: CacheBackend,
+            coalesce: bool = True,
+            process_lock: Optional[Callable[[str], ContextManager]] = None,
+            enabled: bool = True,
+            key_builder: Optional[CacheKeyBuilder] = None,
+            name: Optional[str] = None,
+            executor: Optional[Executor] = None,
+            access_log: Optional[AccessLog] = None
+    ):
+        self.backend = backend
+        self.async_backend = as_async_backend(backend, executor=executor)
+        self.executor = executor
+        self.access_log = access_log
+        self.enabled = enabled
+        self.key_builder = key_builder
+        self.coalesce = coalesce
+        self.process_lock = process_lock
+        self.name = name
+        self.tag_generations = TagGenerations(backend.authoritative_tier())
+        self._single_flight = SingleFlight()
+        self._async_single_flight = AsyncSingleFlight()
+        if name is not None:
+            _cache_managers[name] = self
+
+    def _compute_and_store(self, cache_key: str, compute: Callable[[], Any], ttl: Optional[int], label: str) -> Any:
+        result = compute()
+        self.backend.set(cache_key, result, ttl=ttl)
+        self.backend.metrics.record_set(label)
+        return result
+
+    def _compute_coalesced(self, cache_key: str, compute: Callable[[], Any], ttl: Optional[int], label: str) -> Any:
+        if self.process_lock is None:
+            return self._compute_and_store(cache_key, compute, ttl, label)
+        with self.process_lock(cache_key):
+            # 拿到跨进程锁后再查一次缓存，其他进程可能刚刚写入
+            value = self.backend.lookup(cache_key)
+            if value is not CACHE_MISS:
+                return value
+            return self._compute_and_store(cache_key, compute, ttl, label)
+
+    async def _acompute_and_store(
+            self,
+            cache_key: str,
+            compute: Callable[[], Awaitable[Any]],
+            ttl: Optional[int],
+            label: str
+    ) -> Any:
+        result = await compute()
+        await self.async_backend.aset(cache_key, result, ttl=ttl)
+        self.backend.metrics.record_set(label)
+        return result
+
+    def cached(
+            self,
+            ttl: Optional[int] = None,
+            key_builder: Optional[CacheKeyBuilder] = None,
+            tags: Optional[Union[Iterable[str], Callable[..., Iterable[str]]]] = None,
+            cache_id: Optional[str] = None
+    ):
+        """
+        缓存装饰器，key_builder优先于管理器级别的key_builder
+        tags为固定的标签列表，或者接收与被装饰函数相同参数、返回标签列表的函数（如按模型名、项目ID打标签）
+        被装饰函数带有make_cache_key属性，可在外部计算与装饰器一致的缓存键（已包含标签代数）
+        cache_id替代函数全名参与缓存键（需要key_builder），签名相同的同步/异步实现据此共享缓存条目
+        """
         def decorator(func):
+            if not self.enabled:
+                return func
+            builder = key_builder or self.key_builder
+            make_base_key = builder.bind(func, func_id=cache_id) if builder is not None else get_cache_key
+            label = func.__qualname__
+            metrics = self.backend.metrics
+            static_tags = None if tags is None or callable(tags) else tuple(tags)
+
+            def make_key(*args, **kwargs) -> str:
+                cache_key = make_base_key(*args, **kwargs)
+                if tags is None:
+                    return cache_key
+                resolved = static_tags if static_tags is not None else tags(*args, **kwargs)
+                return self.tag_generations.apply(cache_key, resolved)
+
+            if inspect.iscoroutinefunction(func):
+                # 标签代数缓存过期后需要读后端，阻塞型后端上计算缓存键也放到线程池中
+                offload_key = tags is not None and self.backend.blocking_io
+
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if offload_key:
+                        cache_key = await run_blocking(make_key, *args, executor=self.executor, **kwargs)
+                    else:
+                        cache_key = make_key(*args, **kwargs)
+                    if self.access_log is not None:
+                        self.access_log.record(cache_key)
+                    start = time.perf_counter_ns()
+                    value = await self.async_backend.alookup(cache_key)
+                    hit = value is not CACHE_MISS
+                    metrics.record_lookup(label, hit, time.perf_counter_ns() - start)
+                    if hit:
+                        logger.debug(f"Cache hit for key: {cache_key[:8]}...")
+                        return value
+                    compute = partial(self._acompute_and_store, cache_key, lambda: func(*args, **kwargs), ttl, label)
+                    if not self.coalesce:
+                        return await compute()
+                    return await self._async_single_flight.do(cache_key, compute)
+                async_wrapper.make_cache_key = make_key
+                return async_wrapper
+
             @wraps(func)
             def wrapper(*args, **kwargs):
-                cache_key = get_cache_key(*args, **kwargs)
-                if self.backend.exists(cache_key):
+                cache_key = make_key(*args, **kwargs)
+                if self.access_log is not None:
+                    self.access_log.record(cache_key)
+                start = time.perf_counter_ns()
+                value = self.backend.lookup(cache_key)
+                hit = value is not CACHE_MISS
+                metrics.record_lookup(label, hit, time.perf_counter_ns() - start)
+                if hit:
                     logger.debug(f"Cache hit for key: {cache_key[:8]}...")
-                    return self.backend.get(cache_key)
-                result = func(*args, **kwargs)
-                self.backend.set(cache_key, result, ttl=ttl)
-                return result
+                    return value
+                if not self.coalesce:
+                    return self._compute_and_store(cache_key, lambda: func(*args, **kwargs), ttl, label)
+                return self._single_flight.do(
+                    cache_key,
+                    lambda: self._compute_coalesced(cache_key, lambda: func(*args, **kwargs), ttl, label)
+                )
+            wrapper.make_cache_key = make_key
             return wrapper
         return decorator
 
+    def invalidate_tags(self, *tags: str) -> None:
+        """使带有任一标签的全部缓存条目失效"""
+        for tag in tags:
+            self.tag_generations.bump(tag)
+            logger.info(f"Cache tag invalidated: {tag}")
+
+    def describe(self) -> Dict[str, Any]:
+        description = self.backend.describe()
+        description["enabled"] = self.enabled
+        return description
+
     def get(self, key: str) -> Optional[Any]:
         return self.backend.get(key)
 
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, label: str = DIRECT_ACCESS) -> None:
+        self.backend.metrics.record_set(label)
         return self.backend.set(key, value, ttl=ttl)
 
+    def lookup(self, key: str, label: str = DIRECT_ACCESS) -> Any:
+        """
+        读取缓存，未命中时返回CACHE_MISS，并按label记录命中与延迟
+        用于装饰器之外按make_cache_key读写同一缓存条目的场景（如流式响应）
+        """
+        start = time.perf_counter_ns()
+        value = self.backend.lookup(key)
+        self.backend.metrics.record_lookup(label, value is not CACHE_MISS, time.perf_counter_ns() - start)
+        return value
+
+    async def alookup(self, key: str, label: str = DIRECT_ACCESS) -> Any:
+        start = time.perf_counter_ns()
+        value = await self.async_backend.alookup(key)
+        self.backend.metrics.record_lookup(label, value is not CACHE_MISS, time.perf_counter_ns() - start)
+        return value
+
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None, label: str = DIRECT_ACCESS) -> None:
+        self.backend.metrics.record_set(label)
+        await self.async_backend.aset(key, value, ttl=ttl)
+
     def delete(self, key: str) -> None:
         return self.backend.delete(key)
 
     def exists(self, key: str) -> bool:
         return self.backend.exists(key)
+
+
+# 已命名的缓存管理器，name -> CacheManager
+_cache_managers: Dict[str, CacheManager] = {}
+
+
+def get_cache_managers() -> Dict[str, CacheManager]:
+    return dict(_cache_managers)
@@ -0,0 +1,143 @@
+# cache_stats.py
+from typing import Any, Dict, List, Optional
+
+# 不区分被装饰函数的直接读写（CacheManager.get/set）使用的标签
+DIRECT_ACCESS = "<direct>"
+
+
+class _FunctionStats:
+    """单个被装饰函数的计数器，延迟样本使用固定大小的环形缓冲区"""
+    __slots__ = ("hits", "misses", "sets", "latency_ns", "samples")
+
+    def __init__(self, sample_size: int):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.latency_ns: List[int] = [0] * sample_size
+        self.samples = 0
+
+
+def _percentile(sorted_values: List[int], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return float(sorted_values[index])
+
+
+class CacheStats:
+    """
+    缓存后端的观测计数器：命中/未命中/写入（按被装饰函数区分）、淘汰、过期、查询延迟分位数
+    热路径上只有字典查找和整数自增，不加锁；多线程下计数可能有极少量丢失，用于观测足够
+    """
+
+    def __init__(self, latency_sample_size: int = 1024):
+        self.latency_sample_size = latency_sample_size
+        self.evictions = 0
+        self.expirations = 0
+        self._functions: Dict[str, _FunctionStats] = {}
+
+    def _function(self, function: str) -> _FunctionStats:
+        stats = self._functions.get(function)
+        if stats is None:
+            stats = self._functions.setdefault(function, _FunctionStats(self.latency_sample_size))
+        return stats
+
+    def record_lookup(self, function: str, hit: bool, latency_ns: int) -> None:
+        stats = self._function(function)
+        if hit:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+        stats.latency_ns[stats.samples % self.latency_sample_size] = latency_ns
+        stats.samples += 1
+
+    def record_set(self, function: str) -> None:
+        self._function(function).sets += 1
+
+    def record_evictions(self, count: int = 1) -> None:
+        self.evictions += count
+
+    def record_expirations(self, count: int = 1) -> None:
+        self.expirations += count
+
+    def snapshot(self) -> Dict[str, Any]:
+        functions = {}
+        for name, stats in list(self._functions.items()):
+            samples = sorted(stats.latency_ns[:min(stats.samples, self.latency_sample_size)])
+            lookups = stats.hits + stats.misses
+            functions[name] = {
+                "hits": stats.hits,
+                "misses": stats.misses,
+                "sets": stats.sets,
+                "hit_ratio": stats.hits / lookups if lookups else 0.0,
+                "latency_us": {
+                    "p50": _percentile(samples, 0.5) / 1000,
+                    "p95": _percentile(samples, 0.95) / 1000,
+                    "p99": _percentile(samples, 0.99) / 1000,
+                },
+            }
+        return {
+            "hits": sum(f["hits"] for f in functions.values()),
+            "misses": sum(f["misses"] for f in functions.values()),
+            "sets": sum(f["sets"] for f in functions.values()),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "functions": functions,
+        }
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def to_prometheus(
+        caches: Dict[str, Dict[str, Any]],
+        prefix: str = "code_review_cache",
+        extra_labels: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    把 {缓存名: CacheManager.describe()} 转换为Prometheus文本格式（exposition format 0.0.4）
+    计数器只覆盖一个进程，extra_labels（如pid）附加到每个样本上，多个进程的指标可以区分后再汇总
+    """
+    lines = [
+        f"# HELP {prefix}_lookups_total Cache lookups by decorated function and result.",
+        f"# TYPE {prefix}_lookups_total counter",
+    ]
+    process_labels = "".join(f',{name}="{_escape_label(str(value))}"' for name, value in (extra_labels or {}).items())
+    sets, latency, evictions, expirations, stored = [], [], [], [], []
+    for cache_name, description in caches.items():
+        for tier_name, tier in _iter_tiers(cache_name, description):
+            cache_label = f'cache="{_escape_label(tier_name)}"{process_labels}'
+            metrics = tier["metrics"]
+            for function, stats in metrics["functions"].items():
+                labels = f'{cache_label},function="{_escape_label(function)}"'
+                lines.append(f'{prefix}_lookups_total{{{labels},result="hit"}} {stats["hits"]}')
+                lines.append(f'{prefix}_lookups_total{{{labels},result="miss"}} {stats["misses"]}')
+                sets.append(f'{prefix}_sets_total{{{labels}}} {stats["sets"]}')
+                for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                    latency.append(f'{prefix}_lookup_latency_seconds{{{labels},quantile="{quantile}"}} '
+                                   f'{stats["latency_us"][key] / 1e6:.9f}')
+            evictions.append(f'{prefix}_evictions_total{{{cache_label}}} {metrics["evictions"]}')
+            expirations.append(f'{prefix}_expirations_total{{{cache_label}}} {metrics["expirations"]}')
+            if tier.get("bytes_stored") is not None:
+                stored.append(f'{prefix}_bytes_stored{{{cache_label}}} {tier["bytes_stored"]}')
+
+    for name, kind, help_text, samples in (
+            ("sets_total", "counter", "Cache writes by decorated function.", sets),
+            ("lookup_latency_seconds", "summary", "Cache lookup latency quantiles.", latency),
+            ("evictions_total", "counter", "Entries evicted for capacity.", evictions),
+            ("expirations_total", "counter", "Entries removed after their TTL.", expirations),
+            ("bytes_stored", "gauge", "Bytes currently stored by the backend.", stored),
+    ):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def _iter_tiers(cache_name: str, description: Dict[str, Any], parent: Optional[str] = None):
+    """展开分级缓存，每一级作为独立的cache标签（如 llm_responses、llm_responses/l1）"""
+    name = cache_name if parent is None else f"{parent}/{cache_name}"
+    yield name, description
+    for tier_name, tier in description.get("tiers", {}).items():
+        yield from _iter_tiers(tier_name, tier, parent=name)
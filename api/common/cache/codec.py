@@ -0,0 +1,134 @@
+# codec.py
+import json
+import lzma
+import pickle
+import time
+import zlib
+from threading import Lock
+from typing import Any, Dict, Optional
+
+# 编码格式：| 格式版本(1字节) | 序列化方式(1字节) | 压缩方式(1字节) | 载荷 |
+# 没有版本头的数据按旧格式（裸pickle，协议2以上以0x80开头）处理
+CODEC_FORMAT_VERSION = 1
+
+_SERIALIZERS = {
+    "pickle": 0,
+    "json": 1,
+}
+_COMPRESSIONS = {
+    None: 0,
+    "zlib": 1,
+    "lzma": 2,
+}
+_SERIALIZER_NAMES = {v: k for k, v in _SERIALIZERS.items()}
+_COMPRESSION_NAMES = {v: k for k, v in _COMPRESSIONS.items()}
+
+
+class ValueCodec:
+    """
+    缓存值编解码器，供文件/SQLite/Redis等需要字节存储的后端使用
+    - serializer：pickle（任意对象）或json（只支持JSON类型，解码不会执行任何代码）
+    - compression：None/zlib/lzma，只有序列化后超过compress_threshold字节且压缩后更小时才压缩
+    - allow_pickle=False时拒绝解码pickle数据，配合json序列化使用可以避免反序列化不可信数据
+    同时统计压缩率和编解码耗时
+    """
+
+    def __init__(
+            self,
+            serializer: str = "pickle",
+            compression: Optional[str] = None,
+            compress_threshold: int = 1024,
+            compress_level: int = 6,
+            allow_pickle: bool = True
+    ):
+        if serializer not in _SERIALIZERS:
+            raise ValueError(f"Unsupported serializer: {serializer}")
+        if compression not in _COMPRESSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        self.allow_pickle = allow_pickle
+        self._stats_lock = Lock()
+        self._encode_count = 0
+        self._decode_count = 0
+        self._raw_bytes = 0
+        self._encoded_bytes = 0
+        self._encode_ns = 0
+        self._decode_ns = 0
+
+    def _serialize(self, value: Any) -> bytes:
+        if self.serializer == "json":
+            return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _deserialize(self, serializer: str, data: bytes) -> Any:
+        if serializer == "json":
+            return json.loads(data.decode("utf-8"))
+        if not self.allow_pickle:
+            raise ValueError("Refusing to decode pickle data with allow_pickle=False")
+        return pickle.loads(data)
+
+    def _compress(self, data: bytes) -> tuple:
+        if self.compression is None or len(data) < self.compress_threshold:
+            return None, data
+        if self.compression == "zlib":
+            compressed = zlib.compress(data, self.compress_level)
+        else:
+            compressed = lzma.compress(data, preset=self.compress_level)
+        if len(compressed) >= len(data):
+            return None, data
+        return self.compression, compressed
+
+    @staticmethod
+    def _decompress(compression: Optional[str], data: bytes) -> bytes:
+        if compression == "zlib":
+            return zlib.decompress(data)
+        if compression == "lzma":
+            return lzma.decompress(data)
+        return data
+
+    def encode(self, value: Any) -> bytes:
+        start = time.perf_counter_ns()
+        raw = self._serialize(value)
+        compression, payload = self._compress(raw)
+        data = bytes((CODEC_FORMAT_VERSION, _SERIALIZERS[self.serializer], _COMPRESSIONS[compression])) + payload
+        elapsed = time.perf_counter_ns() - start
+        with self._stats_lock:
+            self._encode_count += 1
+            self._raw_bytes += len(raw)
+            self._encoded_bytes += len(data)
+            self._encode_ns += elapsed
+        return data
+
+    def decode(self, data: bytes) -> Any:
+        start = time.perf_counter_ns()
+        if data[:1] == bytes((CODEC_FORMAT_VERSION,)) and len(data) >= 3:
+            serializer = _SERIALIZER_NAMES.get(data[1])
+            if data[2] not in _COMPRESSION_NAMES or serializer is None:
+                raise ValueError(f"Unknown cache value encoding: {data[:3].hex()}")
+            value = self._deserialize(serializer, self._decompress(_COMPRESSION_NAMES[data[2]], data[3:]))
+        else:
+            # 旧格式：裸pickle
+            value = self._deserialize("pickle", data)
+        elapsed = time.perf_counter_ns() - start
+        with self._stats_lock:
+            self._decode_count += 1
+            self._decode_ns += elapsed
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """压缩率 = 编码后字节数 / 序列化后原始字节数，越小越好"""
+        with self._stats_lock:
+            return {
+                "serializer": self.serializer,
+                "compression": self.compression,
+                "encode_count": self._encode_count,
+                "decode_count": self._decode_count,
+                "raw_bytes": self._raw_bytes,
+                "encoded_bytes": self._encoded_bytes,
+                "compression_ratio": self._encoded_bytes / self._raw_bytes if self._raw_bytes else 1.0,
+                "avg_encode_us": self._encode_ns / self._encode_count / 1000 if self._encode_count else 0.0,
+                "avg_decode_us": self._decode_ns / self._decode_count / 1000 if self._decode_count else 0.0,
+            }
@@ -0,0 +1,186 @@
+# redis_backend.py
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, List, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from api.common.cache.async_cache import AsyncCacheBackend, run_blocking
+from api.common.cache.cache_manager import CACHE_MISS, CacheBackend
+from api.common.cache.codec import ValueCodec
+from api.common.config.celery_config import celery_config
+
+logger = logging.getLogger(__name__)
+
+
+class RedisCacheBackend(CacheBackend, AsyncCacheBackend):
+    """
+    基于Redis的共享缓存后端，Flask API进程与所有Celery worker看到同一份缓存
+    - 默认复用celery-config.yaml中的broker_url，通过连接池复用连接
+    - 过期时间使用Redis原生TTL，无需自行清理
+    - get_many/set_many分别使用MGET与pipeline，一次网络往返
+    Redis不可用时记录告警并按未命中处理，不影响业务调用
+    也可以通过client参数注入已有的客户端（如测试时使用进程内的Redis替身）
+    codec决定值的序列化与压缩方式，默认pickle不压缩
+    同时实现异步接口：每个事件循环使用各自的redis.asyncio连接池（异步连接不能跨事件循环复用）；
+    只注入了同步client时，异步接口退化为在线程池中调用同步方法
+    """
+
+    process_shared = True
+
+    def __init__(
+            self,
+            url: Optional[str] = None,
+            client: Optional[redis.Redis] = None,
+            prefix: str = "code-review:cache:",
+            max_connections: int = 32,
+            socket_timeout: float = 2.0,
+            codec: Optional[ValueCodec] = None
+    ):
+        self.url = url if url is not None or client is not None else celery_config["broker_url"]
+        self.max_connections = max_connections
+        self.socket_timeout = socket_timeout
+        if client is None:
+            pool = redis.ConnectionPool.from_url(
+                self.url,
+                max_connections=max_connections,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_timeout,
+            )
+            client = redis.Redis(connection_pool=pool)
+        self.client = client
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = \
+            weakref.WeakKeyDictionary()
+        self.prefix = prefix
+        self.codec = codec or ValueCodec()
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def lookup(self, key: str) -> Any:
+        try:
+            data = self.client.get(self._redis_key(key))
+            if data is None:
+                return CACHE_MISS
+            return self.codec.decode(data)
+        except Exception as e:
+            logger.warning(f"Failed to load cache {key}: {e}")
+            return CACHE_MISS
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.lookup(key)
+        return None if value is CACHE_MISS else value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        if ttl is not None and ttl <= 0:
+            self.delete(key)
+            return
+        try:
+            self.client.set(self._redis_key(key), self.codec.encode(value), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Failed to save cache {key}: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Failed to delete cache {key}: {e}")
+
+    def exists(self, key: str) -> bool:
+        try:
+            return bool(self.client.exists(self._redis_key(key)))
+        except Exception as e:
+            logger.warning(f"Failed to check cache {key}: {e}")
+            return False
+
+    def _async_client(self) -> Optional[aioredis.Redis]:
+        if self.url is None:
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = aioredis.from_url(
+                self.url,
+                max_connections=self.max_connections,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_timeout,
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def alookup(self, key: str) -> Any:
+        client = self._async_client()
+        if client is None:
+            return await run_blocking(self.lookup, key)
+        try:
+            data = await client.get(self._redis_key(key))
+            if data is None:
+                return CACHE_MISS
+            return self.codec.decode(data)
+        except Exception as e:
+            logger.warning(f"Failed to load cache {key}: {e}")
+            return CACHE_MISS
+
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        client = self._async_client()
+        if client is None:
+            return await run_blocking(self.set, key, value, ttl=ttl)
+        try:
+            if ttl is not None and ttl <= 0:
+                await client.delete(self._redis_key(key))
+                return
+            await client.set(self._redis_key(key), self.codec.encode(value), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Failed to save cache {key}: {e}")
+
+    async def adelete(self, key: str) -> None:
+        client = self._async_client()
+        if client is None:
+            return await run_blocking(self.delete, key)
+        try:
+            await client.delete(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Failed to delete cache {key}: {e}")
+
+    async def aexists(self, key: str) -> bool:
+        client = self._async_client()
+        if client is None:
+            return await run_blocking(self.exists, key)
+        try:
+            return bool(await client.exists(self._redis_key(key)))
+        except Exception as e:
+            logger.warning(f"Failed to check cache {key}: {e}")
+            return False
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        try:
+            values = self.client.mget([self._redis_key(key) for key in keys])
+        except Exception as e:
+            logger.warning(f"Failed to load {len(keys)} cache entries: {e}")
+            return {}
+        result = {}
+        for key, data in zip(keys, values):
+            if data is None:
+                continue
+            try:
+                result[key] = self.codec.decode(data)
+            except Exception as e:
+                logger.warning(f"Failed to load cache {key}: {e}")
+        return result
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        if not items:
+            return
+        if ttl is not None and ttl <= 0:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(self._redis_key(key), self.codec.encode(value), ex=ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to save {len(items)} cache entries: {e}")
@@ -0,0 +1,132 @@
+# singleflight.py
+import asyncio
+import logging
+import os
+from pathlib import Path
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:     # Windows下没有fcntl，跨进程文件锁不可用
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class _InFlightCall:
+    """一次正在执行中的调用，等待者通过event获取执行者的结果"""
+
+    def __init__(self):
+        self.event = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    同一进程内按key合并并发调用：第一个调用者执行函数，其余调用者阻塞等待并共享其结果（或异常）
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls: Dict[str, _InFlightCall] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    协程版的SingleFlight：同一事件循环内对同一个key的并发await只执行一次fn，
+    fn在独立的Task中运行，某个等待者被取消不会中断共享的计算，其余等待者照常拿到结果（或异常）
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, str], asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        task = self._calls.get(call_key)
+        if task is None:
+            task = loop.create_task(fn())
+            self._calls[call_key] = task
+            task.add_done_callback(lambda t: self._finish(call_key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, call_key: Tuple[int, str], task: asyncio.Task) -> None:
+        if self._calls.get(call_key) is task:
+            del self._calls[call_key]
+        # 所有等待者都被取消时异常无人读取，这里读取一次避免“Task exception was never retrieved”告警
+        if not task.cancelled():
+            task.exception()
+
+
+class FileLock:
+    """
+    基于fcntl.flock的跨进程排他锁（咨询锁），同一台主机上的多个worker进程共享
+    blocking=False时若锁已被占用，进入上下文会抛出BlockingIOError
+    """
+
+    def __init__(self, lock_path: Union[str, Path], blocking: bool = True):
+        if fcntl is None:
+            raise RuntimeError("FileLock requires fcntl, which is unavailable on this platform")
+        self.lock_path = Path(lock_path)
+        self.blocking = blocking
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "FileLock":
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BaseException:
+            os.close(self._fd)
+            self._fd = None
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+def file_lock_factory(lock_dir: Union[str, Path]) -> Callable[[str], FileLock]:
+    """生成CacheManager(process_lock=...)使用的文件锁工厂，每个缓存key对应一个锁文件"""
+    lock_dir = Path(lock_dir)
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    return lambda key: FileLock(lock_dir / f"{key}.lock")
+
+
+def redis_lock_factory(redis_client, prefix: str = "cache-lock:", timeout: int = 300,
+                       blocking_timeout: Optional[float] = None) -> Callable[[str], Any]:
+    """
+    生成基于Redis分布式锁的工厂，redis_client为redis.Redis实例
+    timeout为锁的自动过期时间（秒），防止持锁进程崩溃后死锁
+    """
+    return lambda key: redis_client.lock(f"{prefix}{key}", timeout=timeout, blocking_timeout=blocking_timeout)
@@ -0,0 +1,217 @@
+# sqlite_backend.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from api.common.cache.cache_manager import CACHE_MISS, CacheBackend
+from api.common.cache.codec import ValueCodec
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    expire_at REAL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_expire_at ON cache_entries (expire_at) WHERE expire_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed_at ON cache_entries (accessed_at);
+"""
+
+# SQLite单条语句的绑定参数数量有上限，批量查询时分块
+_SQL_BATCH_SIZE = 500
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    基于SQLite单文件数据库的持久化缓存后端
+    - WAL模式：同一台主机上的多个进程可以并发读，写操作通过busy_timeout排队
+    - expire_at索引：过期清理是一条DELETE语句；accessed_at索引：按LRU淘汰也是一条DELETE语句
+    - 每个线程（以及fork后的每个进程）使用独立的连接
+    touch_on_read=True时每次命中会更新accessed_at（一次写操作），只读场景较多时可关闭，此时淘汰退化为按写入时间
+    codec决定值的序列化与压缩方式，默认pickle不压缩
+    """
+
+    process_shared = True
+
+    def __init__(
+            self,
+            db_path: Union[str, Path],
+            max_entries: Optional[int] = None,
+            touch_on_read: bool = True,
+            evict_interval: int = 100,
+            busy_timeout: float = 5.0,
+            codec: Optional[ValueCodec] = None
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.touch_on_read = touch_on_read
+        self.evict_interval = evict_interval    # 每写入多少次检查一次容量
+        self.busy_timeout = busy_timeout
+        self.codec = codec or ValueCodec()
+        self._local = threading.local()
+        self._writes_lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # isolation_level=None为自动提交模式，批量写入时显式BEGIN
+            conn = sqlite3.connect(str(self.db_path), timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def lookup(self, key: str) -> Any:
+        conn = self._connection()
+        try:
+            row = conn.execute("SELECT value, expire_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return CACHE_MISS
+            value, expire_at = row
+            now = time.time()
+            if expire_at is not None and expire_at < now:
+                self._bookkeeping_write(conn, "DELETE FROM cache_entries WHERE key = ? AND expire_at < ?", (key, now))
+                self.metrics.record_expirations()
+                return CACHE_MISS
+            value = self.codec.decode(value)
+        except Exception as e:
+            logger.warning(f"Failed to load cache {key}: {e}")
+            return CACHE_MISS
+        if self.touch_on_read:
+            self._bookkeeping_write(conn, "UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
+
+    @staticmethod
+    def _bookkeeping_write(conn: sqlite3.Connection, sql: str, params, many: bool = False) -> None:
+        """
+        读路径上附带的写操作（更新访问时间、删除过期条目）：其他进程持有写锁时会等待busy_timeout后失败，
+        失败只记录日志，已经读到的值照常返回
+        """
+        try:
+            if many:
+                conn.executemany(sql, params)
+            else:
+                conn.execute(sql, params)
+        except sqlite3.Error as e:
+            logger.warning(f"Skipped cache bookkeeping write: {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.lookup(key)
+        return None if value is CACHE_MISS else value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self.set_many({key: value}, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def exists(self, key: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM cache_entries WHERE key = ? AND (expire_at IS NULL OR expire_at >= ?)",
+            (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        conn = self._connection()
+        now = time.time()
+        result = {}
+        for i in range(0, len(keys), _SQL_BATCH_SIZE):
+            batch = keys[i:i + _SQL_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, value FROM cache_entries WHERE key IN ({placeholders}) "
+                f"AND (expire_at IS NULL OR expire_at >= ?)",
+                (*batch, now)
+            ).fetchall()
+            for key, value in rows:
+                try:
+                    result[key] = self.codec.decode(value)
+                except Exception as e:
+                    logger.warning(f"Failed to load cache {key}: {e}")
+            if self.touch_on_read and rows:
+                self._bookkeeping_write(conn, "UPDATE cache_entries SET accessed_at = ? WHERE key = ?",
+                                        [(now, key) for key, _ in rows], many=True)
+        return result
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        now = time.time()
+        expire_at = now + ttl if ttl is not None else None
+        rows = []
+        for key, value in items.items():
+            try:
+                data = self.codec.encode(value)
+            except Exception as e:
+                logger.warning(f"Failed to save cache {key}: {e}")
+                continue
+            rows.append((key, data, now, expire_at, now, len(data)))
+        if not rows:
+            return
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (key, value, created_at, expire_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.warning(f"Failed to save {len(rows)} cache entries: {e}")
+            return
+        self._maybe_evict(len(rows))
+
+    def _maybe_evict(self, written: int):
+        if self.max_entries is None:
+            return
+        with self._writes_lock:
+            self._writes_since_evict += written
+            if self._writes_since_evict < self.evict_interval:
+                return
+            self._writes_since_evict = 0
+        self.evict_to_capacity()
+
+    def evict_to_capacity(self) -> int:
+        """删除最久未访问的条目，使总条目数不超过max_entries，返回删除条数"""
+        if self.max_entries is None:
+            return 0
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            "SELECT key FROM cache_entries ORDER BY accessed_at "
+            "LIMIT MAX(0, (SELECT COUNT(*) FROM cache_entries) - ?))",
+            (self.max_entries,)
+        )
+        if cursor.rowcount > 0:
+            self.metrics.record_evictions(cursor.rowcount)
+        return cursor.rowcount
+
+    def sweep_expired(self) -> int:
+        """删除所有过期条目，返回删除条数"""
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE expire_at IS NOT NULL AND expire_at < ?", (time.time(),)
+        )
+        if cursor.rowcount > 0:
+            self.metrics.record_expirations(cursor.rowcount)
+        return cursor.rowcount
+
+    def bytes_stored(self) -> Optional[int]:
+        return self.disk_usage()
+
+    def disk_usage(self) -> int:
+        """所有条目值的总字节数"""
+        row = self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()
+        return row[0]
@@ -0,0 +1,133 @@
+# tiered_backend.py
+import logging
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from api.common.cache.async_cache import AsyncCacheBackend, as_async_backend
+from api.common.cache.cache_manager import CACHE_MISS, CacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+def _merge_ttl(ttl: Optional[int], tier_ttl: Optional[int]) -> Optional[int]:
+    """调用方TTL与层级TTL取较小者，None表示不限制"""
+    if ttl is None:
+        return tier_ttl
+    if tier_ttl is None:
+        return ttl
+    return min(ttl, tier_ttl)
+
+
+class TieredCacheBackend(CacheBackend, AsyncCacheBackend):
+    """
+    两级缓存后端：L1为有界内存缓存，L2为磁盘缓存
+    读取时先查L1，未命中再查L2，L2命中后提升到L1；写入时同时写两级（write-through）
+    异步接口按级分别调度：非阻塞的L1直接在事件循环中读取，只有L1未命中时才把L2读写交给线程池（或L2自身的异步接口）
+    """
+
+    def __init__(
+            self,
+            l1: CacheBackend,
+            l2: CacheBackend,
+            l1_ttl: Optional[int] = None,
+            l2_ttl: Optional[int] = None
+    ):
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self.l2_ttl = l2_ttl
+        self._stats_lock = Lock()
+        self._l1_hits = 0
+        self._l2_hits = 0
+        self._misses = 0
+        self._async_l1 = as_async_backend(l1)
+        self._async_l2 = as_async_backend(l2)
+
+    @property
+    def blocking_io(self) -> bool:
+        return self.l1.blocking_io or self.l2.blocking_io
+
+    def _record(self, value: Any, tier: str) -> None:
+        with self._stats_lock:
+            if value is CACHE_MISS:
+                self._misses += 1
+            elif tier == "l1":
+                self._l1_hits += 1
+            else:
+                self._l2_hits += 1
+
+    def lookup(self, key: str) -> Any:
+        value = self.l1.lookup(key)
+        if value is not CACHE_MISS:
+            self._record(value, "l1")
+            return value
+        value = self.l2.lookup(key)
+        self._record(value, "l2")
+        if value is not CACHE_MISS:
+            # 提升到L1，L2条目的剩余寿命未知，因此只使用L1自身的TTL
+            self.l1.set(key, value, ttl=self.l1_ttl)
+        return value
+
+    async def alookup(self, key: str) -> Any:
+        value = await self._async_l1.alookup(key)
+        if value is not CACHE_MISS:
+            self._record(value, "l1")
+            return value
+        value = await self._async_l2.alookup(key)
+        self._record(value, "l2")
+        if value is not CACHE_MISS:
+            await self._async_l1.aset(key, value, ttl=self.l1_ttl)
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.lookup(key)
+        return None if value is CACHE_MISS else value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self.l2.set(key, value, ttl=_merge_ttl(ttl, self.l2_ttl))
+        self.l1.set(key, value, ttl=_merge_ttl(ttl, self.l1_ttl))
+
+    def delete(self, key: str) -> None:
+        self.l1.delete(key)
+        self.l2.delete(key)
+
+    def exists(self, key: str) -> bool:
+        return self.l1.exists(key) or self.l2.exists(key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await self._async_l2.aset(key, value, ttl=_merge_ttl(ttl, self.l2_ttl))
+        await self._async_l1.aset(key, value, ttl=_merge_ttl(ttl, self.l1_ttl))
+
+    async def adelete(self, key: str) -> None:
+        await self._async_l1.adelete(key)
+        await self._async_l2.adelete(key)
+
+    async def aexists(self, key: str) -> bool:
+        return await self._async_l1.aexists(key) or await self._async_l2.aexists(key)
+
+    def authoritative_tier(self) -> CacheBackend:
+        return self.l2.authoritative_tier()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        各级命中率：l1_hit_ratio = L1命中 / 总查询，l2_hit_ratio = L2命中 / L1未命中次数
+        """
+        with self._stats_lock:
+            l1_hits, l2_hits, misses = self._l1_hits, self._l2_hits, self._misses
+        lookups = l1_hits + l2_hits + misses
+        l2_lookups = l2_hits + misses
+        return {
+            "lookups": lookups,
+            "l1_hits": l1_hits,
+            "l2_hits": l2_hits,
+            "misses": misses,
+            "l1_hit_ratio": l1_hits / lookups if lookups else 0.0,
+            "l2_hit_ratio": l2_hits / l2_lookups if l2_lookups else 0.0,
+            "overall_hit_ratio": (l1_hits + l2_hits) / lookups if lookups else 0.0,
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        description = super().describe()
+        description["hit_ratios"] = self.stats()
+        description["tiers"] = {"l1": self.l1.describe(), "l2": self.l2.describe()}
+        return description
@@ -0,0 +1,147 @@
+# warmup.py
+import atexit
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Union
+
+from api.common.cache.access_log import AccessLog
+from api.common.cache.cache_manager import CacheBackend, CacheEntry
+from api.common.cache.codec import ValueCodec
+
+logger = logging.getLogger(__name__)
+
+# 快照文件内容（经codec编码）：{"version": 1, "created_at": 时间戳, "entries": [[key, value, created_at, ttl, hits], ...]}
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def snapshot_memory_cache(
+        backend: CacheBackend,
+        path: Union[str, Path],
+        top_n: int,
+        codec: Optional[ValueCodec] = None
+) -> int:
+    """
+    把内存缓存中命中次数最多的top_n个条目写入快照文件（临时文件 + os.replace，写到一半不会破坏旧快照）
+    backend需要提供hottest(top_n)，即MemoryCacheBackend或ShardedMemoryCacheBackend
+    """
+    codec = codec or ValueCodec(compression="zlib")
+    path = Path(path)
+    entries = [[key, entry.value, entry.created_at, entry.ttl, entry.hits] for key, entry in backend.hottest(top_n)]
+    data = codec.encode({"version": SNAPSHOT_FORMAT_VERSION, "created_at": time.time(), "entries": entries})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+def restore_memory_cache(
+        backend: CacheBackend,
+        path: Union[str, Path],
+        codec: Optional[ValueCodec] = None
+) -> int:
+    """
+    从快照文件恢复内存缓存，条目保留原有的剩余寿命，已过期的条目被跳过；返回恢复的条目数
+    快照不存在或无法解析时返回0（只记录告警，不影响启动）
+    """
+    codec = codec or ValueCodec(compression="zlib")
+    try:
+        with open(path, "rb") as f:
+            snapshot = codec.decode(f.read())
+        if snapshot.get("version") != SNAPSHOT_FORMAT_VERSION:
+            logger.warning(f"Ignoring cache snapshot {path} with unknown version {snapshot.get('version')}")
+            return 0
+        entries = [(key, CacheEntry(value=value, created_at=created_at, ttl=ttl, hits=hits))
+                   for key, value, created_at, ttl, hits in snapshot["entries"]]
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.warning(f"Failed to load cache snapshot {path}: {e}")
+        return 0
+    return backend.restore_entries(entries)
+
+
+def warm_from_access_log(
+        target: CacheBackend,
+        source: CacheBackend,
+        log_path: Union[str, Path],
+        top_n: int,
+        ttl: Optional[int] = None
+) -> int:
+    """
+    按上一次运行的访问日志取最热的top_n个key，从source（磁盘/Redis等共享缓存）批量读出后写入target（内存缓存）
+    只有仍在source中的key会被预热；返回预热的条目数
+    """
+    keys = [key for key in AccessLog.hottest_keys(log_path, top_n) if not target.exists(key)]
+    if not keys:
+        return 0
+    values = source.get_many(keys)
+    target.set_many(values, ttl=ttl)
+    return len(values)
+
+
+@dataclass
+class _SnapshotTarget:
+    backend: CacheBackend
+    path: Path
+    top_n: int
+    codec: Optional[ValueCodec]
+    access_log: Optional[AccessLog]
+
+
+_snapshot_targets: Dict[str, _SnapshotTarget] = {}
+_snapshot_lock = Lock()
+
+
+def register_cache_snapshot(
+        name: str,
+        backend: CacheBackend,
+        snapshot_dir: Union[str, Path],
+        top_n: int,
+        codec: Optional[ValueCodec] = None,
+        access_log: Optional[AccessLog] = None,
+        warm_source: Optional[CacheBackend] = None,
+        warm_ttl: Optional[int] = None
+) -> int:
+    """
+    注册需要跨重启保留的内存缓存并立即恢复：优先载入快照，快照为空时按访问日志从warm_source预热
+    进程正常退出时（atexit，以及Celery的worker_shutdown/worker_process_shutdown信号）调用save_cache_snapshots写快照
+    返回启动时恢复/预热的条目数
+    """
+    snapshot_dir = Path(snapshot_dir)
+    target = _SnapshotTarget(backend, snapshot_dir / f"{name}.snapshot", top_n, codec, access_log)
+    with _snapshot_lock:
+        first = not _snapshot_targets
+        _snapshot_targets[name] = target
+    if first:
+        atexit.register(save_cache_snapshots)
+
+    start = time.perf_counter()
+    restored = restore_memory_cache(backend, target.path, codec=codec)
+    source = "snapshot"
+    if restored == 0 and access_log is not None and warm_source is not None:
+        restored = warm_from_access_log(backend, warm_source, access_log.path, top_n, ttl=warm_ttl)
+        source = "access log"
+    if restored:
+        logger.info(f"Cache {name} warmed with {restored} entries from {source} "
+                    f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return restored
+
+
+def save_cache_snapshots() -> None:
+    """写出所有已注册内存缓存的快照，并刷新访问日志；可以重复调用"""
+    with _snapshot_lock:
+        targets = dict(_snapshot_targets)
+    for name, target in targets.items():
+        if target.access_log is not None:
+            target.access_log.flush()
+        try:
+            count = snapshot_memory_cache(target.backend, target.path, target.top_n, codec=target.codec)
+            logger.info(f"Cache {name} snapshot saved with {count} entries to {target.path}")
+        except Exception as e:
+            logger.warning(f"Failed to save cache snapshot {name}: {e}")
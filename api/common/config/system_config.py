@@ -1,6 +1,12 @@
 import os
+from pathlib import Path
+from typing import Union
+
 from api.common.config.load_config_from_yaml import load_config_from_yaml
 
+# 项目根目录（api包所在目录），配置中的相对路径按它解析，与进程的工作目录无关
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
 # 加载配置
 try:
     system_config_file = os.path.join(os.path.dirname(__file__), '..', 'settings', 'code-review-config.yaml')
@@ -18,12 +24,45 @@ except FileNotFoundError:
             "file_cache": {
                 "enabled": True,
                 "timeout": 86400,
+                "max_bytes": 1073741824,
+                "janitor_interval": 600,
+                "dir": "cache_messages/llm_responses",
+            },
+            "redis_cache": {
+                "enabled": False,
+                "url": None,
+                "timeout": 86400,
             },
             "mem_cache": {
                 "enabled": True,
                 "timeout": 3600,
+                "max_size": 1000,
+                "num_shards": 1,
+                "snapshot": {
+                    "enabled": True,
+                    "dir": "cache_snapshots",
+                    "top_n": 500,
+                    "access_log": True,
+                },
             }
         },
+        "review": {
+            "packing": {
+                "max_files_per_pack": 8,
+                "max_pack_tokens": 12000,
+                "max_workers": 4,
+            },
+            "chunking": {
+                "overlap_lines": 20,
+                "max_workers": 4,
+            },
+        },
+        "llm_usage": {
+            "enabled": True,
+            "flush_interval": 5,
+            "batch_size": 500,
+            "max_buffer": 100000,
+        },
     }
     relation_db_config = {
         "db_type": "postgresql",
@@ -38,4 +77,16 @@ except FileNotFoundError:
         "db_path": "/home/zhy/workspace/code-review-system/data/chroma",
         "db_host": "localhost",
         "db_port": "8000",
-    }
\ No newline at end of file
+    }
+
+
+def relation_db_uri() -> str:
+    """关系数据库的SQLAlchemy连接URI"""
+    return (f"{relation_db_config['db_type']}://{relation_db_config['db_user']}:{relation_db_config['db_password']}"
+            f"@{relation_db_config['db_host']}:{relation_db_config['db_port']}/{relation_db_config['db_name']}")
+
+
+def resolve_project_path(path: Union[str, Path]) -> Path:
+    """配置中的路径：绝对路径原样返回，相对路径按项目根目录解析"""
+    path = Path(path).expanduser()
+    return path if path.is_absolute() else PROJECT_ROOT / path
@@ -1,3 +1,43 @@
-from .llm_client import QwenClient
+from api.common.utils.help_functions import ProcessLocal
 
-llm_client = QwenClient()
+
+def _create_llm_client():
+    from .qwen_client import QwenClient
+    return QwenClient()
+
+
+def _create_async_llm_client():
+    from .async_llm_client import AsyncQwenClient
+    return AsyncQwenClient()
+
+
+# 客户端在第一次使用时才读取model.yaml并加载tokenizer，不调用LLM的进程（以及只导入本包子模块的代码）不承担这部分开销
+_llm_client = ProcessLocal(_create_llm_client, name="QwenClient")
+_async_llm_client = ProcessLocal(_create_async_llm_client, name="AsyncQwenClient")
+
+
+def get_llm_client():
+    return _llm_client.get()
+
+
+def get_async_llm_client():
+    return _async_llm_client.get()
+
+
+def prewarm_llm_client() -> None:
+    """提前创建客户端（加载tokenizer），避免第一个请求承担初始化耗时"""
+    _llm_client.get()
+
+
+def __getattr__(name):
+    # 兼容 from api.common.llm_client import llm_client / QwenClient / AsyncQwenClient 的旧写法
+    # （同步客户端模块名为qwen_client，不会与llm_client这个名字冲突）
+    if name == "llm_client":
+        return get_llm_client()
+    if name == "QwenClient":
+        from .qwen_client import QwenClient
+        return QwenClient
+    if name == "AsyncQwenClient":
+        from .async_llm_client import AsyncQwenClient
+        return AsyncQwenClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
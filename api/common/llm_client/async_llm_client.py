@@ -0,0 +1,324 @@
+# async_llm_client.py
+import asyncio
+import logging
+import math
+import ssl
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from api.common.cache.cache_manager import CACHE_MISS
+from api.common.llm_client.qwen_client import (
+    BaseQwenClient, ChatCompletionStream, CHAT_COMPLETION_CACHE_ID, DEFAULT_MODEL_CONFIG_PATH, LLM_RESPONSE_TTL, RETRYABLE_ERRORS,
+    _llm_response_tags, llm_response_cache_manager,
+)
+from api.common.llm_client.rate_limiter import LLMBackpressureError
+from api.common.llm_client.usage_ledger import llm_usage_ledger, record_llm_failure, record_llm_usage, track_llm_usage
+
+logger = logging.getLogger(__name__)
+
+
+class _ReplicaClients:
+    """
+    一个副本的多个AsyncOpenAI客户端，各自持有一个小的httpx连接池，请求发往在途请求最少的客户端
+    httpcore的异步连接池每次有请求进出都会遍历池中全部连接（判断空闲连接时是O(n²)），
+    单个64连接的池在64个并发请求下每个请求耗费约20ms CPU；拆成每池8个连接后约2ms
+    只在创建它的事件循环中使用，不需要加锁
+    """
+
+    def __init__(self, clients: List[AsyncOpenAI]):
+        self.clients = clients
+        self.in_flight = [0] * len(clients)
+
+    @contextmanager
+    def lease(self) -> Iterator[AsyncOpenAI]:
+        index = min(range(len(self.clients)), key=self.in_flight.__getitem__)
+        self.in_flight[index] += 1
+        try:
+            yield self.clients[index]
+        finally:
+            self.in_flight[index] -= 1
+
+
+class AsyncQwenClient(BaseQwenClient):
+    """
+    QwenClient的异步版本，缓存键、token统计与重试语义与同步客户端一致（两者共享LLM响应缓存）
+    - 底层使用AsyncOpenAI + 调优过的httpx.AsyncClient连接池（keep-alive，可选HTTP/2），同一事件循环内的请求复用连接；
+      每个副本的http.max_connections个连接按http.connections_per_pool拆分到多个连接池（见_ReplicaClients）
+    - 同时在途的请求数由asyncio.Semaphore限制，默认等于各副本连接数之和（model.yaml中的max_concurrency可另行指定），
+      超出的请求排队等待
+    - 重试使用asyncio.sleep退避，等待期间不占用线程
+    httpx连接池与Semaphore都绑定在创建它们的事件循环上，因此按事件循环分别创建；
+    Celery任务中每次asyncio.run都是新的事件循环，并发上限对每个事件循环分别生效
+    """
+
+    def __init__(
+            self,
+            config_path: str = DEFAULT_MODEL_CONFIG_PATH,
+            use_cache: bool = True,
+            tokenizer_path: Optional[str] = None
+    ):
+        super().__init__(config_path, use_cache=use_cache, tokenizer_path=tokenizer_path)
+        http_cfg = self.model_config.get("http", {})
+        max_connections = http_cfg.get("max_connections", 32)
+        max_keepalive_connections = http_cfg.get("max_keepalive_connections", max_connections)
+        # 没有配置max_concurrency时并发上限等于连接数，连接池中不会有排队的请求
+        self.max_concurrency = self.model_config.get("max_concurrency") or max_connections * len(self.base_urls)
+        self.http2 = http_cfg.get("http2", False)
+        self.pools_per_replica = max(1, math.ceil(max_connections / http_cfg.get("connections_per_pool", 8)))
+        self.limits = httpx.Limits(
+            max_connections=math.ceil(max_connections / self.pools_per_replica),
+            max_keepalive_connections=math.ceil(max_keepalive_connections / self.pools_per_replica),
+            keepalive_expiry=http_cfg.get("keepalive_expiry", 30),
+        )
+        # 事件循环 -> ({副本base_url: _ReplicaClients}, Semaphore)，事件循环被回收后对应的连接池随之释放
+        self._loop_resources = weakref.WeakKeyDictionary()
+        # 所有连接池共用一个SSLContext，每次创建都要加载CA证书（约50ms）
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401  httpx的HTTP/2支持依赖h2（pip install httpx[http2]）
+            except ImportError:
+                logger.warning("HTTP/2 requested but the h2 package is not installed, falling back to HTTP/1.1")
+                http2 = False
+        if self._ssl_context is None:
+            self._ssl_context = httpx.create_ssl_context()
+        return httpx.AsyncClient(
+            http2=http2,
+            verify=self._ssl_context,
+            limits=self.limits,
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+        )
+
+    def _resources(self) -> Tuple[Dict[str, _ReplicaClients], asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        resources = self._loop_resources.get(loop)
+        if resources is None:
+            clients = {
+                url: _ReplicaClients([
+                    AsyncOpenAI(
+                        base_url=url,
+                        api_key="token-abc123",  # vLLM 忽略此字段，但 SDK 要求提供
+                        http_client=self._create_http_client(),
+                    )
+                    for _ in range(self.pools_per_replica)
+                ])
+                for url in self.base_urls
+            }
+            resources = (clients, asyncio.Semaphore(self.max_concurrency))
+            self._loop_resources[loop] = resources
+        return resources
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """当前事件循环上第一个副本的第一个AsyncOpenAI客户端"""
+        return self._resources()[0][self.base_url].clients[0]
+
+    async def _send(self, clients: Dict[str, _ReplicaClients], semaphore: asyncio.Semaphore, kwargs: Dict[str, Any]):
+        """发送一次请求：只在请求期间占用并发名额，退避等待时释放"""
+        async with semaphore:
+            with self._breaker_guard(), self.balancer.route() as replica, clients[replica.base_url].lease() as client:
+                return await client.chat.completions.create(**kwargs)
+
+    def _build_request(self, messages: List[Dict[str, str]], response_format: str) -> Dict[str, Any]:
+        """
+        messages放在extra_body中原样发送（extra_body覆盖同名参数）：AsyncOpenAI按类型注解逐层转换请求参数，
+        每条消息要逐一尝试各种消息类型、每一层都是一次协程调用，单是messages每个请求就要约0.5ms CPU；
+        这里的消息已经是可直接序列化的dict，不需要转换
+        """
+        kwargs = super()._build_request(messages, response_format)
+        kwargs["extra_body"] = {"messages": kwargs["messages"]}
+        kwargs["messages"] = []     # create()要求提供messages，实际发送的是extra_body中的值
+        return kwargs
+
+    async def acount_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """在线程池中计算token数，长对话的分词不阻塞事件循环"""
+        return await asyncio.to_thread(self._check_input_tokens, messages)
+
+    @track_llm_usage
+    @llm_response_cache_manager.cached(ttl=LLM_RESPONSE_TTL, tags=_llm_response_tags, cache_id=CHAT_COMPLETION_CACHE_ID)
+    async def chat_completion(
+            self,
+            messages: List[Dict[str, str]],
+            response_format: str = "text",  # "text" 或 "json"
+            max_retries: int = 3,
+            retry_delay: float = 2.0,
+    ) -> Dict[str, Any]:
+        """
+        异步调用 LLM，带重试和缓存。
+        返回完整 response dict（含 content、usage 等）
+        """
+        input_tokens = await self.acount_tokens(messages)
+        kwargs = self._build_request(messages, response_format)
+        reserved_tokens = self._reserved_tokens(input_tokens, kwargs)
+        clients, semaphore = self._resources()
+
+        last_exception = None
+        for attempt in range(max_retries + 1):
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.aacquire(reserved_tokens)
+                if self.hedger is not None:
+                    response = await self.hedger.acall(lambda: self._send(clients, semaphore, kwargs))
+                else:
+                    response = await self._send(clients, semaphore, kwargs)
+                result = self._parse_response(response, input_tokens)
+                self._after_success(reserved_tokens, result["usage"])
+                logger.info(f"LLM call succeeded. Tokens: {result['usage']['total_tokens']}")
+                return result
+
+            except RETRYABLE_ERRORS as e:
+                last_exception = e
+                retry_after = self._after_failure(e)
+                logger.warning(f"LLM call failed (attempt {attempt + 1}/{max_retries + 1}): {e}")
+                if attempt < max_retries:
+                    if not self._circuit_open():
+                        await asyncio.sleep(self._retry_wait(attempt, retry_delay, retry_after))
+                else:
+                    logger.error("Max retries exceeded.")
+                    raise e
+            except LLMBackpressureError:
+                # 限流排队过长或熔断中，由调用方稍后重试
+                raise
+            except Exception as e:
+                logger.error(f"Unexpected error: {e}")
+                raise e
+
+        raise last_exception
+
+    async def chat_completions_many(
+            self,
+            list_of_messages: List[List[Dict[str, str]]],
+            response_format: str = "text",
+            return_exceptions: bool = False,
+            **kwargs
+    ) -> List[Any]:
+        """
+        并发执行多个对话，结果顺序与输入一致；实际并发数受max_concurrency限制
+        return_exceptions=True时单个对话失败不影响其余对话，失败项以异常对象返回
+        """
+        return await asyncio.gather(
+            *(self.chat_completion(messages, response_format=response_format, **kwargs)
+              for messages in list_of_messages),
+            return_exceptions=return_exceptions
+        )
+
+    def chat_completion_stream(
+            self,
+            messages: List[Dict[str, str]],
+            response_format: str = "text",
+            max_retries: int = 3,
+            retry_delay: float = 2.0,
+    ) -> ChatCompletionStream:
+        """
+        流式调用 LLM（async for 迭代增量文本），缓存与重试语义同QwenClient.chat_completion_stream
+        整个流式请求期间占用一个并发名额
+        """
+        stream = ChatCompletionStream()
+        stream._chunks = self._stream_chunks(stream, messages, response_format, max_retries, retry_delay)
+        return stream
+
+    async def _stream_chunks(
+            self,
+            stream: ChatCompletionStream,
+            messages: List[Dict[str, str]],
+            response_format: str,
+            max_retries: int,
+            retry_delay: float
+    ) -> AsyncIterator[str]:
+        label = "AsyncQwenClient.chat_completion_stream"
+        start = time.perf_counter()
+        cache_key = self._stream_cache_key(messages, response_format)
+        if cache_key is not None:
+            cached = await llm_response_cache_manager.alookup(cache_key, label=label)
+            if cached is not CACHE_MISS:
+                stream.result, stream.from_cache = cached, True
+                record_llm_usage(self, cached, time.perf_counter() - start, cache_hit=True)
+                if cached["content"]:
+                    yield cached["content"]
+                return
+
+        try:
+            input_tokens = await self.acount_tokens(messages)
+            kwargs = self._build_stream_request(messages, response_format)
+            reserved_tokens = self._reserved_tokens(input_tokens, kwargs)
+            clients, semaphore = self._resources()
+            for attempt in range(max_retries + 1):
+                parts, usage, model = [], None, None
+                try:
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.aacquire(reserved_tokens)
+                    async with semaphore:
+                        with self._breaker_guard(), self.balancer.route() as replica, \
+                                clients[replica.base_url].lease() as client:
+                            async with await client.chat.completions.create(**kwargs) as response:
+                                async for chunk in response:
+                                    model = chunk.model or model
+                                    if chunk.usage is not None:
+                                        usage = chunk.usage
+                                    if chunk.choices and chunk.choices[0].delta.content:
+                                        parts.append(chunk.choices[0].delta.content)
+                                        yield chunk.choices[0].delta.content
+                    break
+                except RETRYABLE_ERRORS as e:
+                    retry_after = self._after_failure(e)
+                    logger.warning(f"LLM stream failed (attempt {attempt + 1}/{max_retries + 1}): {e}")
+                    if parts or attempt >= max_retries:
+                        raise e
+                    if not self._circuit_open():
+                        await asyncio.sleep(self._retry_wait(attempt, retry_delay, retry_after))
+        except Exception as e:
+            # 重试耗尽、输入超长、限流/熔断拒绝等失败也记入台账
+            record_llm_failure(self, e, time.perf_counter() - start)
+            raise
+
+        stream.result = self._stream_result(parts, usage, model, input_tokens)
+        self._after_success(reserved_tokens, stream.result["usage"])
+        record_llm_usage(self, stream.result, time.perf_counter() - start, cache_hit=False)
+        logger.info(f"LLM stream succeeded. Tokens: {stream.result['usage']['total_tokens']}")
+        if cache_key is not None:
+            await llm_response_cache_manager.aset(cache_key, stream.result, ttl=LLM_RESPONSE_TTL, label=label)
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环上的连接池"""
+        resources = self._loop_resources.pop(asyncio.get_running_loop(), None)
+        if resources is not None:
+            for replica_clients in resources[0].values():
+                for client in replica_clients.clients:
+                    await client.close()
+
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        检查 LLM 是否正常
+        """
+        try:
+            start_time = time.time()
+            response = await self.chat_completion(
+                messages=[
+                    {"role": "system", "content": "你是一个对话助手."},
+                    {"role": "user", "content": "请回复'hello'确保连接正常"}
+                ],
+                response_format="text",
+            )
+            return {
+                'status': 'healthy',
+                'response_time': time.time() - start_time,
+                'model': str(self.model),
+                'test_response': response['content'],
+                'cache': self.cache_stats(),
+                'rate_limit': self.rate_limiter.stats() if self.rate_limiter is not None else None,
+                'replicas': self.balancer.stats(),
+                'prefix_cache': self.prefix_cache_stats.stats(),
+                'usage_ledger': llm_usage_ledger.stats(),
+                'resilience': self.resilience_stats(),
+            }
+        except Exception as e:
+            logger.error(f"Failed to check LLM health: {e}")
+            return {}
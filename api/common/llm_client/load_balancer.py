@@ -0,0 +1,174 @@
+# load_balancer.py
+import logging
+import time
+import urllib.request
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 延迟的指数移动平均系数
+_LATENCY_EWMA_ALPHA = 0.2
+
+
+def probe_models_endpoint(base_url: str, timeout: float = 5.0) -> bool:
+    """默认的健康探测：GET {base_url}/models 返回200即视为恢复"""
+    try:
+        with urllib.request.urlopen(f"{base_url.rstrip('/')}/models", timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+class Replica:
+    """一个vLLM副本的路由状态与统计"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.outstanding = 0
+        self.consecutive_errors = 0
+        self.ejected = False
+        self.ejected_at = 0.0
+        self.requests = 0
+        self.succeeded = 0
+        self.errors = 0
+        self.ejections = 0
+        self.latency_total = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.latency_max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "healthy": not self.ejected,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "succeeded": self.succeeded,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests else 0.0,
+            "consecutive_errors": self.consecutive_errors,
+            "ejections": self.ejections,
+            "latency_avg": self.latency_total / self.succeeded if self.succeeded else None,
+            "latency_ewma": self.latency_ewma,
+            "latency_max": self.latency_max,
+        }
+
+
+class LoadBalancer:
+    """
+    多个vLLM副本之间的客户端负载均衡（线程安全）
+    - 每个请求发往在途请求数（加上连续失败次数）最少的健康副本，数量相同时轮流选择
+    - 连续eject_after次失败（连接错误/5xx，由is_failure判断）的副本被摘除，后台线程每probe_interval秒探测一次，
+      探测成功后恢复；所有副本都被摘除时仍选择摘除最早的副本，不会直接拒绝请求
+    同步和异步客户端都可以使用：route()只在进入和退出时短暂持锁，不会阻塞事件循环
+    """
+
+    def __init__(
+            self,
+            base_urls: List[str],
+            eject_after: int = 3,
+            probe_interval: float = 10.0,
+            probe: Callable[[str], bool] = probe_models_endpoint,
+            is_failure: Callable[[BaseException], bool] = lambda error: True
+    ):
+        if not base_urls:
+            raise ValueError("At least one base_url is required")
+        self.replicas = [Replica(url) for url in base_urls]
+        self.eject_after = eject_after
+        self.probe_interval = probe_interval
+        self.probe = probe
+        self.is_failure = is_failure
+        self._lock = Lock()
+        self._next = 0
+        self._prober: Optional[Thread] = None
+        self._stop = Event()
+
+    def acquire(self) -> Replica:
+        with self._lock:
+            candidates = [replica for replica in self.replicas if not replica.ejected]
+            if not candidates:
+                candidates = [min(self.replicas, key=lambda replica: replica.ejected_at)]
+            # 从轮转位置开始找在途请求最少的副本；快速失败的副本在途数总是很低，
+            # 把连续失败次数也计入，摘除之前就减少发往它的请求（重试也会优先换到其他副本）
+            start = self._next % len(candidates)
+            self._next += 1
+            rotated = candidates[start:] + candidates[:start]
+            replica = min(rotated, key=lambda r: r.outstanding + r.consecutive_errors)
+            replica.outstanding += 1
+            replica.requests += 1
+            return replica
+
+    def release(self, replica: Replica, latency: Optional[float] = None, failed: bool = False) -> None:
+        """请求结束：成功时传入latency；failed=True记为一次失败；两者都没有（取消、4xx等）时只归还在途计数"""
+        with self._lock:
+            replica.outstanding -= 1
+            if not failed:
+                if latency is not None:
+                    replica.consecutive_errors = 0
+                    replica.succeeded += 1
+                    replica.latency_total += latency
+                    replica.latency_max = max(replica.latency_max, latency)
+                    replica.latency_ewma = latency if replica.latency_ewma is None else (
+                        _LATENCY_EWMA_ALPHA * latency + (1 - _LATENCY_EWMA_ALPHA) * replica.latency_ewma)
+                return
+            replica.errors += 1
+            replica.consecutive_errors += 1
+            if replica.ejected or replica.consecutive_errors < self.eject_after:
+                return
+            replica.ejected = True
+            replica.ejected_at = time.monotonic()
+            replica.ejections += 1
+            start_prober = self._prober is None
+            if start_prober:
+                self._prober = Thread(target=self._probe_loop, name="llm-replica-prober", daemon=True)
+        logger.warning(f"LLM replica {replica.base_url} ejected after {replica.consecutive_errors} consecutive errors")
+        if start_prober:
+            self._prober.start()
+
+    @contextmanager
+    def route(self) -> Iterator[Replica]:
+        """选择副本并在请求结束时记录结果：with balancer.route() as replica: ..."""
+        replica = self.acquire()
+        start = time.monotonic()
+        try:
+            yield replica
+        except Exception as e:
+            self.release(replica, failed=self.is_failure(e))
+            raise
+        except BaseException:
+            # 任务取消、流式生成器被提前关闭
+            self.release(replica)
+            raise
+        self.release(replica, time.monotonic() - start)
+
+    def _probe_loop(self) -> None:
+        while not self._stop.wait(self.probe_interval):
+            with self._lock:
+                ejected = [replica for replica in self.replicas if replica.ejected]
+                if not ejected:
+                    # 在锁内清空，之后的摘除会启动新的探测线程
+                    self._prober = None
+                    return
+            for replica in ejected:
+                if self.probe(replica.base_url):
+                    self.restore(replica)
+
+    def restore(self, replica: Replica) -> None:
+        with self._lock:
+            if not replica.ejected:
+                return
+            replica.ejected = False
+            replica.consecutive_errors = 0
+        logger.info(f"LLM replica {replica.base_url} restored")
+
+    def healthy_replicas(self) -> List[Replica]:
+        with self._lock:
+            return [replica for replica in self.replicas if not replica.ejected]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [replica.stats() for replica in self.replicas]
+
+    def close(self) -> None:
+        self._stop.set()
@@ -0,0 +1,46 @@
+# prefix_cache_stats.py
+from threading import Lock
+from typing import Any, Dict, Optional
+
+
+def cached_prompt_tokens(usage) -> Optional[int]:
+    """
+    从OpenAI兼容的usage中取出命中前缀缓存的prompt token数（usage.prompt_tokens_details.cached_tokens）
+    vLLM需要以 --enable-prompt-tokens-details 启动才会返回，没有时返回None
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None and isinstance(usage, dict):
+        details = usage.get("prompt_tokens_details")
+    if isinstance(details, dict):
+        return details.get("cached_tokens")
+    return getattr(details, "cached_tokens", None)
+
+
+class PrefixCacheStats:
+    """服务端前缀缓存的复用情况：命中缓存的prompt token占比（只统计返回了cached_tokens的请求）"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.requests = 0
+        self.reported_requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, prompt_tokens: Optional[int], cached_tokens: Optional[int]) -> None:
+        with self._lock:
+            self.requests += 1
+            if cached_tokens is None or not prompt_tokens:
+                return
+            self.reported_requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "reported_requests": self.reported_requests,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "reuse_ratio": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else None,
+            }
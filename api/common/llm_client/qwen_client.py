@@ -0,0 +1,541 @@
+# qwen_client.py
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import nullcontext
+from typing import List, Dict, Optional, Any, Union, Iterator, AsyncIterator
+
+import yaml
+from openai import OpenAI, APIConnectionError, RateLimitError, APIStatusError
+from transformers import AutoTokenizer
+
+from api.common.cache.cache_manager import CACHE_MISS, CacheManager, build_memory_backend
+from api.common.cache.tiered_backend import TieredCacheBackend
+from api.common.llm_client.load_balancer import LoadBalancer
+from api.common.llm_client.prefix_cache_stats import PrefixCacheStats, cached_prompt_tokens
+from api.common.llm_client.rate_limiter import AdaptiveRateLimiter, LLMBackpressureError, parse_retry_after
+from api.common.llm_client.resilience import CircuitBreaker, Hedger
+from api.common.llm_client.response_cache import (
+    ACTIVE_MODEL_CACHE_KEY, LLM_RESPONSE_TAG, LLM_RESPONSE_TTL, MEM_CACHE_CONFIG, llm_response_cache_manager,
+    llm_response_codec,
+)
+from api.common.llm_client.token_counter import TokenCounter
+from api.common.llm_client.usage_ledger import (
+    llm_usage_ledger, record_call_usage, record_llm_failure, record_llm_usage, track_llm_usage,
+)
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 创建内存缓存管理器（mem_cache.num_shards大于1时内存缓存使用分段锁）
+memory_cache_manager = CacheManager(build_memory_backend(1000, MEM_CACHE_CONFIG.get("num_shards", 1)), name="tokenizer")
+
+
+def _llm_response_tags(client: "BaseQwenClient", *args, **kwargs) -> List[str]:
+    """LLM响应的缓存标签：全部响应 + 按模型名，可通过invalidate_tags按模型批量失效"""
+    return [LLM_RESPONSE_TAG, f"model:{client.model}"]
+
+
+# 同步/异步客户端的chat_completion共享同一份缓存条目；模块由llm_client.py更名为qwen_client.py，
+# 缓存标识保持原值，已有的缓存条目（内存快照、磁盘、Redis）继续命中
+CHAT_COMPLETION_CACHE_ID = "api.common.llm_client.llm_client.QwenClient.chat_completion"
+# 可重试的调用错误：连接失败、限流、服务端错误
+RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, APIStatusError)
+DEFAULT_MODEL_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "settings", "model.yaml")
+# 影响模型输出的配置项，参与LLM响应缓存的命名空间；超时、副本地址、tokenizer路径、连接池、限流、熔断、对冲等
+# 部署相关的配置不影响输出，修改后缓存仍然有效。_build_request开始发送新的采样参数时需要加到这里
+OUTPUT_CONFIG_KEYS = (
+    "model_name", "max_tokens", "temperature", "top_p", "top_k", "presence_penalty", "frequency_penalty",
+    "repetition_penalty", "seed", "stop", "prompt_version",
+)
+
+
+def model_config_version(model_cfg: Dict[str, Any]) -> str:
+    """model.yaml中影响输出的配置项的摘要"""
+    output_cfg = {key: model_cfg[key] for key in OUTPUT_CONFIG_KEYS if key in model_cfg}
+    return hashlib.blake2b(json.dumps(output_cfg, sort_keys=True, default=str).encode("utf-8"),
+                           digest_size=6).hexdigest()
+
+
+class ChatCompletionStream:
+    """
+    流式响应：迭代（同步客户端）或异步迭代（异步客户端）得到增量文本
+    迭代结束后result为与chat_completion结构相同的完整结果（含usage），from_cache表示是否直接来自缓存
+    """
+
+    def __init__(self):
+        self.result: Optional[Dict[str, Any]] = None
+        self.from_cache = False
+        self._chunks: Union[Iterator[str], AsyncIterator[str], None] = None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._chunks)
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._chunks.__aiter__()
+
+
+def _build_rate_limiter(rate_cfg: Dict[str, Any]) -> Optional[AdaptiveRateLimiter]:
+    """
+    按model.yaml中的rate_limit创建限流器，shared为true时令牌桶保存在Redis中（复用celery的broker），所有进程共享
+    """
+    if not rate_cfg.get("enabled", False):
+        return None
+    redis_client = None
+    if rate_cfg.get("shared", False):
+        import redis
+        from api.common.config.celery_config import celery_config
+        redis_client = redis.Redis.from_url(rate_cfg.get("redis_url") or celery_config["broker_url"])
+    return AdaptiveRateLimiter(
+        rps=rate_cfg.get("rps", 8),
+        tpm=rate_cfg.get("tpm"),
+        min_rps=rate_cfg.get("min_rps", 0.5),
+        max_rps=rate_cfg.get("max_rps"),
+        max_wait=rate_cfg.get("max_wait", 60),
+        redis_client=redis_client,
+    )
+
+
+def _is_replica_failure(error: BaseException) -> bool:
+    """连接错误（含超时）与5xx计为副本故障；429说明副本存活只是过载，其他4xx是请求本身的问题"""
+    if isinstance(error, APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def _build_load_balancer(base_urls: List[str], lb_cfg: Dict[str, Any]) -> LoadBalancer:
+    return LoadBalancer(
+        base_urls,
+        eject_after=lb_cfg.get("eject_after", 3),
+        probe_interval=lb_cfg.get("probe_interval", 10),
+        is_failure=_is_replica_failure,
+    )
+
+
+def _build_circuit_breaker(breaker_cfg: Dict[str, Any]) -> Optional[CircuitBreaker]:
+    if not breaker_cfg.get("enabled", False):
+        return None
+    return CircuitBreaker(
+        failure_threshold=breaker_cfg.get("failure_threshold", 5),
+        recovery_timeout=breaker_cfg.get("recovery_timeout", 30),
+        half_open_max_calls=breaker_cfg.get("half_open_max_calls", 1),
+        is_failure=_is_replica_failure,
+    )
+
+
+def _build_hedger(hedge_cfg: Dict[str, Any]) -> Optional[Hedger]:
+    if not hedge_cfg.get("enabled", False):
+        return None
+    return Hedger(
+        percentile=hedge_cfg.get("percentile", 0.95),
+        min_samples=hedge_cfg.get("min_samples", 20),
+        min_delay=hedge_cfg.get("min_delay", 1.0),
+        max_ratio=hedge_cfg.get("max_ratio", 0.1),
+    )
+
+
+@memory_cache_manager.cached(ttl=3600)
+def _load_tokenizer(tokenizer_source: str) -> AutoTokenizer:
+    """
+    加载tokenizer，同一进程内的同步/异步客户端共用
+    """
+    try:
+        return AutoTokenizer.from_pretrained(tokenizer_source)
+    except Exception as e:
+        logger.error(f"Failed to load tokenizer: {e}")
+        raise e
+
+
+class BaseQwenClient:
+    """
+    QwenClient与AsyncQwenClient的公共部分：读取model.yaml、缓存命名空间、tokenizer与token计数、
+    请求参数构建、响应解析和重试间隔，两者的缓存键、token统计与重试语义因此保持一致
+    """
+
+    def __init__(
+            self,
+            config_path: str = DEFAULT_MODEL_CONFIG_PATH,
+            use_cache: bool = True,
+            tokenizer_path: Optional[str] = None
+    ):
+        with open(config_path, "r", encoding="utf-8") as f:
+            cfg = yaml.safe_load(f)
+        model_cfg = cfg["model"]
+
+        self.model_config = model_cfg
+        # base_urls配置多个vLLM副本时按最少在途请求数分发，base_url保留为第一个副本
+        self.base_urls = list(model_cfg.get("base_urls") or [model_cfg["base_url"]])
+        self.base_url = self.base_urls[0]
+        self.model = model_cfg["model_name"]
+        # 缓存命名空间：模型名 + 影响输出的配置摘要，切换模型或修改采样参数后不会命中旧的缓存
+        self.cache_namespace = f"{self.model}@{model_config_version(model_cfg)}"
+        self.max_tokens = model_cfg.get("max_tokens", 32768)
+        self.temperature = model_cfg.get("temperature", 0.3)
+        self.timeout = model_cfg.get("timeout", 120)
+        self.use_cache = use_cache
+        self.rate_limiter = _build_rate_limiter(model_cfg.get("rate_limit", {}))
+        self.balancer = _build_load_balancer(self.base_urls, model_cfg.get("load_balancing", {}))
+        self.circuit_breaker = _build_circuit_breaker(model_cfg.get("circuit_breaker", {}))
+        self.hedger = _build_hedger(model_cfg.get("hedging", {}))
+        # vLLM前缀缓存的复用率，按响应中的prompt_tokens_details.cached_tokens统计
+        self.prefix_cache_stats = PrefixCacheStats()
+        self._invalidate_previous_model_responses()
+
+        # 加载tokenizer，方便计算消耗的token数量
+        tokenizer_source = tokenizer_path or model_cfg.get("tokenizer_path", self.model)
+        logger.info(f"Loading tokenizer from : {tokenizer_source}")
+        try:
+            self.tokenizer = _load_tokenizer(tokenizer_source)
+        except Exception as e:
+            logger.error(f"Failed to load tokenizer: {e} from {tokenizer_source}")
+            raise e
+        self.token_counter = TokenCounter(self.tokenizer, namespace=tokenizer_source)
+
+    def _invalidate_previous_model_responses(self):
+        """
+        模型切换后使上一个模型的全部缓存响应失效，之后即使切换回旧模型也不会返回切换前缓存的响应
+        当前模型与标签代数一样直接读写共享的那一级且不过期：经过两级缓存写入会套用层级TTL，
+        标记过期后下一次切换就不会再失效旧模型的响应
+        """
+        marker_backend = llm_response_cache_manager.backend.authoritative_tier()
+        previous_model = marker_backend.lookup(ACTIVE_MODEL_CACHE_KEY)
+        if previous_model is not CACHE_MISS and previous_model != self.model:
+            logger.info(f"Model switched from {previous_model} to {self.model}, invalidating cached responses")
+            llm_response_cache_manager.invalidate_tags(f"model:{previous_model}")
+        if previous_model != self.model:
+            marker_backend.set(ACTIVE_MODEL_CACHE_KEY, self.model, ttl=None)
+
+    def count_tokens(self, text: Union[str, List[Dict[str, str]]]) -> int:
+        """
+        如果是str，直接encode计算
+        如果是messages（List[Dict[str, str]]）：按照Qwen3聊天模板拼接后encode
+        结果按内容摘要缓存，messages按消息拆分计算，见TokenCounter
+        """
+        if isinstance(text, str):
+            return self.token_counter.count_text(text)
+        elif isinstance(text, list):
+            # 使用qwen3的模板拼接
+            try:
+                return self.token_counter.count_messages(text)
+            except Exception as e:
+                logger.error(f"Failed to apply chat template: {e}")
+                raise e
+        else:
+            raise ValueError("Invalid input type. Must be str or List[Dict[str, str]]")
+
+    def count_tokens_many(self, texts: List[Union[str, List[Dict[str, str]]]]) -> List[int]:
+        """
+        批量计算token数，texts全部为str或全部为messages；未缓存的内容使用fast tokenizer一次批量编码
+        """
+        if all(isinstance(text, str) for text in texts):
+            return self.token_counter.count_texts(texts)
+        if all(isinstance(text, list) for text in texts):
+            return self.token_counter.count_messages_many(texts)
+        raise ValueError("Invalid input type. Must be all str or all List[Dict[str, str]]")
+
+    def _check_input_tokens(self, messages: List[Dict[str, str]]) -> int:
+        input_tokens = self.count_tokens(messages)
+        if input_tokens > self.max_tokens:
+            raise ValueError(f"Input tokens exceed max_tokens: the input tokens is {input_tokens},"
+                             f" which is greater than max_tokens: {self.max_tokens}")
+        return input_tokens
+
+    @property
+    def max_output_tokens(self) -> int:
+        """每个请求允许的最大输出token数，输入的token预算需要扣除这一部分"""
+        return min(4096, self.max_tokens // 2)  # 保守估计
+
+    def _build_request(self, messages: List[Dict[str, str]], response_format: str) -> Dict[str, Any]:
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_output_tokens,
+            "timeout": self.timeout,
+        }
+        if response_format == "json":
+            kwargs["response_format"] = {"type": "json_object"}
+        return kwargs
+
+    @staticmethod
+    def _parse_response(response, input_tokens: int) -> Dict[str, Any]:
+        # 提取关键信息
+        return {
+            "content": response.choices[0].message.content,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens,
+                "cached_tokens": cached_prompt_tokens(response.usage),
+                "local_prompt_tokens": input_tokens
+            },
+            "model": response.model,
+            "timestamp": time.time(),
+        }
+
+    def _build_stream_request(self, messages: List[Dict[str, str]], response_format: str) -> Dict[str, Any]:
+        kwargs = self._build_request(messages, response_format)
+        kwargs["stream"] = True
+        kwargs["stream_options"] = {"include_usage": True}    # 最后一个chunk携带usage
+        return kwargs
+
+    def _stream_result(self, parts: List[str], usage, model: Optional[str], input_tokens: int) -> Dict[str, Any]:
+        """把流式chunk拼装成与chat_completion相同结构的结果；服务端未返回usage时按本地tokenizer统计"""
+        content = "".join(parts)
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        else:
+            prompt_tokens, completion_tokens = input_tokens, self.count_tokens(content)
+        return {
+            "content": content,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "cached_tokens": cached_prompt_tokens(usage),
+                "local_prompt_tokens": input_tokens
+            },
+            "model": model or self.model,
+            "timestamp": time.time(),
+        }
+
+    def _stream_cache_key(self, messages: List[Dict[str, str]], response_format: str) -> Optional[str]:
+        """流式响应与chat_completion使用同一个缓存键，缓存关闭时返回None"""
+        make_cache_key = getattr(type(self).chat_completion, "make_cache_key", None)
+        if make_cache_key is None:
+            return None
+        return make_cache_key(self, messages, response_format=response_format)
+
+    def _reserved_tokens(self, input_tokens: int, kwargs: Dict[str, Any]) -> int:
+        """限流时按输入token + 最大输出token预约，请求完成后按实际用量修正"""
+        return input_tokens + kwargs["max_tokens"]
+
+    def _after_success(self, reserved_tokens: int, usage: Dict[str, Any]) -> None:
+        self.prefix_cache_stats.record(usage["prompt_tokens"], usage.get("cached_tokens"))
+        record_call_usage(usage)
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_success()
+            if usage["total_tokens"] is not None:
+                self.rate_limiter.settle(reserved_tokens, usage["total_tokens"])
+
+    def _after_failure(self, error: Exception) -> Optional[float]:
+        """429/5xx时通知限流器降速，返回服务端要求的Retry-After秒数"""
+        status_code = getattr(error, "status_code", None)
+        response = getattr(error, "response", None)
+        retry_after = parse_retry_after(response.headers.get("retry-after")) if response is not None else None
+        if self.rate_limiter is not None and (status_code == 429 or (status_code or 0) >= 500):
+            self.rate_limiter.on_throttle(retry_after)
+        return retry_after
+
+    def _breaker_guard(self):
+        return self.circuit_breaker.guard() if self.circuit_breaker is not None else nullcontext()
+
+    def _circuit_open(self) -> bool:
+        """熔断已打开时不再退避等待，下一次尝试直接抛出CircuitOpenError"""
+        return self.circuit_breaker is not None and self.circuit_breaker.state == CircuitBreaker.OPEN
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        return {
+            "circuit_breaker": self.circuit_breaker.stats() if self.circuit_breaker is not None else None,
+            "hedging": self.hedger.stats() if self.hedger is not None else None,
+        }
+
+    @staticmethod
+    def _retry_wait(attempt: int, retry_delay: float, retry_after: Optional[float] = None) -> float:
+        # 指数退避 + full jitter，多个线程/进程不会同时重试；不早于服务端的Retry-After
+        return AdaptiveRateLimiter.backoff_delay(attempt, retry_delay, retry_after=retry_after)
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """
+        LLM响应缓存各级命中率，以及磁盘/Redis缓存值的压缩率与编解码耗时
+        """
+        backend = llm_response_cache_manager.backend
+        stats = backend.stats() if isinstance(backend, TieredCacheBackend) else {}
+        stats["codec"] = llm_response_codec.stats()
+        return stats
+
+
+class QwenClient(BaseQwenClient):
+    def __init__(
+            self,
+            config_path: str = DEFAULT_MODEL_CONFIG_PATH,
+            use_cache: bool = True,
+            tokenizer_path: Optional[str] = None
+    ):
+        super().__init__(config_path, use_cache=use_cache, tokenizer_path=tokenizer_path)
+        # vLLM 兼容 OpenAI API，但不需要真实 API key；每个副本一个客户端（各自的连接池）
+        self.clients = {
+            url: OpenAI(
+                base_url=url,
+                api_key="token-abc123",  # vLLM 忽略此字段，但 SDK 要求提供
+            )
+            for url in self.base_urls
+        }
+        self.client = self.clients[self.base_url]
+
+    def _send(self, kwargs: Dict[str, Any]):
+        """发送一次请求：熔断检查 -> 选择副本 -> 调用"""
+        with self._breaker_guard(), self.balancer.route() as replica:
+            return self.clients[replica.base_url].chat.completions.create(**kwargs)
+
+    @track_llm_usage
+    @llm_response_cache_manager.cached(ttl=LLM_RESPONSE_TTL, tags=_llm_response_tags, cache_id=CHAT_COMPLETION_CACHE_ID)
+    def chat_completion(
+            self,
+            messages: List[Dict[str, str]],
+            response_format: str = "text",  # "text" 或 "json"
+            max_retries: int = 3,
+            retry_delay: float = 2.0,
+    ) -> Dict[str, Any]:
+        """
+        调用 LLM，带重试和缓存。
+        返回完整 response dict（含 content、usage 等）
+        """
+        input_tokens = self._check_input_tokens(messages)
+        # 构建请求参数
+        kwargs = self._build_request(messages, response_format)
+        reserved_tokens = self._reserved_tokens(input_tokens, kwargs)
+
+        last_exception = None
+        for attempt in range(max_retries + 1):
+            try:
+                if self.rate_limiter is not None:
+                    # 排队时间超过max_wait时抛出LLMBackpressureError，由调用方稍后重试
+                    self.rate_limiter.acquire(reserved_tokens)
+                # 开启对冲时，超过p95延迟仍未返回会再发一个相同的请求，取先返回的结果
+                if self.hedger is not None:
+                    response = self.hedger.call(lambda: self._send(kwargs))
+                else:
+                    response = self._send(kwargs)
+                result = self._parse_response(response, input_tokens)
+                self._after_success(reserved_tokens, result["usage"])
+                logger.info(f"LLM call succeeded. Tokens: {result['usage']['total_tokens']}")
+                return result
+
+            except RETRYABLE_ERRORS as e:
+                last_exception = e
+                retry_after = self._after_failure(e)
+                logger.warning(f"LLM call failed (attempt {attempt + 1}/{max_retries + 1}): {e}")
+                if attempt < max_retries:
+                    if not self._circuit_open():
+                        time.sleep(self._retry_wait(attempt, retry_delay, retry_after))
+                else:
+                    logger.error("Max retries exceeded.")
+                    raise e
+            except LLMBackpressureError:
+                # 限流排队过长或熔断中，由调用方稍后重试
+                raise
+            except Exception as e:
+                logger.error(f"Unexpected error: {e}")
+                raise e
+
+        raise last_exception
+
+    def chat_completion_stream(
+            self,
+            messages: List[Dict[str, str]],
+            response_format: str = "text",
+            max_retries: int = 3,
+            retry_delay: float = 2.0,
+    ) -> ChatCompletionStream:
+        """
+        流式调用 LLM，边生成边返回增量文本，调用方可以在生成结束前开始处理
+        与chat_completion共享缓存：命中时一次性返回缓存的完整内容；流结束后把拼装好的结果写入缓存
+        只有在输出第一个增量之前失败才会重试，已输出部分内容后失败直接抛出，避免重复输出
+        """
+        stream = ChatCompletionStream()
+        stream._chunks = self._stream_chunks(stream, messages, response_format, max_retries, retry_delay)
+        return stream
+
+    def _stream_chunks(
+            self,
+            stream: ChatCompletionStream,
+            messages: List[Dict[str, str]],
+            response_format: str,
+            max_retries: int,
+            retry_delay: float
+    ) -> Iterator[str]:
+        label = "QwenClient.chat_completion_stream"
+        start = time.perf_counter()
+        cache_key = self._stream_cache_key(messages, response_format)
+        if cache_key is not None:
+            cached = llm_response_cache_manager.lookup(cache_key, label=label)
+            if cached is not CACHE_MISS:
+                stream.result, stream.from_cache = cached, True
+                record_llm_usage(self, cached, time.perf_counter() - start, cache_hit=True)
+                if cached["content"]:
+                    yield cached["content"]
+                return
+
+        try:
+            input_tokens = self._check_input_tokens(messages)
+            kwargs = self._build_stream_request(messages, response_format)
+            reserved_tokens = self._reserved_tokens(input_tokens, kwargs)
+            for attempt in range(max_retries + 1):
+                parts, usage, model = [], None, None
+                try:
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.acquire(reserved_tokens)
+                    # 调用方提前停止迭代时with会关闭底层HTTP连接
+                    with self._breaker_guard(), self.balancer.route() as replica, \
+                            self.clients[replica.base_url].chat.completions.create(**kwargs) as response:
+                        for chunk in response:
+                            model = chunk.model or model
+                            if chunk.usage is not None:
+                                usage = chunk.usage
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                parts.append(chunk.choices[0].delta.content)
+                                yield chunk.choices[0].delta.content
+                    break
+                except RETRYABLE_ERRORS as e:
+                    retry_after = self._after_failure(e)
+                    logger.warning(f"LLM stream failed (attempt {attempt + 1}/{max_retries + 1}): {e}")
+                    if parts or attempt >= max_retries:
+                        raise e
+                    if not self._circuit_open():
+                        time.sleep(self._retry_wait(attempt, retry_delay, retry_after))
+        except Exception as e:
+            # 重试耗尽、输入超长、限流/熔断拒绝等失败也记入台账
+            record_llm_failure(self, e, time.perf_counter() - start)
+            raise
+
+        stream.result = self._stream_result(parts, usage, model, input_tokens)
+        self._after_success(reserved_tokens, stream.result["usage"])
+        record_llm_usage(self, stream.result, time.perf_counter() - start, cache_hit=False)
+        logger.info(f"LLM stream succeeded. Tokens: {stream.result['usage']['total_tokens']}")
+        if cache_key is not None:
+            llm_response_cache_manager.set(cache_key, stream.result, ttl=LLM_RESPONSE_TTL, label=label)
+
+    def health_check(self) -> Dict[str, Any]:
+        """
+        检查 LLM 是否正常
+        """
+        try:
+            start_time = time.time()
+            response = self.chat_completion(
+                messages=[
+                    {"role": "system", "content": "你是一个对话助手."},
+                    {"role": "user", "content": "请回复'hello'确保连接正常"}
+                ],
+                response_format="text",
+            )
+            response_time = time.time() - start_time
+            return {
+                'status': 'healthy',
+                'response_time': response_time,
+                'model': str(self.model),
+                'test_response': response['content'],
+                'cache': self.cache_stats(),
+                'rate_limit': self.rate_limiter.stats() if self.rate_limiter is not None else None,
+                'replicas': self.balancer.stats(),
+                'prefix_cache': self.prefix_cache_stats.stats(),
+                'usage_ledger': llm_usage_ledger.stats(),
+                'resilience': self.resilience_stats(),
+            }
+        except Exception as e:
+            logger.error(f"Failed to check LLM health: {e}")
+            return {}
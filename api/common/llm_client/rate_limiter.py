@@ -0,0 +1,263 @@
+# rate_limiter.py
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from threading import Lock
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackpressureError(Exception):
+    """
+    限流器预计的排队时间超过max_wait时抛出，调用方（如Celery任务）应在retry_after秒后重试，而不是当作失败
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头：秒数或HTTP日期，无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    预约式令牌桶（线程安全）：reserve立即扣减令牌并返回需要等待的秒数，令牌可以透支，
+    排队的调用者按到达顺序依次获得时间片，不会在同一时刻一起醒来
+    capacity_seconds为桶容量对应的秒数，即允许的突发量 = rate * capacity_seconds
+    """
+
+    def __init__(self, rate: float, capacity_seconds: float = 1.0):
+        self._rate = rate
+        self.capacity_seconds = capacity_seconds
+        self._tokens = rate * capacity_seconds
+        self._updated_at = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self, now: float) -> None:
+        capacity = self._rate * self.capacity_seconds
+        self._tokens = min(capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self._rate
+
+    def refund(self, amount: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._rate * self.capacity_seconds, self._tokens + amount)
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = rate
+
+
+# KEYS[1]: 令牌桶hash；ARGV: 扣减量, 默认速率, 容量秒数, 当前时间
+# 速率保存在hash的rate字段中，各进程的AIMD调整对所有进程生效
+_RESERVE_SCRIPT = """
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate') or ARGV[2])
+local capacity = rate * tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or capacity)
+local updated_at = tonumber(redis.call('HGET', KEYS[1], 'updated_at') or now)
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate) - tonumber(ARGV[1])
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now, 'rate', rate)
+redis.call('EXPIRE', KEYS[1], 3600)
+if tokens >= 0 then return '0' end
+return tostring(-tokens / rate)
+"""
+
+
+class RedisTokenBucket:
+    """
+    Redis上的预约式令牌桶，语义同TokenBucket，同一个key的所有进程共享令牌与速率
+    使用服务端Lua脚本保证扣减的原子性；时间取各进程的本地时钟，要求主机间时钟基本同步
+    """
+
+    def __init__(self, client, key: str, rate: float, capacity_seconds: float = 1.0):
+        self.client = client
+        self.key = key
+        self.default_rate = rate
+        self.capacity_seconds = capacity_seconds
+        self._reserve = client.register_script(_RESERVE_SCRIPT)
+
+    @property
+    def rate(self) -> float:
+        rate = self.client.hget(self.key, "rate")
+        return float(rate) if rate is not None else self.default_rate
+
+    def reserve(self, amount: float) -> float:
+        result = self._reserve(keys=[self.key], args=[amount, self.default_rate, self.capacity_seconds, time.time()])
+        return float(result)
+
+    def refund(self, amount: float) -> None:
+        self._reserve(keys=[self.key], args=[-amount, self.default_rate, self.capacity_seconds, time.time()])
+
+    def set_rate(self, rate: float) -> None:
+        self.client.hset(self.key, "rate", rate)
+
+
+class AdaptiveRateLimiter:
+    """
+    LLM调用的客户端限流器，同时限制每秒请求数（rps）和每分钟token数（tpm）
+    - 速率按AIMD自适应：收到429/5xx时乘以decrease_factor（每cooldown秒最多一次），之后每秒成功时加increase_step
+    - 服务端返回Retry-After时所有调用者暂停到该时刻
+    - 预计排队时间超过max_wait时抛出LLMBackpressureError，由调用方稍后重试
+    - 重试间隔使用full jitter（在[0, 指数退避上限]内随机），避免多个线程/进程同步重试
+    传入redis_client时令牌桶与速率保存在Redis中，所有进程共享；否则在进程内的线程间共享
+    """
+
+    def __init__(
+            self,
+            rps: float = 8.0,
+            tpm: Optional[float] = None,
+            min_rps: float = 0.5,
+            max_rps: Optional[float] = None,
+            increase_step: float = 0.5,
+            decrease_factor: float = 0.5,
+            cooldown: float = 1.0,
+            max_wait: Optional[float] = 60.0,
+            redis_client=None,
+            name: str = "llm"
+    ):
+        self.initial_rps = rps
+        self.min_rps = min_rps
+        self.max_rps = max_rps or rps
+        self.initial_tpm = tpm
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.max_wait = max_wait
+        if redis_client is not None:
+            prefix = f"code-review:ratelimit:{name}"
+            self._requests = RedisTokenBucket(redis_client, f"{prefix}:requests", rps)
+            self._tokens = RedisTokenBucket(redis_client, f"{prefix}:tokens", tpm / 60, 60) if tpm else None
+        else:
+            self._requests = TokenBucket(rps)
+            self._tokens = TokenBucket(tpm / 60, capacity_seconds=60) if tpm else None
+        self._lock = Lock()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._last_increase = 0.0
+        self._queue_depth = 0
+        self._throttled = 0
+        self._backpressure = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """当前正在等待令牌的调用数"""
+        return self._queue_depth
+
+    def _reserve(self, tokens: int) -> float:
+        if self.initial_tpm:
+            tokens = min(tokens, self.initial_tpm)     # 超过桶容量的单个请求永远等不到足够的令牌
+        now = time.monotonic()
+        wait = max(self._requests.reserve(1), self._paused_until - now)
+        if self._tokens is not None and tokens:
+            wait = max(wait, self._tokens.reserve(tokens))
+        if self.max_wait is not None and wait > self.max_wait:
+            # 不排队，归还刚刚预约的令牌
+            self._requests.refund(1)
+            if self._tokens is not None and tokens:
+                self._tokens.refund(tokens)
+            with self._lock:
+                self._backpressure += 1
+            raise LLMBackpressureError(f"LLM rate limiter queue is full, estimated wait {wait:.1f}s", retry_after=wait)
+        return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        """预约一次请求和tokens个token，必要时阻塞等待"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            with self._lock:
+                self._queue_depth += 1
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self._queue_depth -= 1
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """acquire的异步版本，等待期间不占用线程"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            with self._lock:
+                self._queue_depth += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                with self._lock:
+                    self._queue_depth -= 1
+
+    def settle(self, reserved_tokens: int, actual_tokens: int) -> None:
+        """请求完成后按实际消耗修正token预约（预约时只能按最大输出估算）"""
+        if self._tokens is not None and reserved_tokens > actual_tokens:
+            self._tokens.refund(reserved_tokens - actual_tokens)
+
+    def _scale(self, factor: float, delta: float = 0.0) -> None:
+        rps = min(self.max_rps, max(self.min_rps, self._requests.rate * factor + delta))
+        self._requests.set_rate(rps)
+        if self._tokens is not None:
+            # token速率与请求速率按同一比例调整，不超过配置的tpm
+            self._tokens.set_rate(self.initial_tpm / 60 * min(1.0, rps / self.initial_rps))
+
+    def on_success(self) -> None:
+        """加性增：每秒最多增加一次"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_increase < 1.0 or now - self._last_decrease < self.cooldown:
+                return
+            self._last_increase = now
+        if self._requests.rate < self.max_rps:
+            self._scale(1.0, self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """乘性减：收到429/5xx时调用；同一波拒绝（cooldown内）只降一次速"""
+        now = time.monotonic()
+        with self._lock:
+            self._throttled += 1
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+        self._scale(self.decrease_factor)
+        logger.warning(f"LLM rate limited, request rate reduced to {self._requests.rate:.2f}/s")
+
+    @staticmethod
+    def backoff_delay(attempt: int, base: float, cap: float = 60.0, retry_after: Optional[float] = None) -> float:
+        """full jitter退避：在[0, min(cap, base * 2^attempt)]内随机，且不早于Retry-After"""
+        delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rps": self._requests.rate,
+            "tpm": self._tokens.rate * 60 if self._tokens is not None else None,
+            "queue_depth": self._queue_depth,
+            "throttled": self._throttled,
+            "backpressure": self._backpressure,
+            "paused_for": max(0.0, self._paused_until - time.monotonic()),
+        }
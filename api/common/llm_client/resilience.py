@@ -0,0 +1,317 @@
+# resilience.py
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from api.common.llm_client.rate_limiter import LLMBackpressureError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(LLMBackpressureError):
+    """
+    熔断器打开（后端持续失败）时立即抛出，不再发送请求和退避重试
+    继承LLMBackpressureError，Celery任务按retry_after稍后重试（见tasks.backpressure）
+    """
+
+
+class CircuitBreaker:
+    """
+    LLM后端熔断器（线程安全）：
+    - closed：正常放行，连续failure_threshold次失败后打开
+    - open：所有请求立即抛出CircuitOpenError，recovery_timeout秒后进入half-open
+    - half-open：最多放行half_open_max_calls个探测请求，成功则关闭，失败则重新打开
+    失败由is_failure判断（连接错误/5xx），429与其他4xx说明后端仍在响应，按成功处理
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self,
+            failure_threshold: int = 5,
+            recovery_timeout: float = 30.0,
+            half_open_max_calls: int = 1,
+            is_failure: Callable[[BaseException], bool] = lambda error: True,
+            name: str = "llm"
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.is_failure = is_failure
+        self.name = name
+        self._lock = Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._rejected = 0
+        self._opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == self.OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def before_call(self) -> None:
+        """放行一个请求，熔断中时抛出CircuitOpenError"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return
+            self._rejected += 1
+            retry_after = max(0.0, self._opened_at + self.recovery_timeout - now) if state == self.OPEN else 1.0
+        raise CircuitOpenError(f"LLM circuit breaker {self.name} is {state}", retry_after=retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"LLM circuit breaker {self.name} closed")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._half_open_calls = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or (
+                    self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._opened += 1
+                logger.warning(f"LLM circuit breaker {self.name} opened after "
+                               f"{self._consecutive_failures} consecutive failures")
+
+    def _release(self) -> None:
+        """结果不能说明后端状态（如任务被取消）时归还half-open的探测名额"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """with breaker.guard(): 发送请求；按结果更新熔断状态"""
+        self.before_call()
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            self._release()
+            raise
+        self.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(time.monotonic()),
+                "consecutive_failures": self._consecutive_failures,
+                "opened": self._opened,
+                "rejected": self._rejected,
+            }
+
+
+class LatencyTracker:
+    """最近window个成功请求的延迟，用于计算分位数"""
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Hedger:
+    """
+    对冲请求：请求在最近延迟的percentile分位数（默认p95）内没有返回时，再发一个相同的请求，
+    取先成功的结果并取消另一个
+    - 样本数不足min_samples时不对冲；对冲等待时间不小于min_delay
+    - 对冲请求数不超过总请求数的max_ratio，后端整体变慢时不会把负载放大一倍
+    - 对冲请求经由负载均衡器选择副本，原请求所在副本的在途数更高，因此通常会发往另一个副本
+    落后的请求：
+    - 异步调用直接取消落后的任务（同时关闭其连接）；调用方被取消时两个任务都会被取消
+    - 同步调用的原请求在独立线程中立即发出，不在共享线程池中排队，对冲等待时间从原请求真正发出时算起，
+      线程池被占满时也不会因排队而误发对冲；只有对冲请求提交到线程池，尚未开始的对冲请求会被取消。
+      已经开始的请求无法中断底层HTTP调用，会执行到结束并丢弃结果，期间只占用负载均衡器的在途计数（结束时归还）
+    限流器在每次尝试调用call/acall之前只预约一次，按胜出请求的用量修正；对冲请求不单独预约，
+    其数量由max_ratio限制，因此落后的请求没有需要归还的预约
+    """
+
+    def __init__(
+            self,
+            percentile: float = 0.95,
+            min_samples: int = 20,
+            min_delay: float = 1.0,
+            max_ratio: float = 0.1,
+            window: int = 500,
+            max_workers: int = 32
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.max_workers = max_workers
+        self.latency = LatencyTracker(window)
+        self._lock = Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """当前的对冲等待时间，样本不足时为None"""
+        if len(self.latency) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latency.percentile(self.percentile))
+
+    def _start(self) -> Optional[float]:
+        with self._lock:
+            self._requests += 1
+        return self.hedge_delay()
+
+    def _take_hedge_budget(self) -> bool:
+        with self._lock:
+            if self._hedged + 1 > self.max_ratio * self._requests:
+                return False
+            self._hedged += 1
+            return True
+
+    def _timed(self, fn: Callable[[], Any]) -> Any:
+        start = time.monotonic()
+        result = fn()
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-hedge")
+            return self._executor
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        delay = self._start()
+        if delay is None:
+            return self._timed(fn)
+        pool = self._pool()
+        finished = Event()
+
+        def attempt() -> Any:
+            # 排队期间另一个请求已经成功（或调用方已放弃）时不再发送
+            if finished.is_set():
+                raise CancelledError()
+            result = self._timed(fn)
+            finished.set()
+            return result
+
+        primary: Future = Future()
+
+        def run_primary():
+            if not primary.set_running_or_notify_cancel():
+                return
+            try:
+                primary.set_result(attempt())
+            except BaseException as e:
+                primary.set_exception(e)
+
+        # 原请求不经过线程池：线程池被落后的请求或其他调用方的对冲占满时，排队时间不能算进对冲等待时间
+        Thread(target=run_primary, name="llm-hedge-primary", daemon=True).start()
+        futures = [primary]
+        try:
+            done, _ = wait([primary], timeout=delay)
+            if done or not self._take_hedge_budget():
+                return primary.result()
+            logger.info(f"LLM request exceeded {delay:.2f}s, sending hedged request")
+            hedge = pool.submit(attempt)
+            futures.append(hedge)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is hedge:
+                            with self._lock:
+                                self._hedge_wins += 1
+                        return future.result()
+            return primary.result()     # 两个都失败时抛出原请求的异常
+        finally:
+            # 返回结果或调用方被中断（如Celery软超时）时，还在线程池中排队的请求不再发送
+            finished.set()
+            for future in futures:
+                future.cancel()
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        delay = self._start()
+
+        async def timed() -> Any:
+            start = time.monotonic()
+            result = await fn()
+            self.latency.record(time.monotonic() - start)
+            return result
+
+        if delay is None:
+            return await timed()
+        primary = asyncio.ensure_future(timed())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._take_hedge_budget():
+                return await primary
+            logger.info(f"LLM request exceeded {delay:.2f}s, sending hedged request")
+            hedge = asyncio.ensure_future(timed())
+            tasks.append(hedge)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            with self._lock:
+                                self._hedge_wins += 1
+                        return task.result()
+            return primary.result()
+        finally:
+            # 有结果、两个都失败或调用方被取消（包括还在等待对冲时机时）都取消未完成的任务
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests, hedged, wins = self._requests, self._hedged, self._hedge_wins
+        return {
+            "requests": requests,
+            "hedged": hedged,
+            "hedge_wins": wins,
+            "hedge_delay": self.hedge_delay(),
+        }
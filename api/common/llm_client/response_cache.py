@@ -0,0 +1,112 @@
+# response_cache.py
+"""
+LLM响应缓存（内存L1 + 磁盘/Redis L2）的管理器，从qwen_client中拆出：
+导入本模块不会加载openai与transformers，API进程导入后即可在缓存监控接口中看到并失效llm_responses缓存
+导入时不读写快照：实际调用LLM的进程在启动时（Celery worker的预热信号）调用register_llm_response_snapshot
+"""
+from typing import Optional
+
+from api.common.cache.access_log import AccessLog
+from api.common.cache.cache_key import CacheKeyBuilder, fingerprint_messages
+from api.common.cache.cache_manager import CacheBackend, CacheManager, FileCacheBackend, build_memory_backend
+from api.common.cache.codec import ValueCodec
+from api.common.cache.tiered_backend import TieredCacheBackend
+from api.common.cache.warmup import register_cache_snapshot
+from api.common.config.system_config import code_review_config, resolve_project_path
+
+# 缓存配置，对应code-review-config.yaml中的cache.mem_cache、cache.file_cache与cache.redis_cache
+MEM_CACHE_CONFIG = code_review_config.get("cache", {}).get("mem_cache", {})
+FILE_CACHE_CONFIG = code_review_config.get("cache", {}).get("file_cache", {})
+REDIS_CACHE_CONFIG = code_review_config.get("cache", {}).get("redis_cache", {})
+SNAPSHOT_CONFIG = MEM_CACHE_CONFIG.get("snapshot", {})
+LLM_RESPONSE_TTL = (REDIS_CACHE_CONFIG if REDIS_CACHE_CONFIG.get("enabled", False)
+                    else FILE_CACHE_CONFIG).get("timeout", 86400)
+# 磁盘缓存与快照目录，相对路径按项目根目录解析（不随进程的工作目录变化）
+CACHE_DIR = resolve_project_path(FILE_CACHE_CONFIG.get("dir", "cache_messages/llm_responses"))
+SNAPSHOT_DIR = resolve_project_path(SNAPSHOT_CONFIG.get("dir", "cache_snapshots"))
+
+
+# LLM响应是纯文本/JSON结构，使用JSON序列化（解码不执行代码）+ zlib压缩，小于1KB的响应不压缩
+llm_response_codec = ValueCodec(serializer="json", compression="zlib", compress_threshold=1024, allow_pickle=False)
+
+
+def _build_shared_cache_backend() -> Optional[CacheBackend]:
+    """
+    L2缓存：启用redis_cache时使用Redis（API进程与所有worker共享），否则使用磁盘缓存（同一主机共享）
+    """
+    if REDIS_CACHE_CONFIG.get("enabled", False):
+        from api.common.cache.redis_backend import RedisCacheBackend
+        return RedisCacheBackend(url=REDIS_CACHE_CONFIG.get("url"), codec=llm_response_codec)
+    if FILE_CACHE_CONFIG.get("enabled", True):
+        return FileCacheBackend(
+            CACHE_DIR,
+            max_bytes=FILE_CACHE_CONFIG.get("max_bytes"),
+            process_safe=True,      # API进程与多个Celery worker共享同一缓存目录
+            janitor_interval=FILE_CACHE_CONFIG.get("janitor_interval"),
+            codec=llm_response_codec
+        )
+    return None
+
+
+def _build_llm_response_cache_backend() -> CacheBackend:
+    """
+    LLM响应缓存：内存(L1) + 共享缓存(L2)两级缓存，各级TTL取自配置
+    只启用其中一级时直接使用该级后端
+    """
+    mem_enabled = MEM_CACHE_CONFIG.get("enabled", True)
+    mem_backend = build_memory_backend(MEM_CACHE_CONFIG.get("max_size", 1000), MEM_CACHE_CONFIG.get("num_shards", 1))
+    shared_backend = _build_shared_cache_backend()
+    if mem_enabled and shared_backend is not None:
+        return TieredCacheBackend(
+            l1=mem_backend,
+            l2=shared_backend,
+            l1_ttl=MEM_CACHE_CONFIG.get("timeout", 3600),
+            l2_ttl=LLM_RESPONSE_TTL
+        )
+    return shared_backend if shared_backend is not None else mem_backend
+
+
+# LLM响应缓存键：messages按消息内容摘要参与哈希，QwenClient实例以"模型名@配置版本"区分
+LLM_RESPONSE_CACHE_VERSION = "llm_responses:v1"
+LLM_RESPONSE_TAG = "llm_responses"
+# 记录最近一次使用的模型，model.yaml切换模型后使旧模型的全部缓存响应失效
+ACTIVE_MODEL_CACHE_KEY = "llm-active-model"
+# 访问日志：记录每次LLM响应缓存访问，快照缺失时按日志从L2预热L1
+llm_response_access_log = (
+    AccessLog(SNAPSHOT_DIR / "llm_responses.access.log")
+    if SNAPSHOT_CONFIG.get("enabled", True) and SNAPSHOT_CONFIG.get("access_log", True) else None
+)
+llm_response_cache_manager = CacheManager(
+    _build_llm_response_cache_backend(),
+    name="llm_responses",
+    access_log=llm_response_access_log,
+    key_builder=CacheKeyBuilder(
+        namespace=LLM_RESPONSE_CACHE_VERSION,
+        fingerprints={"messages": fingerprint_messages},
+        ignore=("max_retries", "retry_delay")
+    ),
+    enabled=(MEM_CACHE_CONFIG.get("enabled", True) or FILE_CACHE_CONFIG.get("enabled", True)
+             or REDIS_CACHE_CONFIG.get("enabled", False))
+)
+
+
+def register_llm_response_snapshot() -> int:
+    """
+    LLM响应的内存缓存（L1）跨重启保留：载入上次退出时保存的最热条目，快照缺失时按访问日志从L2预热，
+    并在进程退出时保存快照。由调用LLM的进程在启动时显式调用，返回恢复/预热的条目数
+    """
+    backend = llm_response_cache_manager.backend
+    tiered = isinstance(backend, TieredCacheBackend)
+    memory_backend = backend.l1 if tiered else backend
+    if not SNAPSHOT_CONFIG.get("enabled", True) or not hasattr(memory_backend, "hottest"):
+        return 0
+    return register_cache_snapshot(
+        "llm_responses",
+        memory_backend,
+        SNAPSHOT_DIR,
+        top_n=SNAPSHOT_CONFIG.get("top_n", 500),
+        codec=llm_response_codec,
+        access_log=llm_response_access_log,
+        warm_source=backend.l2 if tiered else None,
+        warm_ttl=backend.l1_ttl if tiered else None
+    )
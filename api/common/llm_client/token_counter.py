@@ -0,0 +1,116 @@
+# token_counter.py
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from api.common.cache.cache_key import fingerprint_text
+from api.common.cache.cache_manager import CACHE_MISS, CacheManager, build_memory_backend
+from api.common.config.system_config import code_review_config
+
+logger = logging.getLogger(__name__)
+
+# 按“tokenizer + 文本摘要”缓存的token数，同一进程内的所有客户端共用
+token_count_cache_manager = CacheManager(
+    build_memory_backend(50000, code_review_config.get("cache", {}).get("mem_cache", {}).get("num_shards", 1)),
+    name="token_counts"
+)
+
+# 聊天模板把这些角色的content原样放在 "<|im_start|>{role}\n" 与 "<|im_end|>" 之间，可以按消息拆分计算；
+# assistant消息会被模板改写（如去掉<think>部分），带tool_calls等字段的消息结构不固定，这些情况走完整计算
+_SPLITTABLE_ROLES = frozenset(("system", "user"))
+_PLACEHOLDER = "x"
+
+
+def _layout(messages: List[Dict[str, Any]]) -> Optional[Tuple[str, ...]]:
+    """
+    对话的角色布局（角色序列），不能按消息拆分计算时返回None
+    content以空白开头时可能与模板中角色后的换行合并成一个token，同样不拆分
+    """
+    roles = []
+    for message in messages:
+        content = message.get("content")
+        if (len(message) != 2 or message.get("role") not in _SPLITTABLE_ROLES or not isinstance(content, str)
+                or content[:1].isspace()):
+            return None
+        roles.append(message["role"])
+    return tuple(roles)
+
+
+class TokenCounter:
+    """
+    带备忘录的token计数器
+    - 单段文本：按内容摘要缓存token数，同一个大系统提示词只分词一次
+    - messages：token数 = 模板开销（按角色布局只计算一次） + 各条content的token数之和；
+      每种布局第一次出现时与完整的apply_chat_template + encode结果核对，不一致的布局以后都走完整计算
+    - 批量接口对未缓存的文本使用fast tokenizer的批量编码
+    """
+
+    def __init__(self, tokenizer, namespace: str, cache_manager: CacheManager = token_count_cache_manager):
+        self.tokenizer = tokenizer
+        self.namespace = namespace
+        self.cache_manager = cache_manager
+        self._layout_overheads: Dict[Tuple[str, ...], Optional[int]] = {}
+
+    def _key(self, text: str) -> str:
+        return f"{self.namespace}:{fingerprint_text(text).hex()}"
+
+    def _encode_lengths(self, texts: Sequence[str]) -> List[int]:
+        if len(texts) > 1 and getattr(self.tokenizer, "is_fast", False):
+            return [len(ids) for ids in self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]]
+        return [len(self.tokenizer.encode(text, add_special_tokens=False)) for text in texts]
+
+    def count_text(self, text: str) -> int:
+        return self.count_texts([text])[0]
+
+    def count_texts(self, texts: Sequence[str]) -> List[int]:
+        """批量计算文本的token数，结果顺序与输入一致"""
+        keys = {text: self._key(text) for text in texts}
+        counts: Dict[str, int] = {}
+        for text, key in keys.items():
+            count = self.cache_manager.lookup(key, label="TokenCounter.count_texts")
+            if count is not CACHE_MISS:
+                counts[text] = count
+        missing = [text for text in keys if text not in counts]
+        if missing:
+            lengths = self._encode_lengths(missing)
+            counts.update(zip(missing, lengths))
+            self.cache_manager.backend.set_many({keys[text]: length for text, length in zip(missing, lengths)})
+        return [counts[text] for text in texts]
+
+    def _count_exact(self, messages: List[Dict[str, Any]]) -> int:
+        prompt = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        return len(self.tokenizer.encode(prompt, add_special_tokens=False))
+
+    def _template_overhead(self, layout: Tuple[str, ...]) -> int:
+        placeholder = [{"role": role, "content": _PLACEHOLDER} for role in layout]
+        return self._count_exact(placeholder) - len(layout) * self.count_text(_PLACEHOLDER)
+
+    def _calibrate(self, layout: Tuple[str, ...], messages: List[Dict[str, Any]], content_tokens: int) -> Optional[int]:
+        overhead = self._template_overhead(layout)
+        exact = self._count_exact(messages)
+        if overhead + content_tokens != exact:
+            logger.warning(f"Per-message token counting disabled for layout {layout}: "
+                           f"estimated {overhead + content_tokens}, actual {exact}")
+            return None
+        return overhead
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        return self.count_messages_many([messages])[0]
+
+    def count_messages_many(self, conversations: Sequence[List[Dict[str, Any]]]) -> List[int]:
+        """批量计算多个对话套用聊天模板后的token数，所有对话中未缓存的content一次批量编码"""
+        layouts = [_layout(messages) for messages in conversations]
+        contents = list(dict.fromkeys(message["content"] for messages, layout in zip(conversations, layouts)
+                                      if layout is not None for message in messages))
+        content_counts = dict(zip(contents, self.count_texts(contents))) if contents else {}
+
+        results = []
+        for messages, layout in zip(conversations, layouts):
+            if layout is None:
+                results.append(self._count_exact(messages))
+                continue
+            content_tokens = sum(content_counts[message["content"]] for message in messages)
+            if layout not in self._layout_overheads:
+                self._layout_overheads[layout] = self._calibrate(layout, messages, content_tokens)
+            overhead = self._layout_overheads[layout]
+            results.append(self._count_exact(messages) if overhead is None else overhead + content_tokens)
+        return results
@@ -0,0 +1,273 @@
+# usage_ledger.py
+import asyncio
+import atexit
+import contextvars
+import functools
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from api.common.config.system_config import code_review_config
+from api.common.llm_client.rate_limiter import LLMBackpressureError
+
+logger = logging.getLogger(__name__)
+
+USAGE_CONFIG = code_review_config.get("llm_usage", {})
+
+# 当前调用归属的项目/审查任务，由调用方通过llm_usage_context设置；asyncio任务自动继承，线程池需显式复制上下文
+_usage_tags: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("llm_usage_tags", default={})
+# 正在进行的chat_completion调用：真正请求了LLM时由_after_success写入usage，没有写入说明命中了缓存
+_current_call: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("llm_current_call", default=None)
+
+
+@contextmanager
+def llm_usage_context(
+        project_id: Any = None,
+        review_task_id: Any = None,
+        task_type: Optional[str] = None
+) -> Iterator[None]:
+    """
+    with llm_usage_context(project_id=..., review_task_id=..., task_type=...): 其中的LLM调用记到该项目/任务名下
+    未指定的字段沿用外层上下文
+    """
+    tags = dict(_usage_tags.get())
+    for key, value in (("project_id", project_id), ("review_task_id", review_task_id), ("task_type", task_type)):
+        if value is not None:
+            tags[key] = value
+    token = _usage_tags.set(tags)
+    try:
+        yield
+    finally:
+        _usage_tags.reset(token)
+
+
+def submit_with_context(pool, fn: Callable, *args, **kwargs):
+    """pool.submit的包装：在调用线程复制contextvars，任务在线程池中运行时仍能读到用量标签"""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _uuid_or_none(value: Any) -> Optional[uuid.UUID]:
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def record_call_usage(usage: Dict[str, Any]) -> None:
+    """客户端真正调用LLM成功后调用，把用量交给外层的track_llm_usage"""
+    call = _current_call.get()
+    if call is not None:
+        call["usage"] = usage
+
+
+class UsageLedger:
+    """
+    进程内的LLM用量缓冲：record()只追加到内存队列，后台线程每flush_interval秒或攒够batch_size条时批量写入数据库
+    - 写入失败时记录放回队列，下次重试；队列超过max_buffer时丢弃最旧的记录并计数
+    - fork出的子进程清空继承的缓冲（由父进程负责写入），在子进程中第一次record时重新启动后台线程
+    - 进程正常退出时（atexit、Celery worker shutdown）写入剩余记录
+    """
+
+    def __init__(
+            self,
+            writer: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+            flush_interval: float = 5.0,
+            batch_size: int = 500,
+            max_buffer: int = 100000,
+            enabled: bool = True
+    ):
+        self.writer = writer or _insert_usage_rows
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.enabled = enabled
+        self._init_state()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._init_state)
+        atexit.register(self.flush)
+
+    def _init_state(self) -> None:
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._buffer: deque = deque()
+        self._wakeup = Event()
+        self._thread: Optional[Thread] = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, **row: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._buffer.append(row)
+            self.recorded += 1
+            while len(self._buffer) > self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+            full = len(self._buffer) >= self.batch_size
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="llm-usage-ledger", daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """把缓冲中的记录全部写入，返回写入的条数"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                if not batch:
+                    return written
+                try:
+                    self.writer(batch)
+                except Exception as e:
+                    logger.warning(f"Failed to write {len(batch)} LLM usage records, will retry: {e}")
+                    with self._lock:
+                        self._buffer.extendleft(reversed(batch))
+                        while len(self._buffer) > self.max_buffer:
+                            self._buffer.popleft()
+                            self.dropped += 1
+                    return written
+                written += len(batch)
+                with self._lock:
+                    self.written += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "buffered": len(self._buffer),
+                "recorded": self.recorded,
+                "written": self.written,
+                "dropped": self.dropped,
+            }
+
+
+_engine = None
+_engine_pid: Optional[int] = None
+_engine_lock = Lock()
+
+
+def _insert_usage_rows(rows: List[Dict[str, Any]]) -> None:
+    """
+    默认的写入方式：使用独立的SQLAlchemy engine执行一次多行insert
+    不依赖Flask应用上下文，Web进程与Celery worker都可以写入
+    """
+    global _engine, _engine_pid
+    from sqlalchemy import create_engine
+    from api.common.config.system_config import relation_db_uri
+    from api.models.model_llm_usage import LLMUsage
+
+    with _engine_lock:
+        # 子进程不复用父进程的连接
+        if _engine is None or _engine_pid != os.getpid():
+            engine = create_engine(relation_db_uri(), pool_size=1, max_overflow=0, pool_pre_ping=True)
+            # 项目没有迁移工具，台账表不存在时创建（worker可能先于Web进程写入）
+            LLMUsage.__table__.create(engine, checkfirst=True)
+            _engine, _engine_pid = engine, os.getpid()
+    with _engine.begin() as connection:
+        connection.execute(LLMUsage.__table__.insert(), rows)
+
+
+llm_usage_ledger = UsageLedger(
+    flush_interval=USAGE_CONFIG.get("flush_interval", 5),
+    batch_size=USAGE_CONFIG.get("batch_size", 500),
+    max_buffer=USAGE_CONFIG.get("max_buffer", 100000),
+    enabled=USAGE_CONFIG.get("enabled", True),
+)
+
+
+def record_llm_usage(
+        client,
+        result: Any,
+        latency: float,
+        cache_hit: bool,
+        status: str = "success",
+        error: Optional[BaseException] = None
+) -> None:
+    """
+    向台账追加一条记录，项目/任务取自当前的llm_usage_context
+    命中缓存（或与其他并发调用合并）时记录缓存结果中的用量，即本次节省的token；失败的调用没有用量，token记为0
+    """
+    usage = (result.get("usage") or {}) if isinstance(result, dict) else {}
+    tags = _usage_tags.get()
+    llm_usage_ledger.record(
+        id=uuid.uuid4(),
+        project_id=_uuid_or_none(tags.get("project_id")),
+        review_task_id=_uuid_or_none(tags.get("review_task_id")),
+        task_type=tags.get("task_type"),
+        model=str(result.get("model") if isinstance(result, dict) and result.get("model") else client.model),
+        prompt_tokens=usage.get("prompt_tokens") or 0,
+        completion_tokens=usage.get("completion_tokens") or 0,
+        cached_tokens=None if cache_hit else usage.get("cached_tokens"),
+        latency_ms=latency * 1000,
+        cache_hit=cache_hit,
+        status=status,
+        error_type=type(error).__name__ if error is not None else None,
+        created_at=datetime.now(),
+    )
+
+
+def record_llm_failure(client, error: Exception, latency: float) -> None:
+    """记录一次失败的调用：限流/熔断拒绝（LLMBackpressureError）记为rejected，其余记为error"""
+    status = "rejected" if isinstance(error, LLMBackpressureError) else "error"
+    record_llm_usage(client, None, latency, cache_hit=False, status=status, error=error)
+
+
+def track_llm_usage(method: Callable) -> Callable:
+    """
+    装饰（已加响应缓存的）chat_completion，每次调用（包括失败与被限流拒绝的调用）向台账追加一条记录；同步与异步方法都适用
+    放在缓存装饰器外层，被装饰方法的__wrapped__仍指向未缓存的原函数
+    """
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            call: Dict[str, Any] = {}
+            token = _current_call.set(call)
+            start = time.perf_counter()
+            try:
+                result = await method(self, *args, **kwargs)
+            except Exception as e:
+                record_llm_failure(self, e, time.perf_counter() - start)
+                raise
+            finally:
+                _current_call.reset(token)
+            record_llm_usage(self, result, time.perf_counter() - start, cache_hit="usage" not in call)
+            return result
+
+        wrapper = async_wrapper
+    else:
+        @functools.wraps(method)
+        def sync_wrapper(self, *args, **kwargs):
+            call: Dict[str, Any] = {}
+            token = _current_call.set(call)
+            start = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception as e:
+                record_llm_failure(self, e, time.perf_counter() - start)
+                raise
+            finally:
+                _current_call.reset(token)
+            record_llm_usage(self, result, time.perf_counter() - start, cache_hit="usage" not in call)
+            return result
+
+        wrapper = sync_wrapper
+    wrapper.__wrapped__ = getattr(method, "__wrapped__", method)
+    return wrapper
@@ -0,0 +1,22 @@
+import random
+from functools import wraps
+
+from api.common.llm_client.rate_limiter import LLMBackpressureError
+
+
+def retry_on_backpressure(max_retries: int = 10, max_jitter: float = 5.0):
+    """
+    用于bind=True的Celery任务：LLM限流器排队已满（LLMBackpressureError）时，
+    按限流器给出的等待时间加随机抖动重新投递任务，而不是让任务失败
+    只对会调用QwenClient的任务有意义（analyze_code_task目前是不调用LLM的占位实现，没有使用）
+    """
+    def decorator(task_func):
+        @wraps(task_func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return task_func(self, *args, **kwargs)
+            except LLMBackpressureError as e:
+                raise self.retry(exc=e, countdown=e.retry_after + random.uniform(0, max_jitter),
+                                 max_retries=max_retries)
+        return wrapper
+    return decorator
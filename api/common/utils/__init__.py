@@ -1,3 +1,28 @@
-from .vector_db_client import VectorDBClient
+from api.common.utils.help_functions import ProcessLocal
 
-vector_db = VectorDBClient()
+
+def _create_vector_db():
+    from .vector_db_client import VectorDBClient
+    return VectorDBClient()
+
+
+# Chroma的PersistentClient在第一次使用时才打开，只导入http_response等工具模块的进程不再承担这部分开销
+_vector_db = ProcessLocal(_create_vector_db, name="VectorDBClient")
+
+
+def get_vector_db():
+    return _vector_db.get()
+
+
+def prewarm_vector_db() -> None:
+    _vector_db.get()
+
+
+def __getattr__(name):
+    # 兼容 from api.common.utils import vector_db / VectorDBClient 的旧写法
+    if name == "vector_db":
+        return get_vector_db()
+    if name == "VectorDBClient":
+        from .vector_db_client import VectorDBClient
+        return VectorDBClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,7 @@
+from api.models.model_user import User
+
+
+def is_admin(user_id) -> bool:
+    """JWT中的用户是否为管理员（role为admin），用于系统管理类接口的鉴权"""
+    user = User.query.filter_by(id=user_id).first()
+    return user is not None and user.role == 'admin'
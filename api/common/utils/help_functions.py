@@ -1,5 +1,13 @@
 import hashlib
-from typing import Union
+import logging
+import os
+import time
+from threading import Lock
+from typing import Callable, Generic, Optional, TypeVar, Union
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 
 def deterministic_hash(
@@ -57,3 +65,46 @@ def format_file_size(size_bytes):
     else:
         return f"{size:.1f}{size_units[unit_index]}"
 
+
+class ProcessLocal(Generic[T]):
+    """
+    线程安全、进程内的惰性单例：第一次get()时调用factory创建实例，之后直接返回
+    fork出的子进程（如prefork的Celery worker）不继承父进程的实例，在子进程中第一次访问时重新创建，
+    避免多个进程共用同一个HTTP连接池或数据库句柄
+    """
+
+    def __init__(self, factory: Callable[[], T], name: Optional[str] = None):
+        self._factory = factory
+        self.name = name or getattr(factory, "__qualname__", repr(factory))
+        self._lock = Lock()
+        self._instance: Optional[T] = None
+        self._pid: Optional[int] = None
+        self.init_seconds: Optional[float] = None     # 创建实例的耗时
+        if hasattr(os, "register_at_fork"):
+            # fork时其他线程可能正持有锁，子进程中换一把新锁
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = Lock()
+
+    def get(self) -> T:
+        instance = self._instance
+        if instance is not None and self._pid == os.getpid():
+            return instance
+        with self._lock:
+            if self._instance is None or self._pid != os.getpid():
+                start = time.perf_counter()
+                self._instance = self._factory()
+                self._pid = os.getpid()
+                self.init_seconds = time.perf_counter() - start
+                logger.info(f"{self.name} initialized in {self.init_seconds:.3f}s")
+            return self._instance
+
+    def initialized(self) -> bool:
+        return self._instance is not None and self._pid == os.getpid()
+
+    def reset(self) -> None:
+        """丢弃当前实例，下次get()时重新创建"""
+        with self._lock:
+            self._instance = None
+            self._pid = None
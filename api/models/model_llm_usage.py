@@ -0,0 +1,35 @@
+import uuid
+
+from sqlalchemy.dialects.postgresql import UUID
+
+from . import db
+
+
+# LLM用量台账：每次chat_completion调用一条记录（命中响应缓存、失败、被限流拒绝的调用也记录，便于统计节省的token与失败率）
+# 记录先在进程内缓冲，由api.common.llm_client.usage_ledger批量写入
+class LLMUsage(db.Model):
+    __tablename__ = 'llm_usages'
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # 不加外键：台账在项目/任务删除后仍需保留用于成本统计，批量写入也不应因为单条记录的外键失败
+    project_id = db.Column(UUID(as_uuid=True), nullable=True)
+    review_task_id = db.Column(UUID(as_uuid=True), nullable=True)
+    task_type = db.Column(db.String(64), nullable=True)     # full/quality/performance/security，非审查任务为空
+    model = db.Column(db.String(128), nullable=False)
+    # token用量（命中缓存时为缓存结果中的用量，即本次节省的token）
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+    cached_tokens = db.Column(db.Integer, nullable=True)    # 命中vLLM前缀缓存的prompt token数，服务端未返回时为空
+    latency_ms = db.Column(db.Float, nullable=False)        # 调用方看到的耗时，包含排队与重试
+    cache_hit = db.Column(db.Boolean, nullable=False, default=False)
+    # success：成功；error：重试耗尽或不可重试的错误；rejected：限流排队过长或熔断中（LLMBackpressureError），稍后重试
+    status = db.Column(db.String(16), nullable=False, default='success')
+    error_type = db.Column(db.String(128), nullable=True)   # 失败时的异常类名
+    created_at = db.Column(db.TIMESTAMP, nullable=False, default=db.func.now())
+
+    # 索引
+    __table_args__ = (
+        db.Index('idx_llm_usage_project_created_at', 'project_id', 'created_at'),     # 按项目 + 时间范围汇总
+        db.Index('idx_llm_usage_task_type_created_at', 'task_type', 'created_at'),    # 按任务类型 + 时间范围汇总
+        db.Index('idx_llm_usage_review_task_id', 'review_task_id'),
+        db.Index('idx_llm_usage_created_at', 'created_at'),
+    )
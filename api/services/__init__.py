@@ -9,6 +9,8 @@ from api.services.code_review_test import *
 from api.services.code_projects.projects_manage_v1 import *
 from api.services.code_projects.code_file_manage_v1 import *
 from api.services.code_review.code_review_manage_v1 import *
+from api.services.system_admin.cache_monitor_v1 import *
+from api.services.system_admin.llm_usage_v1 import *
 
 
 @bp.route('/tasks/<task_id>', methods=['GET'])
@@ -41,8 +41,8 @@ def healthcheck():
             status['status'] = 'degraded'
         # LLM
         try:
-            from api.common.llm_client import llm_client
-            llm_client.health_check()
+            from api.common.llm_client import get_llm_client
+            get_llm_client().health_check()
             status['services']['llm'] = 'healthy'
         except Exception as e:
             status['services']['llm'] = 'error' + str(e)
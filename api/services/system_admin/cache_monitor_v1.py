@@ -0,0 +1,93 @@
+import os
+import socket
+
+from flask import Response, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from api.common.cache.cache_manager import get_cache_managers
+from api.common.cache.cache_stats import to_prometheus
+# LLM响应缓存在Celery worker中使用，API进程需要显式导入才会注册llm_responses，失效接口才能找到它
+import api.common.llm_client.response_cache  # noqa: F401
+from api.common.utils.auth_helpers import is_admin
+from api.common.utils.http_response import success_response, error_response
+from api.services import bp as service_bp
+
+
+def _describe_caches() -> dict:
+    return {name: manager.describe() for name, manager in get_cache_managers().items()}
+
+
+def _process_scope() -> dict:
+    """
+    监控数据的范围：缓存计数器保存在各进程的内存中，接口只能返回处理本次请求的API进程的数据；
+    LLM调用发生在Celery worker中，worker的缓存命中率需要在worker进程内查看（如QwenClient.health_check中的cache）
+    """
+    return {
+        "process": "api",
+        "pid": os.getpid(),
+        "hostname": socket.gethostname(),
+        "note": "仅包含当前API进程内的缓存，不包含Celery worker进程；多进程部署时每次请求可能由不同的进程处理",
+    }
+
+
+@service_bp.route('/admin/cache/stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    """
+    当前API进程内所有已命名缓存的观测数据：命中/未命中/写入（按被装饰函数）、淘汰、过期、存储字节数、查询延迟分位数
+    scope说明数据来自哪个进程，不包含Celery worker
+    """
+    if not is_admin(get_jwt_identity()):
+        return error_response("仅管理员可以查看缓存监控数据！", 403, {})
+    return success_response(
+        data={"scope": _process_scope(), "caches": _describe_caches()},
+        message="获取缓存统计成功！",
+        status_code=200
+    )
+
+
+@service_bp.route('/admin/cache/metrics', methods=['GET'])
+@jwt_required()
+def get_cache_metrics():
+    """
+    Prometheus文本格式的缓存指标，只覆盖当前API进程，每个样本带pid标签
+    """
+    if not is_admin(get_jwt_identity()):
+        return error_response("仅管理员可以查看缓存监控数据！", 403, {})
+    scope = _process_scope()
+    body = (f"# Cache metrics of API process {scope['pid']} on {scope['hostname']} only; "
+            f"Celery worker caches are not included.\n"
+            + to_prometheus(_describe_caches(), extra_labels={"pid": str(scope["pid"])}))
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+@service_bp.route('/admin/cache/invalidate', methods=['POST'])
+@jwt_required()
+def invalidate_cache_tags():
+    """
+    按标签批量失效缓存，请求体：{"cache": "llm_responses", "tags": ["model:QWEN3-32b-AWQ"]}
+    失效不删除条目，而是递增标签代数使旧的缓存键不再被访问，旧条目按TTL过期或被淘汰：
+    - 代数保存在缓存的共享层（磁盘/SQLite/Redis）时，所有进程（包括worker的内存L1）在refresh_interval秒内生效
+    - 纯内存缓存的代数只在当前API进程内，对worker无效，响应中的scope为process
+    """
+    if not is_admin(get_jwt_identity()):
+        return error_response("仅管理员可以失效缓存！", 403, {})
+    data = request.get_json() or {}
+    manager = get_cache_managers().get(data.get("cache"))
+    tags = data.get("tags") or []
+    if manager is None:
+        return error_response("缓存不存在！", 404, {})
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags) or not tags:
+        return error_response("tags必须是非空字符串列表！", 400, {})
+    manager.invalidate_tags(*tags)
+    shared = manager.backend.authoritative_tier().process_shared
+    return success_response(
+        data={
+            "cache": data.get("cache"),
+            "tags": tags,
+            "scope": "all_processes" if shared else "process",
+            "propagation_seconds": manager.tag_generations.refresh_interval if shared else 0,
+        },
+        message="缓存失效成功！",
+        status_code=200
+    )
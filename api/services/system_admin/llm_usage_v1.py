@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from flask import request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from api.common.llm_client.usage_ledger import llm_usage_ledger
+from api.common.utils.auth_helpers import is_admin
+from api.common.utils.http_response import success_response, error_response
+from api.models.model_llm_usage import LLMUsage, db
+from api.services import bp as service_bp
+
+# 未指定时间范围时默认统计最近的天数
+DEFAULT_USAGE_DAYS = 30
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+
+@service_bp.route('/admin/llm/usage', methods=['GET'])
+@jwt_required()
+def get_llm_usage():
+    """
+    LLM用量汇总，按模型、任务类型、日期分组：调用次数（其中失败、被限流拒绝的次数）、token用量、命中前缀缓存的token数、
+    命中响应缓存的次数、成功调用的延迟
+    查询参数：start/end（YYYY-MM-DD，包含end当天，默认最近30天）、model、task_type
+    任务类型来自调用方的llm_usage_context，未设置时为空；目前还没有按项目设置上下文的调用方，暂不按项目汇总
+    只统计已写入数据库的记录，各进程缓冲中的记录在flush_interval秒内写入
+    """
+    if not is_admin(get_jwt_identity()):
+        return error_response("仅管理员可以查看LLM用量！", 403, {})
+    try:
+        end = _parse_date(request.args.get('end')) or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = _parse_date(request.args.get('start')) or end - timedelta(days=DEFAULT_USAGE_DAYS - 1)
+    except ValueError:
+        return error_response("日期格式应为YYYY-MM-DD！", 400, {})
+    if start > end:
+        return error_response("开始日期不能晚于结束日期！", 400, {})
+    model = request.args.get('model')
+    task_type = request.args.get('task_type')
+
+    # 本进程缓冲中的记录先写入，刚发生的调用也能统计到
+    llm_usage_ledger.flush()
+
+    day = db.func.date(LLMUsage.created_at)
+    query = db.session.query(
+        LLMUsage.model,
+        LLMUsage.task_type,
+        day.label('day'),
+        db.func.count(LLMUsage.id).label('calls'),
+        db.func.sum(db.case((LLMUsage.cache_hit.is_(True), 1), else_=0)).label('cache_hits'),
+        db.func.sum(db.case((LLMUsage.status == 'error', 1), else_=0)).label('failed_calls'),
+        db.func.sum(db.case((LLMUsage.status == 'rejected', 1), else_=0)).label('rejected_calls'),
+        # 实际发送给LLM的token，命中响应缓存的调用不计入
+        db.func.sum(db.case((LLMUsage.cache_hit.is_(False), LLMUsage.prompt_tokens), else_=0)).label('prompt_tokens'),
+        db.func.sum(db.case((LLMUsage.cache_hit.is_(False), LLMUsage.completion_tokens), else_=0)).label('completion_tokens'),
+        db.func.sum(db.case((LLMUsage.cache_hit.is_(True), LLMUsage.prompt_tokens + LLMUsage.completion_tokens),
+                            else_=0)).label('saved_tokens'),
+        db.func.sum(LLMUsage.cached_tokens).label('prefix_cached_tokens'),
+        # 失败的调用多为超时或立即拒绝，不计入延迟
+        db.func.avg(db.case((LLMUsage.status == 'success', LLMUsage.latency_ms))).label('avg_latency_ms'),
+        db.func.max(db.case((LLMUsage.status == 'success', LLMUsage.latency_ms))).label('max_latency_ms'),
+    ).filter(
+        LLMUsage.created_at >= start,
+        LLMUsage.created_at < end + timedelta(days=1)
+    )
+    if model:
+        query = query.filter(LLMUsage.model == model)
+    if task_type:
+        query = query.filter(LLMUsage.task_type == task_type)
+    rows = query.group_by(LLMUsage.model, LLMUsage.task_type, day).order_by(day, LLMUsage.model).all()
+
+    items = [{
+        "model": row.model,
+        "task_type": row.task_type,
+        "day": str(row.day),
+        "calls": row.calls,
+        "cache_hits": int(row.cache_hits or 0),
+        "failed_calls": int(row.failed_calls or 0),
+        "rejected_calls": int(row.rejected_calls or 0),
+        "prompt_tokens": int(row.prompt_tokens or 0),
+        "completion_tokens": int(row.completion_tokens or 0),
+        "saved_tokens": int(row.saved_tokens or 0),
+        "prefix_cached_tokens": int(row.prefix_cached_tokens or 0),
+        "avg_latency_ms": round(float(row.avg_latency_ms or 0), 1),
+        "max_latency_ms": round(float(row.max_latency_ms or 0), 1),
+    } for row in rows]
+    totals = {key: sum(item[key] for item in items)
+              for key in ("calls", "cache_hits", "failed_calls", "rejected_calls", "prompt_tokens", "completion_tokens", "saved_tokens",
+                          "prefix_cached_tokens")}
+    return success_response(
+        data={
+            "start": start.strftime("%Y-%m-%d"),
+            "end": end.strftime("%Y-%m-%d"),
+            "items": items,
+            "totals": totals,
+            "ledger": llm_usage_ledger.stats(),
+        },
+        message="获取LLM用量成功！",
+        status_code=200
+    )
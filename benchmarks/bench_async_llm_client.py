@@ -0,0 +1,99 @@
+"""
+LLM客户端吞吐基准测试：QwenClient（线程池，模拟 --pool=threads 的Celery worker）vs AsyncQwenClient（单事件循环）
+请求发往本地vLLM替身服务，每个请求使用不同的消息，并绕过响应缓存，只比较客户端本身；先预热一轮建立连接，只统计稳定吞吐
+固定延迟下异步客户端的请求成批同时返回、成批处理，CPU在批次之间空闲，对比高并发吞吐时建议加上延迟抖动
+
+运行方式（项目根目录，未指定--tokenizer时使用离线生成的tokenizer，见bench_llm_load）：
+    python -m benchmarks.bench_async_llm_client --requests 1000 --latency 0.2 --latency-dist uniform --jitter 0.5 \
+        --threads 64 --max-concurrency 64
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+
+from api.common.llm_client.async_llm_client import AsyncQwenClient
+from api.common.llm_client.qwen_client import QwenClient
+from benchmarks.bench_llm_load import _offline_tokenizer
+from benchmarks.stub_vllm_server import add_stub_arguments, start_stub_server, stub_options
+
+
+def _write_model_config(root: Path, base_url: str, tokenizer: str, max_connections: int) -> str:
+    """连接数与在途请求数相同（未配置max_concurrency时并发上限等于连接数），其余http配置使用默认值"""
+    path = root / "model.yaml"
+    path.write_text(yaml.safe_dump({"model": {
+        "base_url": base_url,
+        "model_name": "QWEN3-32b-AWQ",
+        "max_tokens": 32768,
+        "temperature": 0.7,
+        "timeout": 120,
+        "tokenizer_path": tokenizer,
+        "http": {"max_connections": max_connections},
+    }}), encoding="utf-8")
+    return str(path)
+
+
+def _messages(n: int) -> list:
+    return [[{"role": "system", "content": "你是一个代码审查助手。"},
+             {"role": "user", "content": f"请审查第{i}个文件：def f{i}(x):\n    return x + {i}\n"}]
+            for i in range(n)]
+
+
+def _bench_sync(config_path: str, conversations: list, warmup: list, threads: int) -> float:
+    client = QwenClient(config_path=config_path)
+    call = QwenClient.chat_completion.__wrapped__       # 绕过缓存
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        # 预热一轮（建立连接），只统计之后的稳定吞吐
+        list(pool.map(lambda messages: call(client, messages), warmup))
+        start = time.perf_counter()
+        list(pool.map(lambda messages: call(client, messages), conversations))
+        return time.perf_counter() - start
+
+
+def _bench_async(config_path: str, conversations: list, warmup: list) -> float:
+    client = AsyncQwenClient(config_path=config_path)
+    call = AsyncQwenClient.chat_completion.__wrapped__
+
+    async def run():
+        await asyncio.gather(*(call(client, messages) for messages in warmup))
+        start = time.perf_counter()
+        await asyncio.gather(*(call(client, messages) for messages in conversations))
+        elapsed = time.perf_counter() - start
+        await client.aclose()
+        return elapsed
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QwenClient vs AsyncQwenClient throughput benchmark")
+    parser.add_argument("--tokenizer", default=None, help="tokenizer路径或HuggingFace模型名，默认离线生成")
+    parser.add_argument("--requests", type=int, default=200)
+    add_stub_arguments(parser)
+    parser.add_argument("--threads", type=int, default=4, help="同步客户端的线程数（Celery --concurrency）")
+    parser.add_argument("--max-concurrency", type=int, nargs="+", default=[4, 16, 64],
+                        help="异步客户端的在途请求数（写入http.max_connections）")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(**stub_options(args))
+    conversations = _messages(args.requests)
+    warmup = conversations[:max(args.threads, *args.max_concurrency)]
+    print(f"{'client':>24} {'elapsed s':>10} {'req/s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tokenizer = args.tokenizer or _offline_tokenizer(Path(tmp))
+        config_path = _write_model_config(Path(tmp), base_url, tokenizer, max(args.max_concurrency))
+        elapsed = _bench_sync(config_path, conversations, warmup, args.threads)
+        print(f"{f'sync x{args.threads} threads':>24} {elapsed:>10.2f} {args.requests / elapsed:>8.1f}")
+        for concurrency in args.max_concurrency:
+            config_path = _write_model_config(Path(tmp), base_url, tokenizer, concurrency)
+            elapsed = _bench_async(config_path, conversations, warmup)
+            print(f"{f'async concurrency={concurrency}':>24} {elapsed:>10.2f} {args.requests / elapsed:>8.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
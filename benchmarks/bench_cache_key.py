@@ -0,0 +1,72 @@
+"""
+缓存键生成基准测试：旧的 get_cache_key（JSON + md5）vs CacheKeyBuilder（blake2b + messages指纹）
+prompt规模按约3.5字符/token估算，覆盖1K/8K/32K token
+
+运行方式（项目根目录）：
+    python -m benchmarks.bench_cache_key --tokens 1000 8000 32000
+"""
+import argparse
+import random
+import string
+import time
+
+from api.common.cache.cache_key import CacheKeyBuilder, fingerprint_messages
+from api.common.cache.cache_manager import get_cache_key
+
+_CHARS_PER_TOKEN = 3.5
+_SYSTEM_PROMPT = "你是一名资深代码审查专家，请从功能、安全、性能、可维护性等方面审查以下代码，输出JSON格式的问题列表。" * 20
+
+
+class _FakeClient:
+    cache_namespace = "QWEN3-32b-AWQ@bench"
+
+    def chat_completion(self, messages, response_format="text", max_retries=3, retry_delay=2.0):
+        pass
+
+
+def _random_code(n_chars: int, rng: random.Random) -> str:
+    alphabet = string.ascii_letters + string.digits + " \n()[]{}:=._,"
+    return "".join(rng.choice(alphabet) for _ in range(n_chars))
+
+
+def _time_it(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache key derivation benchmark")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1_000, 8_000, 32_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    client = _FakeClient()
+    make_key = CacheKeyBuilder(
+        namespace="llm_responses:v1",
+        fingerprints={"messages": fingerprint_messages},
+        ignore=("max_retries", "retry_delay"),
+    ).bind(_FakeClient.chat_completion)
+
+    print(f"{'tokens':>8} {'legacy us':>12} {'blake2b cold us':>16} {'blake2b warm us':>16}")
+    for tokens in args.tokens:
+        code = _random_code(int(tokens * _CHARS_PER_TOKEN), rng)
+        messages = [{"role": "system", "content": _SYSTEM_PROMPT}, {"role": "user", "content": code}]
+
+        legacy = _time_it(lambda: get_cache_key(client, messages, response_format="json"), args.repeat)
+
+        # cold：每次都是内容相同的新字符串对象，需要重新计算摘要（模拟每个请求重新拼接prompt）
+        def cold():
+            fresh = [{"role": m["role"], "content": m["content"][:-1] + m["content"][-1]} for m in messages]
+            make_key(client, fresh, response_format="json")
+        cold_cost = _time_it(cold, args.repeat)
+
+        # warm：同一批messages对象被重复使用（如重试、同一请求先查缓存再写缓存）
+        warm_cost = _time_it(lambda: make_key(client, messages, response_format="json"), args.repeat)
+        print(f"{tokens:>8} {legacy:>12.1f} {cold_cost:>16.1f} {warm_cost:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
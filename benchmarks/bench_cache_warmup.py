@@ -0,0 +1,110 @@
+"""
+内存缓存预热基准测试：重启后L1（内存）命中率恢复到稳态所需的请求数
+请求按Zipf分布访问key，模拟“上一次运行”后分别以三种方式启动新进程：
+- cold：L1为空
+- snapshot：载入上一次运行退出时保存的最热条目快照
+- access-log：按上一次运行的访问日志从L2批量读出最热的key写入L1
+稳态命中率取冷启动运行后半段的L1命中率，达到其95%（按滑动窗口计算）即视为进入稳态
+
+运行方式（项目根目录）：
+    python -m benchmarks.bench_cache_warmup --keys 20000 --l1-size 1000 --requests 50000
+"""
+import argparse
+import bisect
+import itertools
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from api.common.cache.access_log import AccessLog
+from api.common.cache.cache_manager import CACHE_MISS, MemoryCacheBackend, ShardedMemoryCacheBackend
+from api.common.cache.tiered_backend import TieredCacheBackend
+from api.common.cache.warmup import restore_memory_cache, snapshot_memory_cache, warm_from_access_log
+
+_SAMPLE_VALUE = {
+    "content": "发现潜在的空指针问题，建议在调用前检查返回值。" * 20,
+    "usage": {"prompt_tokens": 1200, "completion_tokens": 300, "total_tokens": 1500},
+}
+
+
+def _zipf_stream(num_keys: int, s: float, seed: int):
+    weights = [1.0 / (rank ** s) for rank in range(1, num_keys + 1)]
+    cumulative = list(itertools.accumulate(weights))
+    rng = random.Random(seed)
+    while True:
+        yield f"key-{bisect.bisect_left(cumulative, rng.random() * cumulative[-1])}"
+
+
+def _run(cache: TieredCacheBackend, stream, requests: int, access_log: AccessLog = None) -> list:
+    """执行requests次“查缓存，未命中则计算并写入”，返回每次请求是否命中L1"""
+    hits = []
+    for _ in range(requests):
+        key = next(stream)
+        if access_log is not None:
+            access_log.record(key)
+        l1_hit = cache.l1.lookup(key) is not CACHE_MISS
+        # L1未命中时走完整的两级查询（L2命中会提升到L1），两级都未命中则“计算”后写入
+        if not l1_hit and cache.lookup(key) is CACHE_MISS:
+            cache.set(key, _SAMPLE_VALUE)
+        hits.append(l1_hit)
+    return hits
+
+
+def _requests_to_steady(hits: list, steady: float, window: int) -> int:
+    target = 0.95 * steady
+    in_window = sum(hits[:window])
+    for i in range(window, len(hits)):
+        if in_window / window >= target:
+            return i
+        in_window += hits[i] - hits[i - window]
+    return len(hits)
+
+
+def _new_cache(l1_size: int, l2: MemoryCacheBackend) -> TieredCacheBackend:
+    return TieredCacheBackend(l1=ShardedMemoryCacheBackend(max_size=l1_size, num_shards=16), l2=l2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory cache warm-up benchmark")
+    parser.add_argument("--keys", type=int, default=20_000)
+    parser.add_argument("--l1-size", type=int, default=1_000)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--window", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        # 上一次运行：L2（共享缓存）在重启后保留，L1快照和访问日志在退出时写出
+        l2 = MemoryCacheBackend(max_size=args.keys)
+        previous = _new_cache(args.l1_size, l2)
+        access_log = AccessLog(root / "access.log")
+        _run(previous, _zipf_stream(args.keys, args.zipf, seed=1), args.requests, access_log)
+        access_log.flush()
+        snapshot_path = root / "l1.snapshot"
+        snapshot_memory_cache(previous.l1, snapshot_path, top_n=args.l1_size)
+
+        print(f"{'start':>11} {'warm ms':>8} {'entries':>8} {'first-window hit':>17} {'requests to steady':>19}")
+        steady = None
+        for mode in ("cold", "snapshot", "access-log"):
+            cache = _new_cache(args.l1_size, l2)
+            start = time.perf_counter()
+            if mode == "snapshot":
+                loaded = restore_memory_cache(cache.l1, snapshot_path)
+            elif mode == "access-log":
+                loaded = warm_from_access_log(cache.l1, l2, access_log.path, top_n=args.l1_size)
+            else:
+                loaded = 0
+            warm_ms = (time.perf_counter() - start) * 1e3
+            hits = _run(cache, _zipf_stream(args.keys, args.zipf, seed=2), args.requests)
+            if steady is None:
+                steady = sum(hits[len(hits) // 2:]) / (len(hits) - len(hits) // 2)
+            first_window = sum(hits[:args.window]) / args.window
+            print(f"{mode:>11} {warm_ms:>8.1f} {loaded:>8} {first_window:>17.3f} "
+                  f"{_requests_to_steady(hits, steady, args.window):>19}")
+        print(f"steady-state L1 hit ratio: {steady:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+LLM负载测试：启动若干个vLLM替身服务（见stub_vllm_server），在不同并发度下驱动QwenClient与审查流程，
+输出吞吐、p50/p95/p99延迟与重试次数；不需要GPU和网络，未指定--tokenizer时使用离线生成的tokenizer
+- client：每个单元是一次chat_completion
+- stream：每个单元是一次chat_completion_stream，另外统计首token延迟
+- pipeline：每个单元是一个审查任务（打包审查一组文件，超出上下文窗口的文件分块审查，见prompt_packing），
+  并发度即 --pool=threads 的Celery worker的 --concurrency，与worker一样在线程中执行任务
+所有请求绕过响应缓存；重试次数 = 替身收到的请求数 - 逻辑调用数，包含客户端重试、OpenAI SDK内部重试与对冲请求
+
+运行方式（项目根目录）：
+    python -m benchmarks.bench_llm_load --mode client stream pipeline --concurrency 1 8 32 --requests 200 \
+        --replicas 2 --latency 0.2 --latency-dist lognormal --jitter 0.5 --tokens-per-second 60 \
+        --completion-tokens 128 --error-rate-429 0.02 --error-rate-5xx 0.01
+"""
+import argparse
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+from api.agents.prompt_layout import build_project_context
+from api.agents.prompt_packing import PackFile, review_packed_files
+from api.common.llm_client.qwen_client import DEFAULT_MODEL_CONFIG_PATH, QwenClient
+from api.common.llm_client.rate_limiter import LLMBackpressureError
+from api.common.llm_client.usage_ledger import llm_usage_ledger
+from benchmarks.stub_vllm_server import TOKEN_PATTERN, add_stub_arguments, start_stub_server, stub_options, stub_stats
+
+REVIEW_SYSTEM_PROMPT = "你是一个代码审查助手，请找出代码中的缺陷、性能问题与安全隐患，并给出修改建议。"
+
+# Qwen3聊天模板的简化版，只用于离线tokenizer的token计数
+_CHAT_TEMPLATE = (
+    "{% for message in messages %}<|im_start|>{{ message['role'] }}\n{{ message['content'] }}<|im_end|>\n"
+    "{% endfor %}{% if add_generation_prompt %}<|im_start|>assistant\n{% endif %}"
+)
+
+
+def _offline_tokenizer(root: Path) -> str:
+    """
+    生成一个不需要下载的fast tokenizer：按替身的分词规则切分，所有片段映射为<unk>
+    只用于计数和偏移，token数与替身报告的prompt_tokens一致
+    """
+    from tokenizers import Regex, Tokenizer, models, pre_tokenizers
+
+    special_tokens = ["<|im_start|>", "<|im_end|>"]
+    tokenizer = Tokenizer(models.WordLevel(vocab={"<unk>": 0}, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Split(Regex(TOKEN_PATTERN), behavior="isolated")
+    tokenizer.add_special_tokens(special_tokens)
+    path = root / "tokenizer"
+    path.mkdir()
+    tokenizer.save(str(path / "tokenizer.json"))
+    (path / "tokenizer_config.json").write_text(json.dumps({
+        "tokenizer_class": "PreTrainedTokenizerFast",
+        "unk_token": "<unk>",
+        "eos_token": "<|im_end|>",
+        "additional_special_tokens": special_tokens,
+        "chat_template": _CHAT_TEMPLATE,
+    }), encoding="utf-8")
+    return str(path)
+
+
+def _write_model_config(root: Path, base_urls: List[str], tokenizer: str, args: argparse.Namespace) -> str:
+    """以项目的model.yaml为基础（限流、熔断、对冲等保持线上配置），替换副本地址与tokenizer"""
+    with open(DEFAULT_MODEL_CONFIG_PATH, "r", encoding="utf-8") as f:
+        model_cfg = yaml.safe_load(f)["model"]
+    model_cfg.update({"base_url": base_urls[0], "base_urls": base_urls, "tokenizer_path": tokenizer})
+    model_cfg.setdefault("load_balancing", {})["probe_interval"] = 1
+    if args.rps is not None:
+        rate_cfg = model_cfg.setdefault("rate_limit", {})
+        rate_cfg["enabled"] = args.rps > 0
+        if args.rps > 0:
+            rate_cfg["rps"] = args.rps
+    path = root / "model.yaml"
+    path.write_text(yaml.safe_dump({"model": model_cfg}, allow_unicode=True), encoding="utf-8")
+    return str(path)
+
+
+class LoadTestClient(QwenClient):
+    """绕过响应缓存与用量台账的QwenClient，统计逻辑调用数，重试间隔使用命令行指定的值"""
+    retry_delay = 2.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._calls_lock = Lock()
+        self.calls = 0
+
+    def _count_call(self) -> None:
+        with self._calls_lock:
+            self.calls += 1
+
+    def chat_completion(self, messages, response_format="text", max_retries=3, retry_delay=None):
+        self._count_call()
+        return QwenClient.chat_completion.__wrapped__(self, messages, response_format, max_retries,
+                                                      self.retry_delay if retry_delay is None else retry_delay)
+
+    def chat_completion_stream(self, messages, response_format="text", max_retries=3, retry_delay=None):
+        self._count_call()
+        return super().chat_completion_stream(messages, response_format, max_retries,
+                                              self.retry_delay if retry_delay is None else retry_delay)
+
+
+def _function_source(seed: int, i: int) -> str:
+    return (f"def handle_{seed}_{i}(request, limit={i % 97}):\n"
+            f"    items = [item for item in request.items if item.size < limit]\n"
+            f"    total = sum(item.price * item.count for item in items)\n"
+            f"    return {{'count': len(items), 'total': total, 'seed': {seed}}}\n")
+
+
+def _review_files(seed: int, small_files: int, large_files: int, large_functions: int) -> List[PackFile]:
+    """一个审查任务的文件：small_files个5~40个函数的小文件，以及large_files个超出上下文窗口、需要分块的文件"""
+    files = []
+    for i in range(small_files):
+        functions = 5 + (seed * 7 + i * 13) % 36
+        content = "\n\n".join(_function_source(seed, j) for j in range(functions))
+        files.append(PackFile(path=f"service_{seed}/module_{i}.py", content=content))
+    for i in range(large_files):
+        content = "\n\n".join(_function_source(seed, j) for j in range(large_functions))
+        files.append(PackFile(path=f"service_{seed}/large_{i}.py", content=content))
+    return files
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _run(units: int, concurrency: int, unit: Callable[[int], Optional[float]]) -> Dict[str, Any]:
+    """并发执行units个单元，unit返回首token延迟（没有则为None）；返回延迟、失败数等"""
+    latencies, first_tokens, errors = [], [], {}
+    lock = Lock()
+
+    def run(i: int) -> None:
+        start = time.perf_counter()
+        try:
+            first_token = unit(i)
+        except Exception as e:
+            name = "backpressure" if isinstance(e, LLMBackpressureError) else type(e).__name__
+            with lock:
+                errors[name] = errors.get(name, 0) + 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            if first_token is not None:
+                first_tokens.append(first_token)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, range(units)))
+    return {"elapsed": time.perf_counter() - start, "latencies": sorted(latencies),
+            "first_tokens": sorted(first_tokens), "errors": errors}
+
+
+def _client_unit(client: LoadTestClient, run_id: str) -> Callable[[int], None]:
+    def unit(i: int) -> None:
+        client.chat_completion([{"role": "system", "content": REVIEW_SYSTEM_PROMPT},
+                                {"role": "user", "content": f"[{run_id}] 请审查：\n{_function_source(i, i)}"}])
+    return unit
+
+
+def _stream_unit(client: LoadTestClient, run_id: str) -> Callable[[int], float]:
+    def unit(i: int) -> float:
+        start = time.perf_counter()
+        first_token = None
+        stream = client.chat_completion_stream(
+            [{"role": "system", "content": REVIEW_SYSTEM_PROMPT},
+             {"role": "user", "content": f"[{run_id}] 请审查：\n{_function_source(i, i)}"}])
+        for _ in stream:
+            if first_token is None:
+                first_token = time.perf_counter() - start
+        return first_token if first_token is not None else time.perf_counter() - start
+    return unit
+
+
+def _pipeline_unit(client: LoadTestClient, args: argparse.Namespace, seed: int) -> Callable[[int], None]:
+    # 大文件的函数个数：token数约为上下文窗口的1.5倍，保证需要分块
+    large_functions = int(1.5 * client.max_tokens / client.count_tokens(_function_source(0, 0))) + 1
+    project = SimpleNamespace(name="load-test", programming_language="python", description="负载测试项目")
+    project_context = build_project_context(project)
+
+    def unit(i: int) -> None:
+        files = _review_files(seed + i, args.files, args.large_files, large_functions)
+        review_packed_files(client, REVIEW_SYSTEM_PROMPT, files, project_context=project_context,
+                            max_workers=args.review_workers)
+    return unit
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value * 1000:.0f}" if value is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline LLM load test against stub vLLM replicas")
+    parser.add_argument("--mode", choices=("client", "stream", "pipeline"), nargs="+", default=["client", "pipeline"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="client/stream模式每轮的请求数")
+    parser.add_argument("--reviews", type=int, default=20, help="pipeline模式每轮的审查任务数")
+    parser.add_argument("--files", type=int, default=12, help="每个审查任务的小文件数")
+    parser.add_argument("--large-files", type=int, default=1, help="每个审查任务中需要分块的大文件数")
+    parser.add_argument("--review-workers", type=int, default=4, help="单个审查任务内的并行请求数")
+    parser.add_argument("--replicas", type=int, default=1, help="替身副本数")
+    parser.add_argument("--tokenizer", default=None, help="tokenizer路径，默认离线生成")
+    parser.add_argument("--rps", type=float, default=None, help="覆盖model.yaml的限流rps，0表示关闭限流")
+    parser.add_argument("--retry-delay", type=float, default=0.5, help="客户端退避重试的基础间隔（秒）")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    # 离线运行，没有数据库可写
+    llm_usage_ledger.enabled = False
+    servers = [start_stub_server(**stub_options(args)) for _ in range(args.replicas)]
+    print(f"{'mode':>9} {'conc':>5} {'units':>6} {'failed':>7} {'elapsed s':>10} {'units/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'llm calls':>10} {'attempts':>9} {'retries':>8} "
+          f"{'429':>5} {'5xx':>5} {'ttft p50':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tokenizer = args.tokenizer or _offline_tokenizer(Path(tmp))
+        config_path = _write_model_config(Path(tmp), [base_url for _, base_url in servers], tokenizer, args)
+        LoadTestClient.retry_delay = args.retry_delay
+        for mode in args.mode:
+            for concurrency in args.concurrency:
+                # 每轮使用新的客户端，限流、熔断、负载均衡的状态不跨轮次
+                client = LoadTestClient(config_path=config_path)
+                before = [stub_stats(server) for server, _ in servers]
+                run_id = f"{mode}-{concurrency}-{time.time_ns()}"
+                if mode == "client":
+                    units, unit = args.requests, _client_unit(client, run_id)
+                elif mode == "stream":
+                    units, unit = args.requests, _stream_unit(client, run_id)
+                else:
+                    units, unit = args.reviews, _pipeline_unit(client, args, seed=time.time_ns() % 100000)
+                result = _run(units, concurrency, unit)
+                client.balancer.close()
+
+                statuses: Dict[int, int] = {}
+                for server_before, (server, _) in zip(before, servers):
+                    for status, count in stub_stats(server)["statuses"].items():
+                        statuses[status] = statuses.get(status, 0) + count - server_before["statuses"].get(status, 0)
+                attempts = sum(statuses.values())
+                latencies = result["latencies"]
+                failed = sum(result["errors"].values())
+                print(f"{mode:>9} {concurrency:>5} {units:>6} {failed:>7} {result['elapsed']:>10.2f} "
+                      f"{len(latencies) / result['elapsed']:>8.2f} {_ms(_percentile(latencies, 0.5)):>8} "
+                      f"{_ms(_percentile(latencies, 0.95)):>8} {_ms(_percentile(latencies, 0.99)):>8} "
+                      f"{client.calls:>10} {attempts:>9} {max(0, attempts - client.calls):>8} "
+                      f"{statuses.get(429, 0):>5} {sum(c for s, c in statuses.items() if s >= 500):>5} "
+                      f"{_ms(_percentile(result['first_tokens'], 0.5)):>9}")
+                if result["errors"]:
+                    print(f"{'':>15} errors: {result['errors']}")
+    for server, _ in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
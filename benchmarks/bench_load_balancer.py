@@ -0,0 +1,92 @@
+"""
+多副本负载均衡演示/基准：启动若干个延迟不同的vLLM替身服务，用LoadBalancer分发并发请求
+运行过程中停掉一个副本，观察它被摘除、其余副本接管流量，重新启动后被后台探测恢复；最后输出各副本的统计
+
+运行方式（项目根目录，不需要tokenizer与GPU）：
+    python -m benchmarks.bench_load_balancer --latencies 0.05 0.1 0.3 --requests 600 --threads 16
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+from api.common.llm_client.load_balancer import LoadBalancer
+from benchmarks.stub_vllm_server import start_stub_server
+
+
+def _is_failure(error: BaseException) -> bool:
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code >= 500
+    return isinstance(error, (urllib.error.URLError, ConnectionError, TimeoutError))
+
+
+def _post(base_url: str, i: int) -> None:
+    body = json.dumps({"model": "QWEN3-32b-AWQ",
+                       "messages": [{"role": "user", "content": f"请审查第{i}个文件"}]}).encode("utf-8")
+    request = urllib.request.Request(f"{base_url}/chat/completions", data=body,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        response.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LoadBalancer across several stub vLLM replicas")
+    parser.add_argument("--latencies", type=float, nargs="+", default=[0.05, 0.1, 0.3])
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--outage", type=float, nargs=2, default=[1.0, 3.0],
+                        help="第一个副本停机的开始与结束时间（秒，相对于开始发送请求）")
+    args = parser.parse_args()
+
+    servers = [start_stub_server(latency=latency) for latency in args.latencies]
+    balancer = LoadBalancer([base_url for _, base_url in servers], eject_after=3, probe_interval=0.5,
+                            is_failure=_is_failure)
+    failures = []
+
+    def call(i: int) -> None:
+        # 与QwenClient一致：失败后重试，重试时由均衡器选择其他副本
+        for _ in range(3):
+            try:
+                with balancer.route() as replica:
+                    _post(replica.base_url, i)
+                return
+            except Exception as e:
+                last_error = e
+        failures.append(last_error)
+
+    def outage() -> None:
+        server, base_url = servers[0]
+        time.sleep(args.outage[0])
+        port = server.server_address[1]
+        server.shutdown()
+        server.server_close()
+        print(f"[{time.perf_counter() - start:5.2f}s] stopped {base_url}")
+        time.sleep(args.outage[1] - args.outage[0])
+        servers[0] = start_stub_server(port=port, latency=args.latencies[0])
+        print(f"[{time.perf_counter() - start:5.2f}s] restarted {base_url}")
+
+    start = time.perf_counter()
+    Thread(target=outage, daemon=True).start()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(call, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    # 等待后台探测发现副本已恢复
+    time.sleep(max(0.0, args.outage[1] - elapsed) + 2 * balancer.probe_interval)
+
+    print(f"\n{args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s), "
+          f"{len(failures)} failed after retries")
+    print(f"{'replica':>28} {'healthy':>8} {'requests':>9} {'errors':>7} {'ejections':>10} {'avg ms':>8} {'max ms':>8}")
+    for stats in balancer.stats():
+        avg = f"{stats['latency_avg'] * 1000:.0f}" if stats["latency_avg"] is not None else "-"
+        print(f"{stats['base_url']:>28} {str(stats['healthy']):>8} {stats['requests']:>9} {stats['errors']:>7} "
+              f"{stats['ejections']:>10} {avg:>8} {stats['latency_max'] * 1000:>8.0f}")
+    balancer.close()
+    for server, _ in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+MemoryCacheBackend 微基准测试：新的 LRU + 过期堆实现 vs 旧的全量扫描实现
+
+运行方式（项目根目录）：
+    python -m benchmarks.bench_memory_cache --sizes 1000 100000 1000000
+"""
+import argparse
+import random
+import time
+from threading import Lock
+from typing import Any, Optional
+
+from api.common.cache.cache_manager import CacheBackend, CacheEntry, MemoryCacheBackend
+
+
+class LegacyMemoryCacheBackend(CacheBackend):
+    """旧版实现的副本：每次get/set/exists全量扫描过期条目，按created_at淘汰（实际是FIFO）"""
+
+    def __init__(self, max_size: int = 1000):
+        self._cache = {}
+        self.max_size = max_size
+        self._lock = Lock()
+
+    def _cleanup_expired_entries(self):
+        expired_keys = [key for key, entry in self._cache.items() if entry.is_expired()]
+        for key in expired_keys:
+            del self._cache[key]
+
+    def _evict_lru(self):
+        if len(self._cache) > self.max_size:
+            oldest_keys = min(self._cache.keys(), key=lambda k: self._cache[k].created_at)
+            del self._cache[oldest_keys]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            self._cleanup_expired_entries()
+            entry = self._cache.get(key)
+            return None if entry is None or entry.is_expired() else entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        with self._lock:
+            self._cleanup_expired_entries()
+            self._evict_lru()
+            self._cache[key] = CacheEntry(value=value, created_at=time.time(), ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            self._cleanup_expired_entries()
+            return key in self._cache and not self._cache[key].is_expired()
+
+
+def _prefill(backend: CacheBackend, size: int, ttl: int):
+    """直接预填充到满容量，避免旧实现O(n^2)的填充过程拖慢测试"""
+    if isinstance(backend, MemoryCacheBackend):
+        for i in range(size):
+            backend.set(f"key-{i}", i, ttl=ttl)
+        return
+    now = time.time()
+    for i in range(size):
+        backend._cache[f"key-{i}"] = CacheEntry(i, now, ttl)
+
+
+def _run_ops(backend: CacheBackend, size: int, ops: int, ttl: int) -> float:
+    """80% get + 20% set 的混合负载，返回每次操作平均耗时（微秒）"""
+    rng = random.Random(42)
+    keys = [f"key-{rng.randrange(size * 2)}" for _ in range(ops)]
+    start = time.perf_counter()
+    for i, key in enumerate(keys):
+        if i % 5 == 0:
+            backend.set(key, i, ttl=ttl)
+        else:
+            backend.get(key)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MemoryCacheBackend microbenchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--ops", type=int, default=200_000, help="新实现的操作次数")
+    parser.add_argument("--legacy-budget", type=int, default=2_000_000,
+                        help="旧实现 ops*size 的上限，超过则按比例减少操作次数")
+    parser.add_argument("--ttl", type=int, default=3600)
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'backend':>8} {'ops':>8} {'us/op':>12}")
+    for size in args.sizes:
+        new_backend = MemoryCacheBackend(max_size=size)
+        _prefill(new_backend, size, args.ttl)
+        new_cost = _run_ops(new_backend, size, args.ops, args.ttl)
+        print(f"{size:>10} {'new':>8} {args.ops:>8} {new_cost:>12.3f}")
+
+        legacy_ops = max(20, min(args.ops, args.legacy_budget // size))
+        legacy_backend = LegacyMemoryCacheBackend(max_size=size)
+        _prefill(legacy_backend, size, args.ttl)
+        legacy_cost = _run_ops(legacy_backend, size, legacy_ops, args.ttl)
+        print(f"{size:>10} {'legacy':>8} {legacy_ops:>8} {legacy_cost:>12.3f}"
+              f"   (x{legacy_cost / new_cost:.1f})")
+
+
+if __name__ == "__main__":
+    main()
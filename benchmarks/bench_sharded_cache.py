@@ -0,0 +1,60 @@
+"""
+内存缓存锁竞争基准测试：单锁 MemoryCacheBackend vs 分段锁 ShardedMemoryCacheBackend
+
+运行方式（项目根目录）：
+    python -m benchmarks.bench_sharded_cache --threads 4 16 64
+"""
+import argparse
+import random
+import threading
+import time
+
+from api.common.cache.cache_manager import CacheBackend, MemoryCacheBackend, ShardedMemoryCacheBackend
+
+
+def _worker(backend: CacheBackend, keys: list, barrier: threading.Barrier):
+    barrier.wait()
+    for i, key in enumerate(keys):
+        if i % 5 == 0:
+            backend.set(key, i, ttl=3600)
+        else:
+            backend.get(key)
+
+
+def _run(backend: CacheBackend, num_threads: int, ops_per_thread: int, key_space: int) -> float:
+    """所有线程同时开始执行混合读写，返回总吞吐（ops/s）"""
+    barrier = threading.Barrier(num_threads + 1)
+    threads = []
+    for t in range(num_threads):
+        rng = random.Random(t)
+        keys = [f"key-{rng.randrange(key_space)}" for _ in range(ops_per_thread)]
+        thread = threading.Thread(target=_worker, args=(backend, keys, barrier))
+        thread.start()
+        threads.append(thread)
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return num_threads * ops_per_thread / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory cache lock contention benchmark")
+    parser.add_argument("--threads", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ops", type=int, default=50_000, help="每个线程的操作次数")
+    parser.add_argument("--max-size", type=int, default=10_000)
+    parser.add_argument("--shards", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{'threads':>8} {'backend':>10} {'ops/s':>14}")
+    for num_threads in args.threads:
+        single = MemoryCacheBackend(max_size=args.max_size)
+        sharded = ShardedMemoryCacheBackend(max_size=args.max_size, num_shards=args.shards)
+        single_ops = _run(single, num_threads, args.ops, args.max_size * 2)
+        sharded_ops = _run(sharded, num_threads, args.ops, args.max_size * 2)
+        print(f"{num_threads:>8} {'single':>10} {single_ops:>14,.0f}")
+        print(f"{num_threads:>8} {'sharded':>10} {sharded_ops:>14,.0f}   (x{sharded_ops / single_ops:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+持久化缓存基准测试：SqliteCacheBackend vs FileCacheBackend
+- 命中延迟：随机读取已存在的key
+- 冷启动：在已有N个条目的目录/数据库上新建后端实例，完成第一次读和第一次写（文件后端开启max_bytes时需要扫描目录）
+
+运行方式（项目根目录）：
+    python -m benchmarks.bench_sqlite_cache --entries 1000 10000 50000
+"""
+import argparse
+import hashlib
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from api.common.cache.cache_manager import CacheBackend, FileCacheBackend
+from api.common.cache.sqlite_backend import SqliteCacheBackend
+
+# 模拟一次chat_completion的返回值
+_SAMPLE_VALUE = {
+    "content": "发现潜在的空指针问题，建议在调用前检查返回值。" * 20,
+    "usage": {"prompt_tokens": 1200, "completion_tokens": 300, "total_tokens": 1500},
+    "model": "QWEN3-32b-AWQ",
+}
+
+
+def _keys(n: int) -> list:
+    return [hashlib.md5(str(i).encode()).hexdigest() for i in range(n)]
+
+
+def _make_file_backend(root: Path) -> CacheBackend:
+    return FileCacheBackend(root / "files", max_bytes=1 << 40)
+
+
+def _make_sqlite_backend(root: Path) -> CacheBackend:
+    return SqliteCacheBackend(root / "cache.db", max_entries=10_000_000)
+
+
+def _hit_latency(backend: CacheBackend, keys: list, lookups: int) -> tuple:
+    rng = random.Random(0)
+    samples = []
+    for _ in range(lookups):
+        key = rng.choice(keys)
+        start = time.perf_counter()
+        backend.lookup(key)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def _cold_start(factory, root: Path, key: str) -> float:
+    start = time.perf_counter()
+    backend = factory(root)
+    backend.lookup(key)
+    backend.set("cold-start-probe", _SAMPLE_VALUE, ttl=3600)
+    return (time.perf_counter() - start) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SqliteCacheBackend vs FileCacheBackend benchmark")
+    parser.add_argument("--entries", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--lookups", type=int, default=5_000)
+    args = parser.parse_args()
+
+    print(f"{'entries':>8} {'backend':>8} {'fill s':>8} {'hit mean us':>12} {'hit p99 us':>11} {'cold start ms':>14}")
+    for n in args.entries:
+        keys = _keys(n)
+        for name, factory in (("file", _make_file_backend), ("sqlite", _make_sqlite_backend)):
+            with tempfile.TemporaryDirectory() as tmp:
+                root = Path(tmp)
+                backend = factory(root)
+                start = time.perf_counter()
+                if isinstance(backend, SqliteCacheBackend):
+                    for i in range(0, n, 1000):
+                        backend.set_many({key: _SAMPLE_VALUE for key in keys[i:i + 1000]}, ttl=86400)
+                else:
+                    for key in keys:
+                        backend.set(key, _SAMPLE_VALUE, ttl=86400)
+                fill = time.perf_counter() - start
+                mean, p99 = _hit_latency(backend, keys, args.lookups)
+                cold = _cold_start(factory, root, keys[0])
+                print(f"{n:>8} {name:>8} {fill:>8.2f} {mean:>12.1f} {p99:>11.1f} {cold:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
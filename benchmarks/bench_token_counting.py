@@ -0,0 +1,104 @@
+"""
+token计数基准测试：模拟一次1000个文件的代码审查，每个文件的对话 = 相同的大系统提示词 + 各自的文件内容
+- full：每次apply_chat_template + encode整个对话（改造前的count_tokens）
+- memoized：TokenCounter逐条计数，content按摘要缓存，模板开销按角色布局只算一次
+- batch：count_messages_many一次批量编码所有未缓存的content
+每种方式各执行两轮（第二轮模拟重试/重复审查），统计进程CPU时间
+
+运行方式（项目根目录）：
+    python -m benchmarks.bench_token_counting --tokenizer /path/to/Qwen3 --files 1000
+未指定--tokenizer时，在本次生成的文件上训练一个字节级BPE tokenizer（与Qwen3同类，词表更小），不需要下载
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from transformers import AutoTokenizer
+
+from api.common.cache.cache_manager import CacheManager, ShardedMemoryCacheBackend
+from api.common.llm_client.token_counter import TokenCounter
+from benchmarks.bench_llm_load import _CHAT_TEMPLATE
+
+_SYSTEM_PROMPT = (
+    "你是一名资深的代码审查专家。请从正确性、安全性、性能、可维护性四个方面审查下面的代码，"
+    "对每个问题给出行号、严重程度、问题描述和修改建议，并以JSON格式输出。\n"
+) * 60
+
+
+def _file_content(i: int, rng: random.Random) -> str:
+    lines = [f"def handler_{i}_{j}(request):\n    value = request.get('field_{rng.randint(0, 999)}')\n"
+             f"    return value * {rng.randint(1, 100)}\n" for j in range(rng.randint(20, 60))]
+    return f"# file_{i}.py\n" + "\n".join(lines)
+
+
+def _offline_bpe_tokenizer(root: Path, corpus: list) -> str:
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+
+    special_tokens = ["<|endoftext|>", "<|im_start|>", "<|im_end|>"]
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    tokenizer.train_from_iterator(corpus, trainers.BpeTrainer(
+        vocab_size=32000, special_tokens=special_tokens, initial_alphabet=pre_tokenizers.ByteLevel.alphabet()))
+    path = root / "tokenizer"
+    path.mkdir()
+    tokenizer.save(str(path / "tokenizer.json"))
+    (path / "tokenizer_config.json").write_text(json.dumps({
+        "tokenizer_class": "PreTrainedTokenizerFast",
+        "eos_token": "<|im_end|>",
+        "additional_special_tokens": special_tokens,
+        "chat_template": _CHAT_TEMPLATE,
+    }), encoding="utf-8")
+    return str(path)
+
+
+def _full_count(tokenizer, messages) -> int:
+    prompt = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+    return len(tokenizer.encode(prompt, add_special_tokens=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token counting benchmark")
+    parser.add_argument("--tokenizer", default=None, help="tokenizer路径或HuggingFace模型名，默认离线训练")
+    parser.add_argument("--files", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    conversations = [[{"role": "system", "content": _SYSTEM_PROMPT},
+                      {"role": "user", "content": _file_content(i, rng)}] for i in range(args.files)]
+    with tempfile.TemporaryDirectory() as tmp:
+        tokenizer_path = args.tokenizer or _offline_bpe_tokenizer(
+            Path(tmp), [_SYSTEM_PROMPT] + [messages[1]["content"] for messages in conversations])
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+
+    def fresh_counter() -> TokenCounter:
+        return TokenCounter(tokenizer, namespace=tokenizer_path,
+                            cache_manager=CacheManager(ShardedMemoryCacheBackend(max_size=100000)))
+
+    expected = [_full_count(tokenizer, messages) for messages in conversations]
+    counter = fresh_counter()
+    assert counter.count_messages_many(conversations) == expected, "memoized counts differ from full counts"
+
+    print(f"{'method':>10} {'pass 1 cpu s':>13} {'pass 2 cpu s':>13}")
+    for name in ("full", "memoized", "batch"):
+        counter = fresh_counter()
+        timings = []
+        for _ in range(2):
+            start = time.process_time()
+            if name == "full":
+                for messages in conversations:
+                    _full_count(tokenizer, messages)
+            elif name == "memoized":
+                for messages in conversations:
+                    counter.count_messages(messages)
+            else:
+                counter.count_messages_many(conversations)
+            timings.append(time.process_time() - start)
+        print(f"{name:>10} {timings[0]:>13.3f} {timings[1]:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+本地vLLM替身：OpenAI兼容的 /v1/chat/completions 与 /v1/models 接口，用于在没有GPU的环境下对LLM客户端和审查流程做基准测试
+- 延迟：首token延迟按分布采样（fixed/uniform/lognormal/exponential），之后按tokens_per_second逐个输出completion_tokens个token
+- 流式：stream=true时以SSE返回，stream_options.include_usage时最后一个chunk携带usage
+- 错误注入：按比例返回429（带Retry-After）或5xx
+- 前缀缓存：开启时相同系统提示词的后续请求在usage.prompt_tokens_details.cached_tokens中报告命中的token数
+- response_format为json_object时返回审查结果格式的JSON：打包请求按<file path="...">返回每个文件的空问题列表
+
+运行方式（项目根目录）：
+    python -m benchmarks.stub_vllm_server --port 8099 --latency 0.2 --latency-dist lognormal --jitter 0.5 \
+        --tokens-per-second 50 --completion-tokens 64 --error-rate-429 0.02 --error-rate-5xx 0.01
+"""
+import argparse
+import hashlib
+import html
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any, Dict, List, Optional, Tuple
+
+# 替身与离线tokenizer（见bench_llm_load）共用的分词规则：最多4个字符的单词片段、单个标点、连续空白各算一个token，
+# 与BPE对代码的切分粒度大致相当
+TOKEN_PATTERN = r"\w{1,4}|[^\w\s]|\s+"
+_TOKEN_RE = re.compile(TOKEN_PATTERN)
+_FILE_PATH_RE = re.compile(r'<file path="([^"]*)"')
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal", "exponential")
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+def sample_latency(distribution: str, latency: float, jitter: float) -> float:
+    """
+    首token延迟（秒）：
+    - fixed：固定为latency
+    - uniform：在latency * (1 ± jitter)内均匀分布
+    - lognormal：中位数为latency、对数标准差为jitter，长尾
+    - exponential：均值为latency
+    """
+    if latency <= 0:
+        return 0.0
+    if distribution == "uniform":
+        return max(0.0, random.uniform(latency * (1 - jitter), latency * (1 + jitter)))
+    if distribution == "lognormal":
+        return random.lognormvariate(math.log(latency), jitter)
+    if distribution == "exponential":
+        return random.expovariate(1 / latency)
+    return latency
+
+
+class StubStats:
+    """替身收到的请求数，按响应状态码统计"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.statuses: Counter = Counter()
+        self.streams = 0
+
+    def record(self, status: int, stream: bool = False) -> None:
+        with self._lock:
+            self.statuses[status] += 1
+            self.streams += stream
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": sum(self.statuses.values()), "statuses": dict(self.statuses), "streams": self.streams}
+
+
+class StubVLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # 支持keep-alive
+    latency = 0.2
+    latency_dist = "fixed"
+    jitter = 0.0
+    tokens_per_second = 0.0             # 0表示生成不耗时，只有首token延迟
+    completion_tokens = 0               # 0表示按completion_text的实际长度
+    error_rate_429 = 0.0
+    error_rate_5xx = 0.0
+    retry_after: Optional[float] = 1.0  # 429响应的Retry-After秒数，None表示不返回该头
+    prefix_caching = False
+    model_name = "QWEN3-32b-AWQ"
+    completion_text = "未发现明显问题。"
+    stats: StubStats = StubStats()
+    prefix_cache: set = set()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": self.model_name, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def _inject_error(self) -> bool:
+        """按配置的比例返回429/5xx，返回是否已经发送了错误响应"""
+        roll = random.random()
+        if roll < self.error_rate_429:
+            self.stats.record(429)
+            headers = {"Retry-After": f"{self.retry_after:g}"} if self.retry_after is not None else None
+            self._send_json(429, {"error": {"message": "Too many requests", "type": "rate_limit_exceeded",
+                                            "code": 429}}, headers)
+            return True
+        if roll < self.error_rate_429 + self.error_rate_5xx:
+            status = random.choice((500, 502, 503))
+            self.stats.record(status)
+            self._send_json(status, {"error": {"message": "Injected server error", "type": "server_error",
+                                               "code": status}})
+            return True
+        return False
+
+    def _completion_content(self, request: Dict[str, Any]) -> str:
+        if (request.get("response_format") or {}).get("type") != "json_object":
+            return self.completion_text
+        messages = request.get("messages") or [{}]
+        paths = [html.unescape(path) for path in _FILE_PATH_RE.findall(messages[-1].get("content", ""))]
+        if paths:
+            return json.dumps({"files": [{"path": path, "issues": []} for path in paths]}, ensure_ascii=False)
+        return json.dumps({"issues": []})
+
+    def _usage(self, messages: List[Dict[str, Any]], completion_tokens: int) -> Dict[str, Any]:
+        prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if self.prefix_caching:
+            # 只模拟系统提示词的复用：同一系统提示词第二次出现起计为命中
+            system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+            key = hashlib.blake2b(system.encode("utf-8"), digest_size=12).digest()
+            cached = count_tokens(system) if key in self.prefix_cache else 0
+            self.prefix_cache.add(key)
+            usage["prompt_tokens_details"] = {"cached_tokens": cached}
+        return usage
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        if self._inject_error():
+            return
+        content = self._completion_content(request)
+        completion_tokens = self.completion_tokens or count_tokens(content)
+        usage = self._usage(request.get("messages", []), completion_tokens)
+        decode_time = completion_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        time.sleep(sample_latency(self.latency_dist, self.latency, self.jitter))
+        model = request.get("model", self.model_name)
+        if request.get("stream"):
+            include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+            self._stream(model, content, usage if include_usage else None, decode_time)
+            return
+        time.sleep(decode_time)
+        self.stats.record(200)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, model: str, content: str, usage: Optional[Dict[str, Any]], decode_time: float) -> None:
+        """SSE响应（chunked编码，保持keep-alive）：按token切分内容，生成时间均摊到各个chunk"""
+        self.stats.record(200, stream=True)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        def event(choices: List[Dict[str, Any]], chunk_usage: Optional[Dict[str, Any]] = None) -> bytes:
+            body = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": choices, "usage": chunk_usage}
+            return f"data: {json.dumps(body, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        pieces = _TOKEN_RE.findall(content) or [content]
+        interval = decode_time / len(pieces)
+        try:
+            self._write_chunk(event([{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                      "finish_reason": None}]))
+            for piece in pieces:
+                time.sleep(interval)
+                self._write_chunk(event([{"index": 0, "delta": {"content": piece}, "finish_reason": None}]))
+            self._write_chunk(event([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+            if usage is not None:
+                self._write_chunk(event([], usage))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前停止读取
+            self.close_connection = True
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    # 默认的listen backlog只有5，并发建连的异步客户端会被丢弃SYN、等待1秒重传，测出的延迟是替身造成的
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def start_stub_server(
+        port: int = 0,
+        latency: float = 0.2,
+        latency_dist: str = "fixed",
+        jitter: float = 0.0,
+        tokens_per_second: float = 0.0,
+        completion_tokens: int = 0,
+        error_rate_429: float = 0.0,
+        error_rate_5xx: float = 0.0,
+        retry_after: Optional[float] = 1.0,
+        prefix_caching: bool = False
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    在后台线程启动替身服务，返回(server, base_url)；port=0时由系统分配端口
+    收到的请求数见stub_stats(server)
+    """
+    if latency_dist not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution: {latency_dist}")
+    handler = type("ConfiguredStubVLLMHandler", (StubVLLMHandler,), {
+        "latency": latency,
+        "latency_dist": latency_dist,
+        "jitter": jitter,
+        "tokens_per_second": tokens_per_second,
+        "completion_tokens": completion_tokens,
+        "error_rate_429": error_rate_429,
+        "error_rate_5xx": error_rate_5xx,
+        "retry_after": retry_after,
+        "prefix_caching": prefix_caching,
+        "stats": StubStats(),
+        "prefix_cache": set(),
+    })
+    server = StubHTTPServer(("127.0.0.1", port), handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def stub_stats(server: ThreadingHTTPServer) -> Dict[str, Any]:
+    return server.RequestHandlerClass.stats.snapshot()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """替身服务的命令行参数，bench_llm_load复用"""
+    parser.add_argument("--latency", type=float, default=0.2, help="首token延迟（秒），按--latency-dist采样")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="uniform为相对抖动幅度，lognormal为对数标准差")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="生成速度，0表示不模拟生成耗时")
+    parser.add_argument("--completion-tokens", type=int, default=0, help="每个响应报告的输出token数，0表示按内容计算")
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429响应的Retry-After秒数，负数表示不返回")
+    parser.add_argument("--prefix-caching", action="store_true", help="在usage中报告系统提示词的前缀缓存命中")
+
+
+def stub_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "latency": args.latency,
+        "latency_dist": args.latency_dist,
+        "jitter": args.jitter,
+        "tokens_per_second": args.tokens_per_second,
+        "completion_tokens": args.completion_tokens,
+        "error_rate_429": args.error_rate_429,
+        "error_rate_5xx": args.error_rate_5xx,
+        "retry_after": args.retry_after if args.retry_after >= 0 else None,
+        "prefix_caching": args.prefix_caching,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible vLLM server")
+    parser.add_argument("--port", type=int, default=8099)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    server, base_url = start_stub_server(args.port, **stub_options(args))
+    print(f"Stub vLLM server listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(stub_stats(server))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
+from typing import Dict
+
 from flask import Flask
 
 
 class CodeReviewApp(Flask):
-    pass
+    startup_timings: Dict[str, float]     # create_flask_app各阶段的启动耗时（秒）
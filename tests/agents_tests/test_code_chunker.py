@@ -0,0 +1,41 @@
+from api.agents.code_chunker import split_boundaries, split_into_chunks
+
+# 319行、每行8个token：预算400时每个窗口最多50行
+FLAT_FILE = "".join(f"value_{i} = {i}\n" for i in range(319))
+# 29个11行的函数（函数之间空一行），共347行
+FUNCTIONS_FILE = "\n\n".join(
+    f"def handler_{j}(x):\n" + "".join(f"    x = x + {k}\n" for k in range(9)) + "    return x" for j in range(29)
+)
+
+
+def _chunks(content, budget, path=None):
+    boundaries = split_boundaries(content, path) if path else ()
+    return split_into_chunks(content, [8] * len(content.splitlines()), budget, boundaries)
+
+
+def _assert_covers(chunks, total_lines):
+    assert chunks[0].start_line == 1 and chunks[-1].end_line == total_lines
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start_line <= previous.end_line + 1
+        # 重叠不超过上一个窗口的1/4
+        assert previous.end_line - chunk.start_line + 1 <= (previous.end_line - previous.start_line + 1) // 4
+
+
+def test_chunk_count_for_small_budget():
+    chunks = _chunks(FLAT_FILE, 400)
+    assert len(chunks) == 9
+    assert all(chunk.tokens <= 400 for chunk in chunks)
+    _assert_covers(chunks, 319)
+
+
+def test_chunk_count_with_function_boundaries():
+    chunks = _chunks(FUNCTIONS_FILE, 400, "service.py")
+    assert len(chunks) == 10
+    _assert_covers(chunks, 347)
+    # 除最后一个窗口外都在函数定义处结束
+    assert all(FUNCTIONS_FILE.splitlines()[chunk.end_line].startswith("def ") for chunk in chunks[:-1])
+
+
+def test_large_budget_keeps_full_overlap():
+    chunks = split_into_chunks(FLAT_FILE, [1] * 319, 200, overlap_lines=20)
+    assert [(chunk.start_line, chunk.end_line) for chunk in chunks] == [(1, 200), (181, 319)]
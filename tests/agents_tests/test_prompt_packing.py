@@ -0,0 +1,33 @@
+import json
+
+from api.agents.prompt_packing import split_findings_by_file
+
+ISSUE = {"line": 3, "severity": "high", "description": "未校验输入"}
+
+
+def test_single_file_empty_issues_maps_to_the_file():
+    assert split_findings_by_file('{"issues": []}', ["a.py"]) == {"a.py": []}
+    assert split_findings_by_file("[]", ["a.py"]) == {"a.py": []}
+
+
+def test_single_file_issues_without_path_map_to_the_file():
+    content = json.dumps({"issues": [ISSUE]})
+    assert split_findings_by_file(content, ["src/a.py"]) == {"src/a.py": [ISSUE]}
+
+
+def test_packed_files_format():
+    content = json.dumps({"files": [{"path": "a.py", "issues": [ISSUE]}, {"path": "b.py", "issues": []}]})
+    assert split_findings_by_file(content, ["a.py", "b.py"]) == {"a.py": [ISSUE], "b.py": []}
+
+
+def test_issue_list_with_paths_for_several_files():
+    content = json.dumps([dict(ISSUE, file="a.py"), dict(ISSUE, path="b.py"), dict(ISSUE, file="unknown.py")])
+    assert split_findings_by_file(content, ["a.py", "b.py"]) == {
+        "a.py": [dict(ISSUE, file="a.py")],
+        "b.py": [dict(ISSUE, path="b.py")],
+    }
+
+
+def test_top_level_issues_for_several_files_are_not_guessed():
+    # 多个文件时没有路径的问题无法归属，对应文件视为缺失，由review_packed_files单独重试
+    assert split_findings_by_file('{"issues": []}', ["a.py", "b.py"]) == {}
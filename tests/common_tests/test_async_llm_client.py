@@ -0,0 +1,110 @@
+import asyncio
+import json
+from contextlib import contextmanager
+
+import pytest
+import yaml
+
+pytest.importorskip("openai")
+pytest.importorskip("transformers")
+
+from api.common.llm_client import usage_ledger
+from api.common.llm_client.async_llm_client import AsyncQwenClient, _ReplicaClients
+from benchmarks.bench_llm_load import _offline_tokenizer
+from benchmarks.stub_vllm_server import start_stub_server, stub_stats
+
+
+@pytest.fixture(scope="module")
+def tokenizer(tmp_path_factory):
+    return _offline_tokenizer(tmp_path_factory.mktemp("tokenizer"))
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server(latency=0.05)
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def _client(tmp_path, tokenizer, base_urls, **model_cfg) -> AsyncQwenClient:
+    path = tmp_path / "model.yaml"
+    path.write_text(yaml.safe_dump({"model": dict({
+        "base_url": base_urls[0],
+        "base_urls": base_urls,
+        "model_name": "QWEN3-32b-AWQ",
+        "max_tokens": 32768,
+        "temperature": 0.7,
+        "timeout": 30,
+        "tokenizer_path": tokenizer,
+    }, **model_cfg)}), encoding="utf-8")
+    return AsyncQwenClient(config_path=str(path))
+
+
+def test_concurrency_defaults_to_connection_count(tmp_path, tokenizer):
+    urls = ["http://a:8099/v1", "http://b:8099/v1"]
+    client = _client(tmp_path, tokenizer, urls, http={"max_connections": 32})
+    # 未配置max_concurrency：并发上限等于各副本连接数之和，连接按每池8个拆分
+    assert client.max_concurrency == 64
+    assert client.pools_per_replica == 4
+    assert client.limits.max_connections == 8 and client.limits.max_keepalive_connections == 8
+
+    client = _client(tmp_path, tokenizer, urls, max_concurrency=10, http={"max_connections": 6})
+    assert client.max_concurrency == 10
+    assert client.pools_per_replica == 1 and client.limits.max_connections == 6
+
+
+def test_requests_are_spread_over_pools(tmp_path, tokenizer, stub, monkeypatch):
+    server, base_url = stub
+    client = _client(tmp_path, tokenizer, [base_url], http={"max_connections": 16, "connections_per_pool": 4})
+    call = AsyncQwenClient.chat_completion.__wrapped__      # 绕过缓存与用量台账
+    peaks = {}
+    lease = _ReplicaClients.lease
+
+    @contextmanager
+    def tracking_lease(self):
+        with lease(self) as openai_client:
+            index = self.clients.index(openai_client)
+            peaks[index] = max(peaks.get(index, 0), self.in_flight[index])
+            yield openai_client
+
+    monkeypatch.setattr(_ReplicaClients, "lease", tracking_lease)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(
+                call(client, [{"role": "user", "content": f'<file path="src/f{i}.py">x = {i}</file>'}],
+                     response_format="json")
+                for i in range(48)
+            ))
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+    # 替身按收到的最后一条消息回显文件路径：消息经由extra_body完整发出
+    assert [json.loads(result["content"])["files"][0]["path"] for result in results] == \
+        [f"src/f{i}.py" for i in range(48)]
+    assert stub_stats(server)["requests"] == 48
+    # 16个并发请求分布到4个连接池，每个池同时最多4个
+    assert sorted(peaks) == [0, 1, 2, 3]
+    assert max(peaks.values()) <= 4
+
+
+def test_stream_sends_messages(tmp_path, tokenizer, stub, monkeypatch):
+    server, base_url = stub
+    monkeypatch.setattr(usage_ledger.llm_usage_ledger, "record", lambda **row: None)
+    client = _client(tmp_path, tokenizer, [base_url])
+    monkeypatch.setattr(client, "_stream_cache_key", lambda *args: None)      # 绕过缓存
+
+    async def run():
+        stream = client.chat_completion_stream([{"role": "user", "content": "请审查这段代码"}])
+        try:
+            return stream, [chunk async for chunk in stream]
+        finally:
+            await client.aclose()
+
+    stream, chunks = asyncio.run(run())
+    assert "".join(chunks) == stream.result["content"] and chunks
+    # 替身按收到的消息统计prompt_tokens，messages为空时为0
+    assert stream.result["usage"]["prompt_tokens"] > 0
+    assert stub_stats(server)["streams"] == 1
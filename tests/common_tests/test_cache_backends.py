@@ -0,0 +1,168 @@
+import os
+import pickle
+import time
+
+import pytest
+
+from api.common.cache.cache_manager import (
+    CACHE_MISS, CacheEntry, CacheManager, FileCacheBackend, MemoryCacheBackend, ShardedMemoryCacheBackend,
+)
+from api.common.cache.codec import ValueCodec
+
+
+class _Clock:
+    """替换time.time的可调时钟"""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+def test_memory_lru_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_size=3)
+    for key in "abc":
+        backend.set(key, key)
+    assert backend.get("a") == "a"      # a变为最近使用
+    backend.set("d", "d")
+    assert backend.lookup("b") is CACHE_MISS
+    assert [backend.get(key) for key in "acd"] == ["a", "c", "d"]
+    assert backend.metrics.snapshot()["evictions"] == 1
+
+
+def test_memory_ttl_expires_lazily_and_from_heap(clock):
+    backend = MemoryCacheBackend(max_size=100, reap_batch_size=2)
+    for i in range(5):
+        backend.set(f"short{i}", i, ttl=10)
+    backend.set("long", "long", ttl=100)
+    backend.set("forever", "forever")
+    clock.now += 11
+    # 读取时惰性删除
+    assert backend.lookup("short0") is CACHE_MISS
+    # 写入时从堆顶回收，每次最多reap_batch_size个
+    backend.set("new", "new")
+    assert len(backend._cache) == 5
+    backend.cleanup_expired()
+    assert sorted(backend._cache) == ["forever", "long", "new"]
+    assert backend.metrics.snapshot()["expirations"] == 5
+
+
+def test_memory_overwrite_keeps_new_ttl(clock):
+    backend = MemoryCacheBackend(max_size=100, reap_batch_size=1)
+    backend.set("key", "old", ttl=10)
+    backend.set("key", "new", ttl=100)
+    clock.now += 11
+    # 堆中旧的过期记录不会删除覆盖写入的新条目
+    backend.cleanup_expired()
+    assert backend.get("key") == "new"
+    # 反复覆盖写入时堆被压缩，不会无限增长
+    for _ in range(100):
+        backend.set("key", "new", ttl=100)
+    assert len(backend._expiry_heap) <= 2 * len(backend._cache) + backend.reap_batch_size
+
+
+def test_restore_entries_keeps_remaining_lifetime(clock):
+    backend = MemoryCacheBackend(max_size=2)
+    entries = [
+        ("cold", CacheEntry("cold", created_at=clock.now, ttl=100, hits=1)),
+        ("hot", CacheEntry("hot", created_at=clock.now, ttl=100, hits=9)),
+        ("warm", CacheEntry("warm", created_at=clock.now, ttl=100, hits=5)),
+        ("expired", CacheEntry("expired", created_at=clock.now - 200, ttl=100, hits=99)),
+    ]
+    assert backend.restore_entries(entries) == 3
+    # 超出容量时按命中次数淘汰最冷的条目
+    assert sorted(backend._cache) == ["hot", "warm"]
+    clock.now += 101
+    assert backend.lookup("hot") is CACHE_MISS
+
+
+def test_sharded_backend_capacity_and_lookup():
+    backend = ShardedMemoryCacheBackend(max_size=10, num_shards=4)
+    for i in range(40):
+        backend.set(f"k{i}", i)
+    assert sum(len(shard._cache) for shard in backend._shards) <= 12
+    backend.set("k", None)
+    assert backend.lookup("k") is None and backend.lookup("missing") is CACHE_MISS
+
+
+def test_file_backend_ttl_and_sweep(tmp_path, clock):
+    backend = FileCacheBackend(tmp_path)
+    backend.set("a" * 32, {"v": 1}, ttl=10)
+    backend.set("b" * 32, {"v": 2})
+    assert backend.exists("a" * 32)
+    clock.now += 11
+    assert backend.lookup("a" * 32) is CACHE_MISS
+    assert not backend._get_cache_path("a" * 32).exists()
+
+    backend.set("c" * 32, {"v": 3}, ttl=10)
+    clock.now += 11
+    # 后台清理只读文件头判断过期
+    assert backend.sweep_expired() == 1
+    assert backend.get("b" * 32) == {"v": 2}
+
+
+def test_file_backend_evicts_oldest_to_budget(tmp_path):
+    value = "x" * 1000
+    size = len(FileCacheBackend(tmp_path / "probe").codec.encode(value)) + 20
+    backend = FileCacheBackend(tmp_path / "cache", max_bytes=size * 5, low_watermark=0.6)
+    keys = [f"{i:02d}" * 16 for i in range(5)]
+    for i, key in enumerate(keys):
+        backend.set(key, value)
+        os.utime(backend._get_cache_path(key), (1000 + i, 1000 + i))
+    # 命中刷新mtime，最早写入的keys[0]变为最近访问
+    assert backend.get(keys[0]) == value
+    backend.set("ff" * 16, value)
+    assert backend.disk_usage() <= size * 5 * 0.6
+    survivors = [key for key in keys + ["ff" * 16] if backend.exists(key)]
+    assert keys[0] in survivors and keys[1] not in survivors and "ff" * 16 in survivors
+
+
+def test_file_backend_without_pickle_ignores_legacy_entries(tmp_path):
+    backend = FileCacheBackend(tmp_path, codec=ValueCodec(serializer="json", allow_pickle=False))
+    legacy = backend._get_cache_path("d" * 32)
+    legacy.parent.mkdir(parents=True)
+    legacy.write_bytes(pickle.dumps(CacheEntry(value="legacy", created_at=time.time())))
+    # 旧格式文件是裸pickle，禁用pickle时按未命中处理，不反序列化
+    assert backend.lookup("d" * 32) is CACHE_MISS
+    backend.set("e" * 32, {"content": "审查结果"})
+    assert backend.get("e" * 32) == {"content": "审查结果"}
+
+
+def test_tag_invalidation_only_affects_tagged_entries():
+    manager = CacheManager(MemoryCacheBackend())
+    calls = []
+
+    @manager.cached(tags=lambda model, prompt: [f"model:{model}"])
+    def complete(model, prompt):
+        calls.append((model, prompt))
+        return f"{model}:{prompt}"
+
+    for _ in range(2):
+        complete("QWEN3-32b-AWQ", "p")
+        complete("QWEN3-8b", "p")
+    assert len(calls) == 2
+    manager.invalidate_tags("model:QWEN3-32b-AWQ")
+    complete("QWEN3-32b-AWQ", "p")
+    complete("QWEN3-8b", "p")
+    assert calls == [("QWEN3-32b-AWQ", "p"), ("QWEN3-8b", "p"), ("QWEN3-32b-AWQ", "p")]
+
+
+def test_tag_generation_is_shared_through_backend():
+    backend = MemoryCacheBackend()
+    first, second = CacheManager(backend), CacheManager(backend)
+    second.tag_generations.refresh_interval = 0
+    generation = second.tag_generations.current("project:1")
+    # 共享后端上另一个管理器（如其他进程）的失效在refresh_interval后可见
+    first.invalidate_tags("project:1")
+    assert second.tag_generations.current("project:1") != generation
+    # 代数丢失（如被淘汰）时生成新的代数，只会多失效
+    backend.delete(second.tag_generations._generation_key("project:1"))
+    assert second.tag_generations.current("project:1") not in (generation, first.tag_generations.current("project:1"))
@@ -0,0 +1,51 @@
+import pickle
+
+import pytest
+
+from api.common.cache.codec import CODEC_FORMAT_VERSION, ValueCodec
+
+VALUE = {"content": "审查结果" * 500, "usage": {"prompt_tokens": 100, "completion_tokens": 20}}
+
+
+@pytest.mark.parametrize("serializer", ["pickle", "json"])
+@pytest.mark.parametrize("compression", [None, "zlib", "lzma"])
+def test_round_trip_with_format_header(serializer, compression):
+    codec = ValueCodec(serializer=serializer, compression=compression)
+    data = codec.encode(VALUE)
+    # | 格式版本 | 序列化方式 | 压缩方式 | 载荷 |
+    assert data[0] == CODEC_FORMAT_VERSION
+    assert data[1] == (0 if serializer == "pickle" else 1)
+    assert data[2] == {None: 0, "zlib": 1, "lzma": 2}[compression]
+    assert codec.decode(data) == VALUE
+
+
+def test_small_or_incompressible_values_are_stored_raw():
+    codec = ValueCodec(serializer="json", compression="zlib", compress_threshold=1024)
+    assert codec.encode({"a": 1})[2] == 0
+    assert codec.encode(VALUE)[2] == 1
+    assert codec.stats()["compression_ratio"] < 1.0
+
+
+def test_decoder_reads_any_supported_encoding():
+    # 修改配置中的序列化/压缩方式后，旧条目仍可读取
+    data = ValueCodec(serializer="json", compression="lzma").encode(VALUE)
+    assert ValueCodec().decode(data) == VALUE
+    # 没有版本头的旧数据按裸pickle处理
+    assert ValueCodec().decode(pickle.dumps(VALUE)) == VALUE
+
+
+def test_pickle_is_rejected_when_disabled():
+    codec = ValueCodec(serializer="json", allow_pickle=False)
+    with pytest.raises(ValueError):
+        codec.decode(ValueCodec(serializer="pickle").encode(VALUE))
+    with pytest.raises(ValueError):
+        codec.decode(pickle.dumps(VALUE))
+    assert codec.decode(codec.encode(VALUE)) == VALUE
+
+
+def test_unknown_encoding_is_rejected():
+    data = bytes((CODEC_FORMAT_VERSION, 1, 9)) + b"{}"
+    with pytest.raises(ValueError):
+        ValueCodec().decode(data)
+    with pytest.raises(ValueError):
+        ValueCodec(serializer="msgpack")
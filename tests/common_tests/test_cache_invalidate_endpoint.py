@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("flask_jwt_extended")
+pytest.importorskip("flask_sqlalchemy")
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# 在全新的进程中只注册服务蓝图（与API进程一样不导入QwenClient），调用失效接口
+API_PROCESS_SCRIPT = """
+import json, sys, uuid
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from api.models import db
+from api.models.model_user import User
+from api.services import bp
+
+# 测试使用SQLite，JWT中的用户id是字符串，主键按字符串存储（生产环境为PostgreSQL UUID）
+User.__table__.c.id.type = db.String(36)
+app = Flask(__name__)
+app.config.update(JWT_SECRET_KEY="test-secret", SQLALCHEMY_DATABASE_URI="sqlite:///" + sys.argv[1])
+db.init_app(app)
+JWTManager(app)
+app.register_blueprint(bp)
+
+with app.app_context():
+    db.create_all()
+    admin = User(id=str(uuid.uuid4()), username="admin", email="admin@example.com", password_hash="x", role="admin")
+    db.session.add(admin)
+    db.session.commit()
+    token = create_access_token(identity=str(admin.id))
+
+loaded = sorted(name for name in sys.modules if name.split(".")[0] in ("openai", "transformers"))
+response = app.test_client().post(
+    "/api/v1/admin/cache/invalidate",
+    json={"cache": "llm_responses", "tags": ["model:QWEN3-32b-AWQ"]},
+    headers={"Authorization": "Bearer " + token},
+)
+print(json.dumps({"status": response.status_code, "body": response.get_json(), "loaded": loaded}))
+"""
+
+
+def test_invalidate_llm_responses_in_fresh_api_process(tmp_path):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-c", API_PROCESS_SCRIPT, str(tmp_path / "app.db")],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    output = json.loads(result.stdout.strip().splitlines()[-1])
+    assert output["status"] == 200, output
+    assert output["body"]["data"]["tags"] == ["model:QWEN3-32b-AWQ"]
+    assert output["body"]["data"]["scope"] in ("all_processes", "process")
+    # 注册LLM响应缓存不应加载openai与transformers
+    assert output["loaded"] == []
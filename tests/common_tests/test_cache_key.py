@@ -0,0 +1,34 @@
+import hashlib
+
+from api.common.cache.cache_key import _DigestMemo, fingerprint_messages
+
+
+def _blake2b(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def test_large_texts_are_not_memoized():
+    memo = _DigestMemo(max_text_chars=100)
+    source = "x = 1\n" * 1000
+    assert memo.digest(source) == _blake2b(source)
+    assert memo._memo == {} and memo._chars == 0
+    assert memo.digest("system prompt") == _blake2b("system prompt")
+    assert list(memo._memo) == ["system prompt"]
+
+
+def test_memo_is_bounded_by_total_chars():
+    memo = _DigestMemo(max_chars=1000, max_text_chars=400)
+    texts = [str(i) * 300 for i in range(10)]
+    for text in texts:
+        assert memo.digest(text) == _blake2b(text)
+        assert memo._chars <= 1000
+        assert memo._chars == sum(map(len, memo._memo))
+    # 重复查找已备忘的文本不会重复计数
+    memo.digest(texts[-1])
+    assert memo._chars == sum(map(len, memo._memo))
+
+
+def test_message_fingerprint_ignores_memo_state():
+    messages = [{"role": "system", "content": "审查代码"}, {"role": "user", "content": "y = 2\n" * 20000}]
+    assert fingerprint_messages(messages) == fingerprint_messages([dict(m) for m in messages])
+    assert fingerprint_messages(messages) != fingerprint_messages(messages[:1])
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.common.llm_client.resilience import Hedger
+
+
+def _hedger(**options) -> Hedger:
+    """已有延迟样本、对冲等待0.1秒、不限对冲比例的Hedger"""
+    hedger = Hedger(min_samples=1, min_delay=0.1, max_ratio=1.0, **options)
+    hedger.latency.record(0.01)
+    return hedger
+
+
+def test_sync_hedge_wins_and_slow_primary_runs_to_completion():
+    hedger = _hedger()
+    calls = []
+    primary_finished = threading.Event()
+
+    def fn():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            time.sleep(0.5)
+            primary_finished.set()
+            return "primary"
+        return "hedge"
+
+    start = time.monotonic()
+    assert hedger.call(fn) == "hedge"
+    assert time.monotonic() - start < 0.4
+    assert hedger.stats()["hedge_wins"] == 1
+    # 已经开始的同步请求无法中断，在对冲线程中执行到结束
+    assert primary_finished.wait(2)
+
+
+def _saturate(hedger: Hedger) -> threading.Event:
+    """占满对冲线程池，返回释放线程池的Event"""
+    release = threading.Event()
+    for _ in range(hedger.max_workers):
+        hedger._pool().submit(release.wait, 5)
+    return release
+
+
+def test_sync_queued_hedge_is_cancelled_when_primary_wins():
+    hedger = _hedger(max_workers=1)
+    release = _saturate(hedger)
+    calls = []
+
+    def fn():
+        calls.append(len(calls))
+        time.sleep(0.3)
+        return "primary"
+
+    # 对冲线程被占满，对冲请求在队列中等待，原请求返回时被取消
+    try:
+        assert hedger.call(fn) == "primary"
+    finally:
+        release.set()
+    time.sleep(0.2)
+    assert calls == [0]
+    assert hedger.stats()["hedged"] == 1
+
+
+def test_sync_primary_does_not_queue_behind_saturated_pool():
+    hedger = _hedger(max_workers=2)
+    release = _saturate(hedger)
+    sent = []
+
+    def fn():
+        sent.append(time.monotonic())
+        time.sleep(0.05)
+        return "primary"
+
+    # 线程池被占满时原请求立即发出，0.05秒内返回，不会因为排队超过0.1秒的对冲等待时间而触发对冲
+    start = time.monotonic()
+    try:
+        assert hedger.call(fn) == "primary"
+    finally:
+        release.set()
+    assert sent[0] - start < 0.05
+    assert hedger.stats()["hedged"] == 0
+
+
+def _tracked(delays, cancelled):
+    """按调用顺序使用delays中的延迟，记录被取消的调用"""
+    async def fn():
+        index = len(cancelled["started"])
+        cancelled["started"].append(index)
+        try:
+            await asyncio.sleep(delays[index])
+        except asyncio.CancelledError:
+            cancelled["cancelled"].append(index)
+            raise
+        return index
+    return fn
+
+
+def test_async_hedge_wins_and_primary_is_cancelled():
+    hedger = _hedger()
+    state = {"started": [], "cancelled": []}
+
+    async def run():
+        assert await hedger.acall(_tracked([10, 0.01], state)) == 1
+        await asyncio.sleep(0.01)
+        # 在事件循环结束（asyncio.run会取消剩余任务）之前检查
+        assert state["cancelled"] == [0]
+
+    asyncio.run(run())
+    assert hedger.stats()["hedge_wins"] == 1
+
+
+@pytest.mark.parametrize("cancel_after, started", [(0.02, [0]), (0.3, [0, 1])])
+def test_async_caller_cancellation_cancels_all_attempts(cancel_after, started):
+    # 0.02秒：还在等待对冲时机；0.3秒：对冲请求已经发出
+    hedger = _hedger()
+    state = {"started": [], "cancelled": []}
+
+    async def run():
+        caller = asyncio.ensure_future(hedger.acall(_tracked([10, 10], state)))
+        await asyncio.sleep(cancel_after)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0.01)
+        # 在事件循环结束（asyncio.run会取消剩余任务）之前检查
+        assert state["started"] == started
+        assert sorted(state["cancelled"]) == started
+
+    asyncio.run(run())
@@ -0,0 +1,71 @@
+import copy
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("transformers")
+
+from api.common.cache.cache_manager import CacheManager, FileCacheBackend, MemoryCacheBackend
+from api.common.cache.tiered_backend import TieredCacheBackend
+from api.common.llm_client import qwen_client
+from api.common.llm_client.qwen_client import QwenClient, model_config_version
+
+MODEL_CONFIG = {
+    "base_url": "http://localhost:8099/v1",
+    "model_name": "QWEN3-32b-AWQ",
+    "max_tokens": 32768,
+    "temperature": 0.7,
+    "timeout": 120,
+    "tokenizer_path": "/models/qwen3",
+    "max_concurrency": 16,
+    "rate_limit": {"enabled": True, "rps": 8},
+    "load_balancing": {"eject_after": 3, "probe_interval": 10},
+    "circuit_breaker": {"enabled": True},
+    "hedging": {"enabled": False},
+}
+
+
+@pytest.mark.parametrize("change", [
+    lambda cfg: cfg["rate_limit"].update(rps=2),
+    lambda cfg: cfg.update(base_urls=["http://a:8099/v1", "http://b:8099/v1"]),
+    lambda cfg: cfg.update(timeout=30),
+    lambda cfg: cfg.update(tokenizer_path="/other/path"),
+    lambda cfg: cfg.update(max_concurrency=64),
+    lambda cfg: cfg.update(http={"max_connections": 8}),
+    lambda cfg: cfg["load_balancing"].update(eject_after=5),
+    lambda cfg: cfg["circuit_breaker"].update(enabled=False),
+    lambda cfg: cfg["hedging"].update(enabled=True),
+])
+def test_deployment_settings_keep_namespace(change):
+    changed = copy.deepcopy(MODEL_CONFIG)
+    change(changed)
+    assert model_config_version(changed) == model_config_version(MODEL_CONFIG)
+
+
+@pytest.mark.parametrize("key, value", [
+    ("model_name", "QWEN3-8b"),
+    ("temperature", 0.3),
+    ("max_tokens", 8192),
+    ("top_p", 0.9),
+    ("prompt_version", 2),
+])
+def test_output_settings_change_namespace(key, value):
+    changed = dict(MODEL_CONFIG, **{key: value})
+    assert model_config_version(changed) != model_config_version(MODEL_CONFIG)
+
+
+def test_model_switch_after_marker_has_aged(tmp_path, monkeypatch):
+    manager = CacheManager(TieredCacheBackend(
+        l1=MemoryCacheBackend(max_size=100), l2=FileCacheBackend(tmp_path), l1_ttl=3600, l2_ttl=86400
+    ))
+    monkeypatch.setattr(qwen_client, "llm_response_cache_manager", manager)
+    QwenClient._invalidate_previous_model_responses(SimpleNamespace(model="QWEN3-32b-AWQ"))
+    generation = manager.tag_generations.current("model:QWEN3-32b-AWQ")
+
+    # 两天后切换模型：当前模型标记不随缓存TTL过期，旧模型的响应仍被失效
+    now = time.time() + 2 * 86400
+    monkeypatch.setattr(time, "time", lambda: now)
+    QwenClient._invalidate_previous_model_responses(SimpleNamespace(model="QWEN3-8b"))
+    assert manager.tag_generations.current("model:QWEN3-32b-AWQ") != generation
@@ -0,0 +1,41 @@
+import importlib.util
+import types
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("transformers")
+
+import api.common.llm_client as llm_client_package
+from api.common.llm_client import qwen_client
+from api.common.utils.help_functions import ProcessLocal
+
+
+class _FakeClient:
+    def health_check(self):
+        return {"status": "healthy"}
+
+
+def test_old_style_import_returns_client_after_submodules_are_loaded(monkeypatch):
+    # 子模块已加载（如Celery worker中先导入了AsyncQwenClient），旧写法仍然拿到客户端实例而不是模块
+    monkeypatch.setattr(llm_client_package, "_llm_client", ProcessLocal(_FakeClient, name="QwenClient"))
+    from api.common.llm_client import llm_client
+
+    assert not isinstance(llm_client, types.ModuleType)
+    assert llm_client.health_check() == {"status": "healthy"}
+
+
+def test_no_submodule_shadows_the_client_name():
+    assert importlib.util.find_spec("api.common.llm_client.llm_client") is None
+
+
+def test_lazy_class_exports():
+    from api.common.llm_client import AsyncQwenClient, QwenClient
+    from api.common.llm_client.async_llm_client import AsyncQwenClient as async_client_class
+
+    assert QwenClient is qwen_client.QwenClient
+    assert AsyncQwenClient is async_client_class
+
+
+def test_cache_id_is_stable_across_the_module_rename():
+    assert qwen_client.CHAT_COMPLETION_CACHE_ID == "api.common.llm_client.llm_client.QwenClient.chat_completion"
@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("flask_jwt_extended")
+pytest.importorskip("flask_sqlalchemy")
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# 在全新的进程中只注册服务蓝图，写入几条用量记录后调用用量接口
+API_PROCESS_SCRIPT = """
+import json, sys, uuid
+from datetime import datetime
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from api.models import db
+from api.models.model_llm_usage import LLMUsage
+from api.models.model_user import User
+from api.services import bp
+
+# 测试使用SQLite，JWT中的用户id是字符串，主键按字符串存储（生产环境为PostgreSQL UUID）
+User.__table__.c.id.type = db.String(36)
+app = Flask(__name__)
+app.config.update(JWT_SECRET_KEY="test-secret", SQLALCHEMY_DATABASE_URI="sqlite:///" + sys.argv[1])
+db.init_app(app)
+JWTManager(app)
+app.register_blueprint(bp)
+
+now = datetime.now()
+with app.app_context():
+    db.create_all()
+    admin = User(id=str(uuid.uuid4()), username="admin", email="admin@example.com", password_hash="x", role="admin")
+    db.session.add(admin)
+    for model, status, cache_hit in (("QWEN3-32b-AWQ", "success", False), ("QWEN3-32b-AWQ", "success", True),
+                                     ("QWEN3-32b-AWQ", "rejected", False), ("QWEN3-8b", "success", False)):
+        db.session.add(LLMUsage(model=model, prompt_tokens=100, completion_tokens=20, latency_ms=50.0,
+                                cache_hit=cache_hit, status=status, created_at=now))
+    db.session.commit()
+    token = create_access_token(identity=str(admin.id))
+
+client = app.test_client()
+headers = {"Authorization": "Bearer " + token}
+day = now.strftime("%Y-%m-%d")
+print(json.dumps({
+    "all": client.get(f"/api/v1/admin/llm/usage?start={day}&end={day}", headers=headers).get_json(),
+    "model": client.get(f"/api/v1/admin/llm/usage?start={day}&end={day}&model=QWEN3-8b", headers=headers).get_json(),
+}))
+"""
+
+
+def test_usage_is_grouped_by_model(tmp_path):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-c", API_PROCESS_SCRIPT, str(tmp_path / "app.db")],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    output = json.loads(result.stdout.strip().splitlines()[-1])
+    items = {item["model"]: item for item in output["all"]["data"]["items"]}
+    assert sorted(items) == ["QWEN3-32b-AWQ", "QWEN3-8b"]
+    large = items["QWEN3-32b-AWQ"]
+    assert (large["calls"], large["cache_hits"], large["rejected_calls"]) == (3, 1, 1)
+    # 命中响应缓存的调用计入节省的token，不计入实际发送的token
+    assert (large["prompt_tokens"], large["saved_tokens"]) == (200, 120)
+    assert large["task_type"] is None and "project_id" not in large
+    assert [item["model"] for item in output["model"]["data"]["items"]] == ["QWEN3-8b"]
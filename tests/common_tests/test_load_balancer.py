@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api.common.llm_client.load_balancer import LoadBalancer, probe_models_endpoint
+from benchmarks.stub_vllm_server import start_stub_server, stub_stats
+
+
+@pytest.fixture
+def stub_servers():
+    servers = []
+
+    def start(**options):
+        server, base_url = start_stub_server(**options)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _chat(balancer: LoadBalancer) -> str:
+    """经由负载均衡向副本发送一次chat completion，返回处理请求的副本地址"""
+    body = json.dumps({"model": "QWEN3-32b-AWQ", "messages": [{"role": "user", "content": "hi"}]}).encode()
+    with balancer.route() as replica:
+        request = urllib.request.Request(f"{replica.base_url}/chat/completions", data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            response.read()
+        return replica.base_url
+
+
+def _chat_ignoring_errors(balancer: LoadBalancer) -> None:
+    try:
+        _chat(balancer)
+    except urllib.error.URLError:
+        pass
+
+
+def _drive(balancer: LoadBalancer, requests: int = 40, concurrency: int = 8) -> None:
+    """并发发送请求：健康副本有在途请求时，失败的副本才会继续被选中直到被摘除（连续失败次数计入选择）"""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: _chat_ignoring_errors(balancer), range(requests)))
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def _unused_url() -> str:
+    """一个没有服务监听的地址（模拟宕机的副本）"""
+    server, base_url = start_stub_server()
+    server.shutdown()
+    server.server_close()
+    return base_url
+
+
+def test_failing_replica_is_ejected_probed_and_readmitted(stub_servers):
+    healthy, healthy_url = stub_servers(latency=0.05)
+    failing, failing_url = stub_servers(latency=0.0, error_rate_5xx=1.0)
+    recovered = threading.Event()
+    probed = []
+
+    def probe(base_url):
+        # 副本故障期间/models也不可用；恢复后使用默认的/models探测
+        probed.append(base_url)
+        return recovered.is_set() and probe_models_endpoint(base_url)
+
+    balancer = LoadBalancer([healthy_url, failing_url], eject_after=3, probe_interval=0.05, probe=probe)
+    try:
+        _drive(balancer)
+        replica = balancer.replicas[1]
+        assert replica.ejected and replica.ejections == 1
+        # 摘除前已经发出的请求之外，不再向失败的副本发送请求
+        sent_before_ejection = stub_stats(failing)["requests"]
+        assert 3 <= sent_before_ejection < 3 + 8
+        assert _wait_for(lambda: len(probed) >= 2)
+        assert replica.ejected
+        assert all(_chat(balancer) == healthy_url for _ in range(5))
+        assert stub_stats(failing)["requests"] == sent_before_ejection
+
+        failing.RequestHandlerClass.error_rate_5xx = 0.0
+        recovered.set()
+        assert _wait_for(lambda: not replica.ejected)
+        served = [_chat(balancer) for _ in range(6)]
+        assert served.count(failing_url) >= 2
+        assert set(probed) == {failing_url}
+    finally:
+        balancer.close()
+
+
+def test_unreachable_replica_stays_ejected_until_probe_succeeds():
+    server, healthy_url = start_stub_server(latency=0.05)
+    down_url = _unused_url()
+    balancer = LoadBalancer([healthy_url, down_url], eject_after=2, probe_interval=0.05)
+    revived = None
+    try:
+        _drive(balancer)
+        down = balancer.replicas[1]
+        assert down.ejected and down.ejections == 1
+        # 探测失败（连接被拒绝）时保持摘除，请求全部发往健康副本
+        time.sleep(0.3)
+        assert down.ejected
+        assert all(_chat(balancer) == healthy_url for _ in range(5))
+
+        port = int(down_url.rsplit(":", 1)[1].split("/")[0])
+        revived, revived_url = start_stub_server(port=port, latency=0.0)
+        assert revived_url == down_url
+        assert _wait_for(lambda: not down.ejected)
+        assert down.consecutive_errors == 0
+    finally:
+        balancer.close()
+        for stub in (server, revived):
+            if stub is not None:
+                stub.shutdown()
+                stub.server_close()
+
+
+def test_least_outstanding_replica_is_chosen():
+    balancer = LoadBalancer(["http://a/v1", "http://b/v1", "http://c/v1"])
+    a, b, c = (balancer.acquire() for _ in range(3))
+    assert {a.base_url, b.base_url, c.base_url} == {"http://a/v1", "http://b/v1", "http://c/v1"}
+    # a、b各有一个在途请求，c的请求结束后新请求发往c
+    balancer.release(c, latency=0.01)
+    assert balancer.acquire() is c
+    # 连续失败次数也计入：a失败、b成功后两者都没有在途请求，新请求发往b
+    balancer.release(a, failed=True)
+    balancer.release(b, latency=0.01)
+    assert balancer.acquire() is b
+
+
+def test_slow_replica_receives_fewer_requests(stub_servers):
+    slow, slow_url = stub_servers(latency=0.4)
+    fast, fast_url = stub_servers(latency=0.01)
+    balancer = LoadBalancer([slow_url, fast_url])
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            served = list(pool.map(lambda _: _chat(balancer), range(40)))
+        # 轮询会各发20个；按在途请求数选择时，慢副本同时最多处理一两个请求
+        assert served.count(slow_url) <= 8
+        assert stub_stats(slow)["requests"] + stub_stats(fast)["requests"] == 40
+    finally:
+        balancer.close()
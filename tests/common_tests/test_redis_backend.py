@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from api.common.cache.cache_manager import CACHE_MISS, CacheManager
+from api.common.cache.codec import ValueCodec
+from api.common.cache.redis_backend import RedisCacheBackend
+
+
+@pytest.fixture
+def backend():
+    return RedisCacheBackend(client=fakeredis.FakeRedis(), prefix="test:")
+
+
+def test_get_set_delete(backend):
+    assert backend.lookup("missing") is CACHE_MISS
+    assert backend.get("missing") is None
+    backend.set("key", {"content": "ok", "usage": {"total_tokens": 3}})
+    assert backend.get("key") == {"content": "ok", "usage": {"total_tokens": 3}}
+    assert backend.exists("key")
+    backend.delete("key")
+    assert not backend.exists("key")
+
+
+def test_falsy_values_are_hits(backend):
+    backend.set("empty", "")
+    assert backend.lookup("empty") == ""
+
+
+def test_ttl(backend):
+    backend.set("key", "value", ttl=30)
+    assert 0 < backend.client.ttl("test:key") <= 30
+    backend.set("forever", "value")
+    assert backend.client.ttl("test:forever") == -1
+    # ttl<=0表示立即过期
+    backend.set("key", "value", ttl=0)
+    assert backend.lookup("key") is CACHE_MISS
+
+
+def test_batch_operations(backend):
+    backend.set_many({"a": 1, "b": [2], "c": {"n": 3}}, ttl=60)
+    assert backend.get_many(["a", "b", "c", "missing"]) == {"a": 1, "b": [2], "c": {"n": 3}}
+    assert backend.get_many([]) == {}
+    assert 0 < backend.client.ttl("test:b") <= 60
+
+
+def test_codec_is_used():
+    codec = ValueCodec(serializer="json", compression="zlib", compress_threshold=0, allow_pickle=False)
+    backend = RedisCacheBackend(client=fakeredis.FakeRedis(), codec=codec)
+    backend.set("key", {"content": "x" * 1000})
+    assert len(backend.client.get(backend._redis_key("key"))) < 1000
+    assert backend.get("key") == {"content": "x" * 1000}
+
+
+def test_unavailable_redis_is_a_miss():
+    server = fakeredis.FakeServer()
+    server.connected = False
+    backend = RedisCacheBackend(client=fakeredis.FakeRedis(server=server))
+    backend.set("key", "value")
+    assert backend.lookup("key") is CACHE_MISS
+    assert backend.get_many(["key"]) == {}
+
+
+def test_async_interface_with_injected_client(backend):
+    async def run():
+        await backend.aset("key", "value", ttl=30)
+        assert await backend.alookup("key") == "value"
+        assert await backend.aexists("key")
+        await backend.adelete("key")
+        return await backend.alookup("key")
+
+    assert asyncio.run(run()) is CACHE_MISS
+
+
+def test_tag_generations_shared_between_managers():
+    client = fakeredis.FakeRedis()
+    calls = []
+
+    def make_manager():
+        manager = CacheManager(RedisCacheBackend(client=client))
+        manager.tag_generations.refresh_interval = 0
+
+        @manager.cached(ttl=60, tags=lambda model: [f"model:{model}"])
+        def complete(model):
+            calls.append(model)
+            return f"{model}-{len(calls)}"
+
+        return manager, complete
+
+    first_manager, first = make_manager()
+    _, second = make_manager()
+    assert first("qwen") == "qwen-1"
+    # 另一个进程（共享同一个Redis）命中同一条目
+    assert second("qwen") == "qwen-1"
+    first_manager.invalidate_tags("model:qwen")
+    assert second("qwen") == "qwen-2"
+    assert first("other") == "other-3"
+    assert second("other") == "other-3"
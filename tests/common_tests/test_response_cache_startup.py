@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("transformers")
+
+from api.common.config.system_config import PROJECT_ROOT, resolve_project_path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# 在其他工作目录下导入客户端并调用缓存：不应注册快照，也不应在工作目录中创建缓存目录
+IMPORT_SCRIPT = """
+import json
+from api.common.cache import warmup
+from api.common.llm_client import qwen_client
+from api.common.llm_client.response_cache import CACHE_DIR, SNAPSHOT_DIR, llm_response_access_log
+
+print(json.dumps({
+    "snapshot_targets": sorted(warmup._snapshot_targets),
+    "cache_dir": str(CACHE_DIR),
+    "snapshot_dir": str(SNAPSHOT_DIR),
+    "access_log": str(llm_response_access_log.path) if llm_response_access_log else None,
+}))
+"""
+
+
+def test_importing_the_client_has_no_snapshot_side_effects(tmp_path):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    output = json.loads(result.stdout.strip().splitlines()[-1])
+    assert output["snapshot_targets"] == []
+    assert list(tmp_path.iterdir()) == []
+    # 相对路径按项目根目录解析，而不是进程的工作目录
+    assert Path(output["cache_dir"]).is_relative_to(REPO_ROOT)
+    assert Path(output["snapshot_dir"]).is_relative_to(REPO_ROOT)
+    if output["access_log"] is not None:
+        assert Path(output["access_log"]).parent == Path(output["snapshot_dir"])
+
+
+def test_resolve_project_path(tmp_path):
+    assert PROJECT_ROOT == REPO_ROOT
+    assert resolve_project_path("cache_snapshots") == REPO_ROOT / "cache_snapshots"
+    assert resolve_project_path(tmp_path / "cache") == tmp_path / "cache"
@@ -0,0 +1,35 @@
+import sqlite3
+
+from api.common.cache.cache_manager import CACHE_MISS
+from api.common.cache.sqlite_backend import SqliteCacheBackend
+
+
+def _lock_database(db_path):
+    """另一个连接持有写锁（模拟其他进程正在写入）"""
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    conn.execute("BEGIN IMMEDIATE")
+    return conn
+
+
+def test_lookup_returns_value_when_touch_update_fails(tmp_path):
+    backend = SqliteCacheBackend(tmp_path / "cache.db", busy_timeout=0.05)
+    backend.set("key", {"content": "ok"})
+    locker = _lock_database(backend.db_path)
+    try:
+        assert backend.lookup("key") == {"content": "ok"}
+        assert backend.get_many(["key"]) == {"key": {"content": "ok"}}
+    finally:
+        locker.rollback()
+        locker.close()
+
+
+def test_lookup_expired_entry_is_miss_when_delete_fails(tmp_path):
+    backend = SqliteCacheBackend(tmp_path / "cache.db", busy_timeout=0.05)
+    backend.set("key", "value", ttl=-1)
+    locker = _lock_database(backend.db_path)
+    try:
+        assert backend.lookup("key") is CACHE_MISS
+    finally:
+        locker.rollback()
+        locker.close()
+    assert backend.lookup("key") is CACHE_MISS
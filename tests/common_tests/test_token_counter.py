@@ -0,0 +1,89 @@
+import pytest
+
+from api.common.cache.cache_manager import CacheManager, MemoryCacheBackend
+from api.common.llm_client.token_counter import TokenCounter
+
+
+class _WhitespaceTokenizer:
+    """按空白切分的tokenizer，聊天模板与Qwen3相同，记录完整计算的次数"""
+
+    is_fast = False
+
+    def __init__(self):
+        self.exact_calls = 0
+
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        self.exact_calls += 1
+        prompt = "".join(f"<|im_start|>{m['role']}\n{m['content']}<|im_end|>\n" for m in messages)
+        return prompt + ("<|im_start|>assistant\n" if add_generation_prompt else "")
+
+
+def _counter(tokenizer) -> TokenCounter:
+    return TokenCounter(tokenizer, namespace="test", cache_manager=CacheManager(MemoryCacheBackend()))
+
+
+def _exact(tokenizer, messages) -> int:
+    return len(tokenizer.encode(tokenizer.apply_chat_template(messages)))
+
+
+def test_layout_is_calibrated_once_then_counted_per_message():
+    tokenizer = _WhitespaceTokenizer()
+    counter = _counter(tokenizer)
+    system = {"role": "system", "content": "你是 代码 审查 助手"}
+    conversations = [[system, {"role": "user", "content": f"审查 文件 {i} 的 代码"}] for i in range(5)]
+    assert counter.count_messages_many(conversations) == [_exact(tokenizer, m) for m in conversations]
+    calls = tokenizer.exact_calls
+    counter.count_messages([system, {"role": "user", "content": "另一 段 代码"}])
+    # 布局已核对，之后只按消息内容计数，不再套用聊天模板
+    assert tokenizer.exact_calls == calls
+
+
+def test_layout_that_fails_calibration_falls_back_to_exact_count():
+    tokenizer = _WhitespaceTokenizer()
+    counter = _counter(tokenizer)
+    # content以空白结尾时与模板中的<|im_end|>切分为不同的token，按消息拆分的估计与完整计算不一致
+    messages = [{"role": "user", "content": "代码 "}]
+    assert counter.count_messages(messages) == _exact(tokenizer, messages)
+    assert counter._layout_overheads[("user",)] is None
+    other = [{"role": "user", "content": "审查 这段 代码"}]
+    assert counter.count_messages(other) == _exact(tokenizer, other)
+
+
+def test_unsplittable_messages_use_exact_count():
+    tokenizer = _WhitespaceTokenizer()
+    counter = _counter(tokenizer)
+    for messages in ([{"role": "assistant", "content": "结果"}],
+                     [{"role": "user", "content": " 以空白开头"}],
+                     [{"role": "user", "content": "x", "name": "reviewer"}]):
+        assert counter.count_messages(messages) == _exact(tokenizer, messages)
+    assert counter._layout_overheads == {}
+
+
+def test_text_counts_are_memoized():
+    tokenizer = _WhitespaceTokenizer()
+    counter = _counter(tokenizer)
+    assert counter.count_texts(["a b", "c", "a b"]) == [2, 1, 2]
+    tokenizer.encode = None     # 之后的计数只能来自缓存
+    assert counter.count_text("a b") == 2
+
+
+def test_matches_full_template_with_real_tokenizer(tmp_path):
+    pytest.importorskip("transformers")
+    from transformers import AutoTokenizer
+    from benchmarks.bench_llm_load import _offline_tokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(_offline_tokenizer(tmp_path))
+    counter = _counter(tokenizer)
+    system = {"role": "system", "content": "You are a code reviewer.\nReply in JSON."}
+    conversations = [
+        [system, {"role": "user", "content": f'<file path="src/f{i}.py">\ndef f():\n    return {i}\n</file>'}]
+        for i in range(3)
+    ] + [[{"role": "user", "content": "单独的用户消息"}]]
+    assert counter.count_messages_many(conversations) == [
+        len(tokenizer.encode(tokenizer.apply_chat_template(m, tokenize=False, add_generation_prompt=True),
+                             add_special_tokens=False))
+        for m in conversations
+    ]
@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from api.common.llm_client import usage_ledger
+from api.common.llm_client.rate_limiter import LLMBackpressureError
+from api.common.llm_client.resilience import CircuitOpenError
+from api.common.llm_client.usage_ledger import llm_usage_context, record_call_usage, track_llm_usage
+
+USAGE = {"prompt_tokens": 100, "completion_tokens": 20, "cached_tokens": 64}
+
+
+class _FakeClient:
+    model = "QWEN3-32b-AWQ"
+
+    def __init__(self, error=None):
+        self.error = error
+
+    @track_llm_usage
+    def chat_completion(self):
+        if self.error is not None:
+            raise self.error
+        record_call_usage(USAGE)
+        return {"model": self.model, "usage": USAGE}
+
+    @track_llm_usage
+    async def achat_completion(self):
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        record_call_usage(USAGE)
+        return {"model": self.model, "usage": USAGE}
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    rows = []
+    monkeypatch.setattr(usage_ledger.llm_usage_ledger, "record", lambda **row: rows.append(row))
+    return rows
+
+
+def _call(client: _FakeClient, use_async: bool):
+    if use_async:
+        return asyncio.run(client.achat_completion())
+    return client.chat_completion()
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_successful_call_is_recorded(recorded, use_async):
+    with llm_usage_context(task_type="security"):
+        _call(_FakeClient(), use_async)
+    assert len(recorded) == 1
+    row = recorded[0]
+    assert (row["status"], row["error_type"], row["task_type"]) == ("success", None, "security")
+    assert (row["prompt_tokens"], row["completion_tokens"], row["cached_tokens"]) == (100, 20, 64)
+    assert row["cache_hit"] is False
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+@pytest.mark.parametrize("error, status", [
+    (LLMBackpressureError("queue is full", retry_after=3), "rejected"),
+    (CircuitOpenError("circuit is open", retry_after=10), "rejected"),
+    (TimeoutError("read timed out"), "error"),
+])
+def test_failed_and_rejected_calls_are_recorded(recorded, use_async, error, status):
+    with llm_usage_context(task_type="quality"):
+        with pytest.raises(type(error)):
+            _call(_FakeClient(error), use_async)
+    assert len(recorded) == 1
+    row = recorded[0]
+    assert (row["status"], row["error_type"], row["task_type"]) == (status, type(error).__name__, "quality")
+    assert (row["prompt_tokens"], row["completion_tokens"], row["cached_tokens"]) == (0, 0, None)
+    assert row["model"] == "QWEN3-32b-AWQ" and row["cache_hit"] is False
+
+
+def test_insert_creates_missing_table(monkeypatch, tmp_path):
+    # 项目没有迁移工具，第一次写入时创建llm_usages表
+    import sqlalchemy
+    from api.common.config import system_config
+    from api.models.model_llm_usage import LLMUsage
+
+    uri = f"sqlite:///{tmp_path / 'ledger.db'}"
+    monkeypatch.setattr(system_config, "relation_db_uri", lambda: uri)
+    monkeypatch.setattr(usage_ledger, "_engine", None)
+    row = dict(
+        id=uuid.uuid4(), project_id=None, review_task_id=None, task_type=None, model="QWEN3-32b-AWQ",
+        prompt_tokens=0, completion_tokens=0, cached_tokens=None, latency_ms=1.5, cache_hit=False,
+        status="rejected", error_type="LLMBackpressureError", created_at=datetime.now(),
+    )
+    try:
+        usage_ledger._insert_usage_rows([row])
+        with usage_ledger._engine.connect() as connection:
+            stored = connection.execute(sqlalchemy.select(LLMUsage.status, LLMUsage.error_type)).all()
+    finally:
+        if usage_ledger._engine is not None:
+            usage_ledger._engine.dispose()
+    assert [tuple(r) for r in stored] == [("rejected", "LLMBackpressureError")]